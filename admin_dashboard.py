@@ -11,6 +11,7 @@
 # UPDATED: Removed unsupported 'box-shadow' property
 
 import sys
+import copy
 import requests
 from datetime import datetime, timedelta
 import webbrowser
@@ -28,7 +29,7 @@ from PyQt6.QtWidgets import (
     QFileDialog, QDateEdit, QCheckBox, QFormLayout, QDialog,
     QProgressBar
 )
-from PyQt6.QtCore import Qt, QDate, QSize, QPropertyAnimation, QEasingCurve, pyqtSignal
+from PyQt6.QtCore import Qt, QDate, QSize, QPropertyAnimation, QEasingCurve, QTimer, pyqtSignal
 from PyQt6.QtGui import QColor, QIcon, QFont, QCursor, QPixmap
 
 # --- Import Page UIs ---
@@ -43,7 +44,9 @@ from pages.monthly_bills_page import MonthlyBillsPage
 from dialogs.product_dialog import ProductDialog
 from dialogs.client_dialog import ClientDialog
 from dialogs.client_pricing_dialog import ClientPricingDialog
+from dialogs.price_list_dialog import PriceListDialog
 from dialogs.mark_as_paid_dialog import MarkAsPaidDialog
+from dialogs.reconcile_payments_dialog import ReconcilePaymentsDialog
 from dialogs.filter_dialog import FilterDialog
 from dialogs.base_dialog import BaseDialog 
 # NEW: Import the refactored Product Detail Dialog
@@ -77,6 +80,8 @@ ICON_EXCEL = os.path.join(ICON_PATH, "excel.png")
 ICON_ADD = os.path.join(ICON_PATH, "add.png") # You'll need to find an "add.png" icon
 
 API_BASE_URL = "https://ordify-api.onrender.com"
+# How often the dashboard asks whether the low-stock list changed (a conditional GET)
+LOW_STOCK_POLL_MS = 30_000
 
 # ===================================================================
 # --- REMOVED ProductDetailDialog class ---
@@ -110,6 +115,8 @@ class AdminDashboard(QMainWindow):
         self.ICON_EXCEL = ICON_EXCEL
         self.ICON_ADD = ICON_ADD # Add new icon
         self.API_BASE_URL = API_BASE_URL
+        # (endpoint, params) -> (ETag, parsed JSON) of the last successful fetch
+        self.response_cache = {}
 
         # --- Main Layout ---
         self.central_widget = QWidget()
@@ -178,15 +185,35 @@ class AdminDashboard(QMainWindow):
 
         # --- 5. Initial Data Load ---
         self.refresh_all_data()
+
+        # --- 6. Low-stock notifications ---
+        self.low_stock_etag = None
+        self.low_stock_ids = None
+        self.low_stock_timer = QTimer(self)
+        self.low_stock_timer.timeout.connect(self.check_low_stock)
+        self.low_stock_timer.start(LOW_STOCK_POLL_MS)
+        self.check_low_stock()
     # <<< End of __init__ method
 
     # --- Helper to fetch data ---
     def fetch_generic_details(self, endpoint, params=None):
-        """Fetches data from the API and handles errors."""
+        """Fetches data from the API and handles errors. Unchanged data is not downloaded again."""
+        cache_key = (endpoint, tuple(sorted((params or {}).items())))
+        cached = self.response_cache.get(cache_key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
         try:
-            response = requests.get(f"{API_BASE_URL}{endpoint}", params=params)
+            response = requests.get(f"{API_BASE_URL}{endpoint}", params=params, headers=headers)
+            if response.status_code == 304 and cached:
+                # Callers may modify what they get back, so hand out a copy
+                return copy.deepcopy(cached[1])
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            etag = response.headers.get('ETag')
+            if etag:
+                self.response_cache[cache_key] = (etag, copy.deepcopy(data))
+            else:
+                self.response_cache.pop(cache_key, None)
+            return data
         except requests.exceptions.RequestException as e:
             error_message = f"API Error: Could not fetch details from {endpoint}.\n\nReason: {e}"
             if e.response is not None:
@@ -422,6 +449,29 @@ class AdminDashboard(QMainWindow):
         low_stock_data = self.fetch_generic_details("/products/low-stock")
         self.dashboard_page.update_low_stock_alerts(low_stock_data, self.clear_layout)
 
+    def check_low_stock(self):
+        """
+        Polls the low-stock list with If-None-Match; it is only downloaded when its
+        'low_stock' version changed, and products new on it are named in the status bar.
+        """
+        headers = {'If-None-Match': self.low_stock_etag} if self.low_stock_etag else {}
+        try:
+            response = requests.get(f"{API_BASE_URL}/products/low-stock", headers=headers, timeout=5)
+            if response.status_code == 304:
+                return
+            response.raise_for_status()
+            low_stock_data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return # Background check: try again on the next tick rather than interrupting the user
+        self.low_stock_etag = response.headers.get('ETag')
+        low_stock_ids = {item['product_id'] for item in low_stock_data}
+        newly_low = [item['name'] for item in low_stock_data
+                     if self.low_stock_ids is not None and item['product_id'] not in self.low_stock_ids]
+        self.low_stock_ids = low_stock_ids
+        self.dashboard_page.update_low_stock_alerts(low_stock_data, self.clear_layout)
+        if newly_low:
+            self.statusBar().showMessage(f"Low stock: {', '.join(newly_low)}", 15_000)
+
     def refresh_clients_data(self):
         clients_data = self.fetch_generic_details("/clients")
         if not clients_data:
@@ -439,7 +489,9 @@ class AdminDashboard(QMainWindow):
             pass # Ignore if search bar not added yet
 
     def refresh_products_data(self):
-        products_data = self.fetch_generic_details("/products")
+        # The table only shows these columns; descriptions and image links are not downloaded
+        products_data = self.fetch_generic_details(
+            "/products", params={"fields": "product_id,name,price,stock_quantity"})
         if not products_data:
             self.products_page.populate_table([])
             return
@@ -743,6 +795,10 @@ class AdminDashboard(QMainWindow):
         dialog = ClientPricingDialog(self, client_id, client.get('company_name'))
         dialog.exec()
 
+    def open_price_lists_window(self):
+        dialog = PriceListDialog(self)
+        dialog.exec()
+
     def view_order_details(self, order_id):
         """Fetches order data and displays it in the new OrderDetailDialog."""
         order_data = self.fetch_generic_details(f"/orders/{order_id}")
@@ -816,6 +872,13 @@ class AdminDashboard(QMainWindow):
          if dialog.exec():
             self.refresh_monthly_bills_data(page_num=self._current_page['monthly_bills'])
 
+    def open_reconcile_dialog(self):
+         dialog = ReconcilePaymentsDialog(self)
+         if dialog.exec():
+            self.refresh_monthly_bills_data(page_num=self._current_page['monthly_bills'])
+            self.refresh_orders_data(page_num=self._current_page['orders'])
+            self.refresh_dashboard_data()
+
     def delete_monthly_bill_by_id(self, bill_id):
         if self.confirm_delete("monthly bill", bill_id):
             self.perform_delete(f"/monthly-bills/{bill_id}", "monthly bill", lambda: (
@@ -952,6 +1015,36 @@ class AdminDashboard(QMainWindow):
          except requests.exceptions.RequestException as e:
             self.show_api_error(f"delete {item_name}", e)
 
+    def import_products_file(self):
+        """Uploads a CSV/XLSX sheet to /products/import and shows the row-level report."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Products", "", "Spreadsheets (*.csv *.xlsx)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, 'rb') as f:
+                response = requests.post(f"{API_BASE_URL}/products/import",
+                                         files={'file': (os.path.basename(file_path), f)})
+            report = response.json()
+            if 'rows' not in report: # Rejected before any row was read
+                QMessageBox.critical(self, "Import Failed", report.get('error', response.text))
+                return
+        except (requests.exceptions.RequestException, ValueError) as e:
+            QMessageBox.critical(self, "API Error", f"Failed to import products: {e}")
+            return
+
+        summary = (f"{report['rows']} rows read: {report['created']} products created, "
+                   f"{report['updated']} updated, {report['error_count']} rejected.")
+        if report['errors']:
+            shown = report['errors'][:20]
+            summary += "\n\n" + "\n".join(f"Row {e['row']}: {e['error']}" for e in shown)
+            if report['error_count'] > len(shown):
+                summary += f"\n... and {report['error_count'] - len(shown)} more."
+        if report['complete']:
+            QMessageBox.information(self, "Import Finished", summary)
+        else:
+            QMessageBox.warning(self, "Import Stopped", summary)
+        self.refresh_products_data()
+
     def show_api_error(self, action, e):
          try:
             error = e.response.json().get('error') if e.response and e.response.content else str(e)
@@ -973,6 +1066,36 @@ class AdminDashboard(QMainWindow):
          except Exception as e:
              QMessageBox.critical(self, "File Error", f"Could not save or open PDF file: {e}")
 
+    def download_document_archive(self, doc_type):
+        """Streams every bill or challan of the period selected on the Monthly Bills page into one ZIP on disk."""
+        month = self.monthly_bills_page.bill_month_combo.currentText()
+        year_value = self.monthly_bills_page.bill_year_combo.value()
+        period = f"{year_value}-{month}"
+        label = "Invoices" if doc_type == "bills" else "Challans"
+        save_path, _ = QFileDialog.getSaveFileName(self, f"Save All {label}", f"{label}_{period}.zip", "ZIP Archives (*.zip)")
+        if not save_path:
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            with requests.get(f"{API_BASE_URL}/documents/archive", params={"period": period, "type": doc_type},
+                              stream=True, timeout=(10, 300)) as response:
+                response.raise_for_status()
+                with open(save_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                        QApplication.processEvents() # Keep the window responsive during long downloads
+            QApplication.restoreOverrideCursor()
+            QMessageBox.information(self, "Success", f"{label} for {period} saved to:\n{save_path}")
+        except requests.exceptions.RequestException as e:
+            QApplication.restoreOverrideCursor()
+            if os.path.exists(save_path):
+                os.remove(save_path) # Don't leave a truncated archive behind
+            self.show_api_error(f"download {label.lower()}", e)
+        except OSError as e:
+            QApplication.restoreOverrideCursor()
+            QMessageBox.critical(self, "File Error", f"Could not save the archive: {e}")
+
     # ---
     # --- STYLESHEET (UPDATED) ---
     # ---
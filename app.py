@@ -12,20 +12,36 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 import logging
 import os
+import json
+import base64
+import bisect
+import click
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from werkzeug.utils import secure_filename
 
 # Import company details from config
-from config import COMPANY_DETAILS
+from config import COMPANY_DETAILS, INVOICE_LINE_MODES, UPLOAD_FOLDER, MAX_UPLOAD_BYTES
 
 # Import PDF helpers
 from pdf_generator import create_challan_pdf, create_monthly_bill_pdf
+import pdf_assets
+import pdf_fonts
+import product_images
+import upload_storage
+import table_versions
+import catalog_snapshot
+import product_import
 
 # Import the route blueprints
 from challan_routes import challan_bp
 from bill_routes import bill_bp
+from report_routes import report_bp
+from document_routes import document_bp
+from price_list_routes import price_list_bp, parse_price_changes, unknown_products
+from overdue_sweep import sweep_overdue_bills
+import upload_gc
 
 # --- App Configuration ---
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 # Initialize the Flask application and logging
@@ -33,18 +49,44 @@ app = Flask(__name__)
 CORS(app)
 logging.basicConfig(level=logging.DEBUG)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Whole request body: the image plus room for the other form fields
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024
 
 # Ensure the upload folder exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Replaced and orphaned images are removed after a grace period, not inline
+upload_gc.start_background_collector(UPLOAD_FOLDER)
+
+# Decode the PDF header/footer images once per worker instead of on first download
+pdf_assets.preload_all()
+pdf_fonts.preload_all() # Logs clearly at start-up if a bundled font is missing
 
 # Register the blueprints
 app.register_blueprint(challan_bp)
 app.register_blueprint(bill_bp)
+app.register_blueprint(report_bp)
+app.register_blueprint(document_bp)
+app.register_blueprint(price_list_bp)
+
+@app.cli.command('sweep-overdue')
+def sweep_overdue_command():
+    """Marks unpaid bills past their due date as Overdue."""
+    print(f"{sweep_overdue_bills()} bill(s) marked Overdue.")
+
+@app.cli.command('gc-uploads')
+@click.option('--apply', is_flag=True, help="Delete the files (default: only report).")
+def gc_uploads_command(apply):
+    """Reports (or with --apply deletes) uploads that no product references."""
+    print(upload_gc.format_report(upload_gc.collect_unreferenced_uploads(apply=apply, upload_folder=app.config['UPLOAD_FOLDER'])))
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"The upload is larger than the {MAX_UPLOAD_BYTES / (1024 * 1024):.1f} MB limit."}), 413
+
 # --- Helper function for data conversion ---
 def format_datetime(obj):
     """Helper function to format datetime and Decimal objects for JSON serialization."""
@@ -59,17 +101,62 @@ def format_datetime(obj):
 # --- New Route to Serve Uploaded Files ---
 @app.route('/uploads/<path:filename>')
 def send_upload(filename):
-    return send_file(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    # Content-addressed uploads never change, so they are cached for good
+    return upload_storage.send_stored_file(os.path.join(app.config['UPLOAD_FOLDER'], filename),
+                                           etag=upload_storage.content_hash(filename))
+
+# Resized product images; a derivative the background worker has not written yet is built here
+@app.route('/uploads/derived/<name>')
+def send_image_derivative(name):
+    parsed = product_images.parse_derivative_name(name)
+    if not parsed:
+        return jsonify({"error": "Image not found"}), 404
+    derived_path = os.path.join(product_images.derived_folder(app.config['UPLOAD_FOLDER']), name)
+    if not os.path.isfile(derived_path):
+        original = parsed[0]
+        if original != secure_filename(original) or not os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], original)):
+            return jsonify({"error": "Image not found"}), 404
+        # Decoding runs on the derivative worker; only wait a bounded time for it
+        future = product_images.build_in_background(app.config['UPLOAD_FOLDER'], original)
+        try:
+            future.result(timeout=product_images.DERIVATIVE_WAIT_SECONDS)
+        except FutureTimeoutError:
+            response = jsonify({"error": "The image is still being processed. Please try again shortly."})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(product_images.DERIVATIVE_WAIT_SECONDS)
+            return response
+        if not os.path.isfile(derived_path):
+            return jsonify({"error": "Image could not be processed"}), 500
+    # A derivative of a content-addressed original is as immutable as the original
+    return upload_storage.send_stored_file(derived_path, etag=name if upload_storage.content_hash(parsed[0]) else None)
+
+def product_image_urls(filename):
+    """URLs of the resized versions of a product image: {size: {format: url}}."""
+    return {
+        size: {
+            fmt: url_for('send_image_derivative', name=product_images.derivative_name(filename, size, fmt), _external=True)
+            for fmt in product_images.DERIVATIVE_FORMATS
+        }
+        for size in product_images.DERIVATIVE_SIZES
+    }
 
 # --- API Endpoint to check for low stock products ---
+LOW_STOCK_EVENTS_LIMIT = 500
+# Event ids are taken at insert but become visible at commit, so a later id can
+# commit first. Events are only handed out once older than this, by which time
+# every transaction that took a lower id has committed or rolled back.
+LOW_STOCK_EVENT_SETTLE_SECONDS = 120
+
 @app.route('/products/low-stock', methods=['GET'])
+@table_versions.versioned('low_stock')
 def get_low_stock_products():
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor(dictionary=True)
     try:
-        query = "SELECT product_id, name, stock_quantity, low_stock_threshold FROM products WHERE stock_quantity <= low_stock_threshold"
+        # is_low_stock is maintained by MySQL (migration 007), so this is an index lookup
+        query = "SELECT product_id, name, stock_quantity, low_stock_threshold FROM products WHERE is_low_stock = 1"
         cursor.execute(query)
         low_stock_items = cursor.fetchall()
         return jsonify(low_stock_items)
@@ -79,8 +166,50 @@ def get_low_stock_products():
         cursor.close()
         conn.close()
 
+@app.route('/products/low-stock/events', methods=['GET'])
+def get_low_stock_events():
+    """
+    Products that crossed their low-stock threshold after event `after`, oldest first.
+    Without `after`, only returns the latest event id, to start following from now.
+    Events are returned LOW_STOCK_EVENT_SETTLE_SECONDS after they happen, so none is
+    skipped; for the current list, poll GET /products/low-stock with If-None-Match.
+    """
+    after = request.args.get('after', type=int)
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if after is None:
+            cursor.execute("""
+                SELECT COALESCE(MAX(event_id), 0) AS last_event_id FROM low_stock_events
+                WHERE created_at < NOW() - INTERVAL %s SECOND
+            """, (LOW_STOCK_EVENT_SETTLE_SECONDS,))
+            return jsonify({"events": [], "last_event_id": int(cursor.fetchone()['last_event_id'])})
+        cursor.execute("""
+            SELECT e.event_id, e.product_id, p.name, e.is_low_stock, e.stock_quantity,
+                   e.low_stock_threshold, e.created_at
+            FROM low_stock_events e
+            LEFT JOIN products p ON p.product_id = e.product_id
+            WHERE e.event_id > %s AND e.created_at < NOW() - INTERVAL %s SECOND
+            ORDER BY e.event_id
+            LIMIT %s
+        """, (after, LOW_STOCK_EVENT_SETTLE_SECONDS, LOW_STOCK_EVENTS_LIMIT))
+        events = cursor.fetchall()
+        for event in events:
+            event['is_low_stock'] = bool(event['is_low_stock'])
+            event['created_at'] = format_datetime(event['created_at'])
+        last_event_id = events[-1]['event_id'] if events else after
+        return jsonify({"events": events, "last_event_id": last_event_id})
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 # --- NEW DASHBOARD SUMMARY ENDPOINT ---
 @app.route('/dashboard-summary', methods=['GET'])
+@table_versions.versioned('orders', 'challans', 'monthly_bills', daily=True)
 def get_dashboard_summary():
     """
     Provides a high-level summary of key business metrics for the admin dashboard.
@@ -92,6 +221,7 @@ def get_dashboard_summary():
     cursor = conn.cursor(dictionary=True)
     try:
         # This query is compatible with the ENUM schema
+        # Overdue status is persisted nightly by overdue_sweep.py, so it is an indexed lookup
         query = """
             SELECT
                 (SELECT COUNT(*) 
@@ -109,8 +239,7 @@ def get_dashboard_summary():
                  
                 (SELECT COUNT(*) 
                  FROM monthly_bills 
-                 WHERE due_date < CURDATE() 
-                   AND status != 'Paid') AS overdue_bills
+                 WHERE status = 'Overdue') AS overdue_bills
         """
         
         cursor.execute(query)
@@ -129,27 +258,100 @@ def get_dashboard_summary():
         conn.close()
 
 # --- Product Management Endpoints ---
+# Fields GET /products can return (fields=...); 'images' holds the resized image URLs
+PRODUCT_LIST_FIELDS = ('product_id', 'name', 'description', 'price', 'stock_quantity', 'images')
+PRODUCT_PAGE_LIMIT = 500
+
+def encode_product_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_product_cursor(cursor):
+    """Returns the catalog_snapshot.sort_key() a cursor continues after; raises ValueError if it is not one."""
+    try:
+        name_key, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(name_key, str) or not isinstance(product_id, int):
+        raise ValueError("Invalid cursor")
+    return name_key, product_id
+
 @app.route('/products', methods=['GET'])
+@table_versions.versioned('products')
 def get_all_products():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    cursor = conn.cursor(dictionary=True)
+    """
+    Lists products by name. Optional parameters:
+      q         name search: every word must start a word of the name
+      in_stock  true/false: only products with / without stock
+      fields    comma-separated subset of PRODUCT_LIST_FIELDS
+      limit     page size (up to PRODUCT_PAGE_LIMIT); with it, the response is
+                {"products": [...], "total": n, "next_cursor": c}
+      cursor    next_cursor of the previous page, or
+      page      1-based page number
+    Without limit/cursor/page the whole list is returned, as before.
+    """
+    fields = PRODUCT_LIST_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(f.strip() for f in request.args['fields'].split(',') if f.strip())
+        unknown = [f for f in fields if f not in PRODUCT_LIST_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PRODUCT_LIST_FIELDS)}"}), 400
+
+    in_stock = request.args.get('in_stock')
+    if in_stock is not None and in_stock.lower() not in ('true', '1', 'false', '0'):
+        return jsonify({"error": "in_stock must be true or false"}), 400
+
+    paged = any(name in request.args for name in ('limit', 'cursor', 'page'))
     try:
-        # Includes image_url as specified in schema
-        cursor.execute("SELECT product_id, name, description, price, stock_quantity, image_url FROM products ORDER BY name")
-        products = cursor.fetchall()
-        for product in products:
-            product['price'] = format_datetime(product['price'])
-            # Create absolute URL for images
-            if product['image_url']:
-                product['image_url'] = url_for('send_upload', filename=product['image_url'], _external=True)
-        return jsonify(products)
+        limit = int(request.args.get('limit', 50))
+        page = int(request.args.get('page', 1))
+        after = decode_product_cursor(request.args['cursor']) if 'cursor' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid paging parameters: {e}"}), 400
+    if not 1 <= limit <= PRODUCT_PAGE_LIMIT or page < 1:
+        return jsonify({"error": f"limit must be 1-{PRODUCT_PAGE_LIMIT} and page at least 1"}), 400
+
+    try:
+        # Read from the shared catalog snapshot; while it is older than the products
+        # version it is still served (without an ETag) and rebuilt in the background
+        products_version = table_versions.request_version('products')
+        snapshot = catalog_snapshot.current(min_version=products_version)
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    except (RuntimeError, OSError) as e:
+        app.logger.error(f"Catalog snapshot unavailable: {e}")
+        return jsonify({"error": f"Product catalog unavailable: {e}"}), 500
+    if snapshot is None:
+        return jsonify({"error": "Product catalog unavailable"}), 500
+    if products_version is not None and snapshot.version < products_version:
+        table_versions.mark_stale()
+
+    numbers = snapshot.search(request.args['q']) if request.args.get('q') else range(len(snapshot))
+    if in_stock is not None:
+        wanted = in_stock.lower() in ('true', '1')
+        numbers = [n for n in numbers if (snapshot.stock_levels(n)[0] > 0) == wanted]
+    total = len(numbers)
+    if paged:
+        if after is not None:
+            start = bisect.bisect_left(numbers, snapshot.position_after(after))
+        else:
+            start = (page - 1) * limit
+        numbers = numbers[start:start + limit]
+        has_more = start + limit < total
+
+    columns = [f for f in fields if f != 'images'] + (['image_url'] if 'images' in fields else [])
+    products = []
+    for number in numbers:
+        product = snapshot.record(number, columns)
+        if 'images' in fields:
+            # Listings link to resized images only; the original is in GET /products/<id>
+            image_file = product.pop('image_url')
+            product['images'] = product_image_urls(image_file) if image_file else None
+        products.append(product)
+
+    if not paged:
+        return jsonify(products)
+    next_cursor = encode_product_cursor(snapshot.sort_key(numbers[-1])) if numbers and has_more else None
+    return jsonify({"products": products, "total": total, "next_cursor": next_cursor})
 
 @app.route('/products', methods=['POST'])
 def add_new_product():
@@ -164,15 +366,12 @@ def add_new_product():
     if 'image_file' in request.files:
         file = request.files['image_file']
         if file and file.filename != '' and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            # Ensure unique filename to avoid overwrites
-            base, ext = os.path.splitext(filename)
-            unique_filename = f"{base}_{int(datetime.now().timestamp())}{ext}"
-            
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(save_path)
+            # Stored under its content hash; re-uploading the same image reuses the stored file
+            try:
+                image_url_to_save, _ = upload_storage.store_upload(file, app.config['UPLOAD_FOLDER'])
+            except upload_storage.UploadRejected as e:
+                return jsonify({"error": str(e)}), e.http_status
             # We save the *relative path* to the DB, not the full URL
-            image_url_to_save = unique_filename 
 
     conn = get_db_connection()
     if not conn:
@@ -187,8 +386,12 @@ def add_new_product():
     )
     try:
         cursor.execute(query, values)
+        table_versions.bump(cursor, 'products')
         conn.commit()
         new_product_id = cursor.lastrowid
+        catalog_snapshot.publish_in_background()
+        if image_url_to_save:
+            product_images.build_in_background(app.config['UPLOAD_FOLDER'], image_url_to_save)
         return jsonify({"message": "Product added successfully", "product_id": new_product_id}), 201
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
@@ -196,6 +399,30 @@ def add_new_product():
         cursor.close()
         conn.close()
 
+@app.route('/products/import', methods=['POST'])
+def import_products_endpoint():
+    """
+    Creates and updates products from an uploaded CSV or XLSX sheet ('file').
+    ?dry_run=true validates and matches every row without writing anything.
+    Answers with product_import's row-level report.
+    """
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({"error": "No file uploaded"}), 400
+    dry_run = request.args.get('dry_run', '').lower() in ('true', '1')
+    try:
+        report = product_import.import_products(file, dry_run=dry_run)
+    except product_import.ImportRejected as e:
+        return jsonify({"error": str(e)}), e.http_status
+    except (mysql.connector.Error, RuntimeError) as err:
+        return jsonify({"error": str(err)}), 500
+    if not dry_run and (report['created'] or report['updated']):
+        catalog_snapshot.publish_in_background()
+    if not report['complete']:
+        report['error'] = report['stopped']
+        return jsonify(report), 500
+    return jsonify(report), 200
+
 @app.route('/products/<int:product_id>', methods=['GET'])
 def get_product_by_id(product_id):
     conn = get_db_connection()
@@ -208,6 +435,7 @@ def get_product_by_id(product_id):
         if product:
             product['price'] = format_datetime(product['price'])
             # Create absolute URL for image
+            product['images'] = product_image_urls(product['image_url']) if product['image_url'] else None
             if product['image_url']:
                 product['image_url'] = url_for('send_upload', filename=product['image_url'], _external=True)
             return jsonify(product)
@@ -227,20 +455,20 @@ def update_product(product_id):
 
     data = request.form
     image_url_to_save = data.get('image_url') # Default to existing URL
+    new_image_uploaded = False
 
     # Check for a new image file
     if 'image_file' in request.files:
         file = request.files['image_file']
         if file and file.filename != '' and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            base, ext = os.path.splitext(filename)
-            unique_filename = f"{base}_{int(datetime.now().timestamp())}{ext}"
-            
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(save_path)
+            # Stored under its content hash; re-uploading the same image reuses the stored file
+            try:
+                image_url_to_save, _ = upload_storage.store_upload(file, app.config['UPLOAD_FOLDER'])
+            except upload_storage.UploadRejected as e:
+                return jsonify({"error": str(e)}), e.http_status
             # We save the *relative path* to the DB
-            image_url_to_save = unique_filename
-            # TODO: Add logic here to delete the *old* image file if it exists
+            new_image_uploaded = True
+            # The replaced image is removed by upload_gc once no product references it
 
     conn = get_db_connection()
     if not conn:
@@ -270,7 +498,11 @@ def update_product(product_id):
         cursor.execute(query, tuple(values))
         if cursor.rowcount == 0:
             return jsonify({"error": "Product not found"}), 404
+        table_versions.bump(cursor, 'products')
         conn.commit()
+        catalog_snapshot.publish_in_background()
+        if new_image_uploaded:
+            product_images.build_in_background(app.config['UPLOAD_FOLDER'], image_url_to_save)
         return jsonify({"message": "Product updated successfully"}), 200
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
@@ -283,31 +515,24 @@ def delete_product(product_id):
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
-    cursor = conn.cursor(dictionary=True) # Use dictionary cursor to get image_url
+    cursor = conn.cursor(dictionary=True)
     try:
         # First, check for associated orders
         cursor.execute("SELECT COUNT(*) as count FROM order_items WHERE product_id = %s", (product_id,))
         if cursor.fetchone()['count'] > 0:
             return jsonify({"error": "Cannot delete product because it is part of an existing order."}), 409
         
-        # Get the image_url before deleting
-        cursor.execute("SELECT image_url FROM products WHERE product_id = %s", (product_id,))
-        product = cursor.fetchone()
-        
         # Delete the product from DB
         cursor.execute("DELETE FROM products WHERE product_id = %s", (product_id,))
         if cursor.rowcount == 0:
             return jsonify({"error": "Product not found"}), 404
         
+        table_versions.bump(cursor, 'products')
         conn.commit()
+        catalog_snapshot.publish_in_background()
         
-        # If delete was successful, try to delete the image file
-        if product and product['image_url']:
-            try:
-                os.remove(os.path.join(app.config['UPLOAD_FOLDER'], product['image_url']))
-            except OSError as e:
-                app.logger.error(f"Error deleting image file {product['image_url']}: {e}")
-
+        # The image file and its derivatives are left to upload_gc: the stored file is
+        # content-addressed and may be shared, or reused by an upload not yet committed
         return jsonify({"message": "Product deleted successfully"}), 200
     except mysql.connector.Error as err:
         return jsonify({"error": str(err)}), 500
@@ -316,6 +541,16 @@ def delete_product(product_id):
         conn.close()
 
 # --- Order Management Endpoints ---
+# The client's override, else the rate in the client's price list (NULL: use the product's price).
+# Primary-key lookups only: clients, client_pricing (client_id, product_id), price_list_items (price_list_id, product_id).
+EFFECTIVE_PRICE_QUERY = """
+    SELECT COALESCE(cp.custom_price, pli.price) AS price
+    FROM clients c
+    LEFT JOIN client_pricing cp ON cp.client_id = c.client_id AND cp.product_id = %s
+    LEFT JOIN price_list_items pli ON pli.price_list_id = c.price_list_id AND pli.product_id = %s
+    WHERE c.client_id = %s
+"""
+
 @app.route('/orders', methods=['POST'])
 def create_new_order():
     data = request.get_json()
@@ -337,9 +572,11 @@ def create_new_order():
                 raise Exception(f"Product with ID {item['product_id']} not found.")
             if product['stock_quantity'] < item['quantity']:
                 raise Exception(f"Not enough stock for {product['name']}. Requested: {item['quantity']}, Available: {product['stock_quantity']}")
-            cursor.execute("SELECT custom_price FROM client_pricing WHERE client_id = %s AND product_id = %s", (client_id, item['product_id']))
-            custom_price_row = cursor.fetchone()
-            final_price = custom_price_row['custom_price'] if custom_price_row else product['price']
+            cursor.execute(EFFECTIVE_PRICE_QUERY, (item['product_id'], item['product_id'], client_id))
+            price_row = cursor.fetchone()
+            if not price_row:
+                raise Exception(f"Client with ID {client_id} not found.")
+            final_price = price_row['price'] if price_row['price'] is not None else product['price']
             order_items_to_insert.append({'product_id': item['product_id'], 'quantity': item['quantity'], 'price_per_unit': final_price})
         
         # This INSERT is correct. It omits 'status' and lets the DB
@@ -353,7 +590,9 @@ def create_new_order():
             cursor.execute(item_query, (new_order_id, item_data['product_id'], item_data['quantity'], item_data['price_per_unit']))
             stock_update_query = "UPDATE products SET stock_quantity = stock_quantity - %s WHERE product_id = %s"
             cursor.execute(stock_update_query, (item_data['quantity'], item_data['product_id']))
+        table_versions.bump(cursor, 'orders', 'products')
         conn.commit()
+        catalog_snapshot.publish_in_background()
         return jsonify({"message": "Order created successfully", "order_id": new_order_id}), 201
     except Exception as e:
         conn.rollback()
@@ -363,6 +602,7 @@ def create_new_order():
         conn.close()
 
 @app.route('/orders', methods=['GET'])
+@table_versions.versioned('orders', 'clients')
 def get_all_orders():
     conn = get_db_connection()
     if not conn:
@@ -496,7 +736,9 @@ def delete_order(order_id):
         cursor.execute("DELETE FROM order_items WHERE order_id = %s", (order_id,))
         cursor.execute("DELETE FROM orders WHERE order_id = %s", (order_id,))
         
+        table_versions.bump(cursor, 'orders', 'products')
         conn.commit()
+        catalog_snapshot.publish_in_background()
         return jsonify({"message": "Order deleted and stock has been restocked."}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -507,6 +749,7 @@ def delete_order(order_id):
 
 # --- Client Management (CRM) Endpoints ---
 @app.route('/clients', methods=['GET'])
+@table_versions.versioned('clients')
 def get_all_clients():
     conn = get_db_connection()
     if not conn:
@@ -529,14 +772,18 @@ def add_new_client():
         return jsonify({"error": "No input data provided"}), 400
     if 'username' not in client_data or 'company_name' not in client_data:
         return jsonify({"error": "Missing required fields: username and company_name"}), 400
+    invoice_line_mode = client_data.get('invoice_line_mode', 'itemized')
+    if invoice_line_mode not in INVOICE_LINE_MODES:
+        return jsonify({"error": f"Invalid invoice_line_mode. Use one of: {', '.join(INVOICE_LINE_MODES)}"}), 400
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor()
-    query = "INSERT INTO clients (username, company_name) VALUES (%s, %s)"
-    values = (client_data['username'], client_data['company_name'])
+    query = "INSERT INTO clients (username, company_name, invoice_line_mode) VALUES (%s, %s, %s)"
+    values = (client_data['username'], client_data['company_name'], invoice_line_mode)
     try:
         cursor.execute(query, values)
+        table_versions.bump(cursor, 'clients')
         conn.commit()
         new_client_id = cursor.lastrowid
         return jsonify({"message": "Client registered successfully", "client_id": new_client_id}), 201
@@ -555,7 +802,7 @@ def get_client_by_id(client_id):
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor(dictionary=True)
     try:
-        cursor.execute("SELECT client_id, username, company_name, created_at FROM clients WHERE client_id = %s", (client_id,))
+        cursor.execute("SELECT client_id, username, company_name, invoice_line_mode, price_list_id, created_at FROM clients WHERE client_id = %s", (client_id,))
         client = cursor.fetchone()
         if client:
             if 'created_at' in client and client['created_at']:
@@ -574,13 +821,15 @@ def update_client(client_id):
     data = request.get_json()
     if not data:
         return jsonify({"error": "No input data provided"}), 400
+    if 'invoice_line_mode' in data and data['invoice_line_mode'] not in INVOICE_LINE_MODES:
+        return jsonify({"error": f"Invalid invoice_line_mode. Use one of: {', '.join(INVOICE_LINE_MODES)}"}), 400
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor()
     update_fields = []
     values = []
-    allowed_fields = ['company_name']
+    allowed_fields = ['company_name', 'invoice_line_mode']
     for key, value in data.items():
         if key in allowed_fields:
             update_fields.append(f"{key} = %s")
@@ -593,6 +842,7 @@ def update_client(client_id):
         cursor.execute(query, tuple(values))
         if cursor.rowcount == 0:
             return jsonify({"error": "Client not found"}), 404
+        table_versions.bump(cursor, 'clients')
         conn.commit()
         return jsonify({"message": "Client updated successfully"}), 200
     except mysql.connector.Error as err:
@@ -614,6 +864,7 @@ def delete_client(client_id):
         cursor.execute("DELETE FROM clients WHERE client_id = %s", (client_id,))
         if cursor.rowcount == 0:
             return jsonify({"error": "Client not found"}), 404
+        table_versions.bump(cursor, 'clients')
         conn.commit()
         return jsonify({"message": "Client deleted successfully"}), 200
     except mysql.connector.Error as err:
@@ -623,6 +874,7 @@ def delete_client(client_id):
         conn.close()
 
 @app.route('/clients/<int:client_id>/orders', methods=['GET'])
+@table_versions.versioned('orders')
 def get_orders_for_client(client_id):
     conn = get_db_connection()
     if not conn:
@@ -761,6 +1013,7 @@ def set_client_specific_price(client_id):
     query = "INSERT INTO client_pricing (client_id, product_id, custom_price) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE custom_price = VALUES(custom_price)"
     try:
         cursor.execute(query, (client_id, product_id, custom_price))
+        table_versions.bump(cursor, 'client_pricing')
         conn.commit()
         return jsonify({"message": "Custom price set successfully"}), 200
     except mysql.connector.Error as err:
@@ -769,7 +1022,56 @@ def set_client_specific_price(client_id):
         cursor.close()
         conn.close()
 
+@app.route('/clients/<int:client_id>/pricing', methods=['PUT'])
+def update_client_prices(client_id):
+    """
+    Applies a set of custom price changes for one client in a single transaction:
+    {"upserts": [{"product_id": 1, "custom_price": 9.5}, ...], "deletes": [2, 3, ...]}
+    Either list may be omitted. Nothing is changed if any entry is invalid.
+    """
+    try:
+        prices, delete_ids = parse_price_changes(request.get_json(silent=True), 'custom_price')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not prices and not delete_ids:
+        return jsonify({"message": "No changes", "upserted": 0, "deleted": 0}), 200
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT client_id FROM clients WHERE client_id = %s", (client_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Client not found"}), 404
+        unknown = unknown_products(cursor, prices.keys())
+        if unknown:
+            return jsonify({"error": f"Unknown product_id(s): {unknown}"}), 400
+        if prices:
+            # One multi-row statement for the whole set
+            cursor.executemany(
+                "INSERT INTO client_pricing (client_id, product_id, custom_price) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE custom_price = VALUES(custom_price)",
+                [(client_id, product_id, price) for product_id, price in prices.items()]
+            )
+        deleted = 0
+        if delete_ids:
+            placeholders = ', '.join(['%s'] * len(delete_ids))
+            cursor.execute(f"DELETE FROM client_pricing WHERE client_id = %s AND product_id IN ({placeholders})",
+                           (client_id, *delete_ids))
+            deleted = cursor.rowcount
+        table_versions.bump(cursor, 'client_pricing')
+        conn.commit()
+        return jsonify({"message": "Custom prices saved", "upserted": len(prices), "deleted": deleted}), 200
+    except mysql.connector.Error as err:
+        conn.rollback()
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 @app.route('/clients/<int:client_id>/pricing', methods=['GET'])
+@table_versions.versioned('client_pricing', 'products')
 def get_client_specific_prices(client_id):
     conn = get_db_connection()
     if not conn:
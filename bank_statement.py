@@ -0,0 +1,146 @@
+# bank_statement.py
+# Parses bank statement CSV exports and matches their credits to unpaid monthly bills.
+# Banks name their columns differently, so headers are matched against a list of
+# common aliases. Matching prefers the bill number (see bill_numbers.py) quoted in the
+# transaction narration; otherwise a credit is matched when exactly one unpaid bill
+# has the same amount.
+
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from bill_numbers import BILL_NO_PATTERN, format_bill_no
+
+DATE_COLUMNS = ('date', 'txn date', 'transaction date', 'value date', 'posting date')
+REFERENCE_COLUMNS = ('description', 'narration', 'particulars', 'remarks', 'reference', 'details')
+CREDIT_COLUMNS = ('credit', 'credit amount', 'deposit', 'deposit amount', 'cr', 'amount')
+
+DATE_FORMATS = ('%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d', '%d-%b-%Y', '%d %b %Y', '%d-%m-%y', '%d/%m/%y')
+
+AMOUNT_TOLERANCE = Decimal('0.01')
+
+
+def _find_column(fieldnames, candidates):
+    normalized = {name.strip().lower(): name for name in fieldnames if name}
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized[candidate]
+    return None
+
+
+def _parse_amount(value):
+    if value is None:
+        return None
+    cleaned = value.replace(',', '').replace('₹', '').strip()
+    if cleaned.upper().endswith('CR'):
+        cleaned = cleaned[:-2].strip()
+    if not cleaned:
+        return None
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        return None
+    return amount if amount > 0 else None
+
+
+def _parse_date(value):
+    value = (value or '').strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_statement_csv(file_storage):
+    """
+    Reads credit transactions from an uploaded CSV bank statement.
+    Returns a list of {"row", "date", "reference", "amount"} dicts.
+    Raises ValueError if the file has no recognisable amount column.
+    """
+    text_stream = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        reader = csv.DictReader(text_stream)
+        if not reader.fieldnames:
+            raise ValueError("The statement file is empty.")
+
+        date_col = _find_column(reader.fieldnames, DATE_COLUMNS)
+        reference_col = _find_column(reader.fieldnames, REFERENCE_COLUMNS)
+        credit_col = _find_column(reader.fieldnames, CREDIT_COLUMNS)
+        if not credit_col:
+            raise ValueError(f"Could not find a credit/amount column. Expected one of: {', '.join(CREDIT_COLUMNS)}")
+
+        credits = []
+        for row_number, row in enumerate(reader, start=2): # Row 1 is the header
+            amount = _parse_amount(row.get(credit_col))
+            if amount is None:
+                continue # Debits and blank lines
+            credits.append({
+                "row": row_number,
+                "date": _parse_date(row.get(date_col)) if date_col else None,
+                "reference": (row.get(reference_col) or '').strip() if reference_col else '',
+                "amount": amount,
+            })
+        return credits
+    finally:
+        # Leaves the upload's stream open: the wrapper would otherwise close it when garbage-collected
+        text_stream.detach()
+
+
+def match_credits_to_bills(credits, unpaid_bills):
+    """
+    Proposes one bill per credit. `unpaid_bills` rows need bill_id, billing_period,
+    total_amount and client_name. Each bill is matched at most once; a later credit
+    quoting an already matched bill is reported as a duplicate.
+    Returns (matches, unmatched).
+    """
+    bills_by_id = {bill['bill_id']: bill for bill in unpaid_bills}
+    bills_by_amount = {}
+    for bill in unpaid_bills:
+        bills_by_amount.setdefault(Decimal(bill['total_amount']).quantize(AMOUNT_TOLERANCE), []).append(bill)
+
+    matched_ids = set()
+    matches = []
+    unmatched = []
+
+    def _propose(credit, bill, match_type):
+        matched_ids.add(bill['bill_id'])
+        matches.append({
+            **credit,
+            "bill_id": bill['bill_id'],
+            "bill_no_formatted": format_bill_no(bill['billing_period'], bill['bill_id']),
+            "client_name": bill['client_name'],
+            "bill_amount": bill['total_amount'],
+            "match_type": match_type,
+        })
+
+    # Pass 1: explicit bill numbers in the narration
+    remaining = []
+    for credit in credits:
+        ref_match = BILL_NO_PATTERN.search(credit['reference'])
+        bill = bills_by_id.get(int(ref_match.group(2))) if ref_match else None
+        if bill and bill['billing_period'].replace('-', '') == ref_match.group(1):
+            if bill['bill_id'] in matched_ids:
+                # Most likely the same payment listed twice; never move it to another bill by amount
+                unmatched.append({**credit, "reason": f"Duplicate: {format_bill_no(bill['billing_period'], bill['bill_id'])} is already matched to an earlier credit."})
+            elif abs(Decimal(bill['total_amount']) - credit['amount']) <= AMOUNT_TOLERANCE:
+                _propose(credit, bill, 'reference')
+            else:
+                unmatched.append({**credit, "reason": f"Amount does not match {format_bill_no(bill['billing_period'], bill['bill_id'])} ({bill['total_amount']})."})
+            continue
+        remaining.append(credit)
+
+    # Pass 2: unique amount among the bills that are still open
+    for credit in remaining:
+        candidates = [bill for bill in bills_by_amount.get(credit['amount'].quantize(AMOUNT_TOLERANCE), [])
+                      if bill['bill_id'] not in matched_ids]
+        if len(candidates) == 1:
+            _propose(credit, candidates[0], 'amount')
+        elif candidates:
+            unmatched.append({**credit, "reason": f"{len(candidates)} unpaid bills have this amount; add the bill number to match."})
+        else:
+            unmatched.append({**credit, "reason": "No unpaid bill with this amount or reference."})
+
+    return matches, unmatched
@@ -0,0 +1,192 @@
+# benchmarks/pdf_benchmarks.py
+# Timing benchmarks for PDF generation, using only local data
+# (the synthetic documents of pdf_fixtures.py; no database needed).
+# The template parity check renders pages with PyMuPDF when it is installed.
+# Engine layout parity is a test: python -m pytest tests/test_pdf_engine_parity.py
+#
+# Usage (from the repository root):
+#   python benchmarks/pdf_benchmarks.py [--repeat N]
+
+import argparse
+import warnings
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+import pdf_generator
+import pdf_templates
+import pdf_fonts
+import pdf_assets
+from fpdf import FPDF
+from pdf_generator import create_monthly_bill_pdf, create_challan_pdf
+from config import COMPANY_DETAILS, PDF_ENGINES
+from pdf_fixtures import make_bill, make_challan, ENGINE_DOCUMENTS
+
+# pdf_generator still uses the fpdf 1.x call style; keep the output readable
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+warnings.filterwarnings("ignore", message="Dimensions for page format")
+
+# --- Timing helpers ---
+
+def time_call(func, repeat):
+    """Returns (best_ms, mean_ms) over `repeat` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), sum(timings) / len(timings)
+
+def print_row(label, best_ms, mean_ms):
+    print(f"  {label:<38} best {best_ms:8.2f} ms   mean {mean_ms:8.2f} ms")
+
+# --- Header/footer image handling ---
+
+class LegacyImagePDF(pdf_generator.PDF):
+    """The original header/footer: open, convert and re-encode each PNG on every page."""
+    images_drawn = 0
+
+    def _legacy_image(self, filename, y):
+        LegacyImagePDF.images_drawn += 1
+        with Image.open(os.path.join(pdf_assets.ASSET_DIR, filename)) as img:
+            rgb_img = img.convert('RGB')
+            with io.BytesIO() as temp_img_buffer:
+                rgb_img.save(temp_img_buffer, format='PNG')
+                temp_img_buffer.seek(0)
+                page_width = self.w - self.l_margin - self.r_margin
+                self.image(temp_img_buffer, x=self.l_margin, y=y, w=page_width, type='PNG')
+
+    def header(self):
+        self._legacy_image('Bill Header.png', 8)
+        self.set_y(45)
+        self.set_font("Helvetica", "B", 14)
+        self.cell(0, 8, self.doc_title, 0, 1, "C")
+        self.ln(2)
+
+    def footer(self):
+        self._legacy_image('Bill Footer.png', self.h - 20 - 15)
+
+def bench_header_assets(repeat):
+    """Compares the legacy per-page image re-encoding with the prepared asset registry."""
+    bill_data, items = make_bill(20)
+    render = lambda: create_monthly_bill_pdf(COMPANY_DETAILS, bill_data, items, engine='fpdf')
+
+    print("Header/footer images (monthly bill, 20 lines):")
+    # Documents are created through ENGINE_CLASSES, so that is where the class is swapped
+    original_pdf_class = pdf_generator.ENGINE_CLASSES['fpdf']
+    pdf_generator.ENGINE_CLASSES['fpdf'] = LegacyImagePDF
+    LegacyImagePDF.images_drawn = 0
+    try:
+        legacy = time_call(lambda: create_monthly_bill_pdf(COMPANY_DETAILS, bill_data, items, engine='fpdf'), repeat)
+    finally:
+        pdf_generator.ENGINE_CLASSES['fpdf'] = original_pdf_class
+    assert LegacyImagePDF.images_drawn >= 2 * repeat, "the legacy header/footer was not used"
+    print_row("legacy (re-encode per page)", *legacy)
+
+    render() # Prepare the assets outside the timed runs, as a warm worker would have
+    registry = time_call(render, repeat)
+    print_row("asset registry", *registry)
+    print(f"  speed-up: {legacy[1] / registry[1]:.1f}x")
+
+# --- Page templates ---
+
+def _render_pages(pdf_buffer):
+    """Rasterizes every page, or returns None if PyMuPDF is not installed."""
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+    doc = pymupdf.open(stream=pdf_buffer.getvalue(), filetype='pdf')
+    return [page.get_pixmap(dpi=150).samples for page in doc]
+
+def _with_templates(enabled, func):
+    previous = pdf_templates.TEMPLATES_ENABLED
+    pdf_templates.TEMPLATES_ENABLED = enabled
+    try:
+        return func()
+    finally:
+        pdf_templates.TEMPLATES_ENABLED = previous
+
+def bench_templates(repeat):
+    """Compares drawing the static page skeleton live with replaying the recorded template."""
+    documents = [
+        ("monthly bill, 20 lines", lambda: create_monthly_bill_pdf(COMPANY_DETAILS, *make_bill(20))),
+        ("challan, 12 lines", lambda: create_challan_pdf(COMPANY_DETAILS, *make_challan(12))),
+    ]
+    print("Page templates:")
+    for label, render in documents:
+        live = _with_templates(False, lambda: time_call(render, repeat))
+        render() # Record the skeleton outside the timed runs
+        templated = _with_templates(True, lambda: time_call(render, repeat))
+        print_row(f"{label}, live", *live)
+        print_row(f"{label}, template", *templated)
+        print(f"  speed-up: {live[1] / templated[1]:.1f}x")
+
+        live_pages = _with_templates(False, lambda: _render_pages(render()))
+        if live_pages is None:
+            print("  parity: skipped (pip install pymupdf to compare rendered pages)")
+        elif live_pages == _with_templates(True, lambda: _render_pages(render())):
+            print("  parity: rendered pages identical")
+        else:
+            print("  parity: RENDERED PAGES DIFFER")
+
+# --- Fonts ---
+
+def bench_fonts(repeat):
+    """Compares parsing the challan font on every document with the font registry."""
+    font_path = os.path.join(pdf_fonts.FONT_DIR, pdf_fonts.FONT_FILES["Elephant"])
+    print("Challan font (Elephant):")
+    parse = time_call(lambda: FPDF().add_font("Elephant", "", font_path), repeat)
+    print_row("add_font per document", *parse)
+    pdf_fonts.preload_all()
+    registry = time_call(lambda: pdf_fonts.add_font(FPDF(), "Elephant"), repeat)
+    print_row("font registry", *registry)
+    print(f"  speed-up: {parse[1] / registry[1]:.1f}x   registry stats: {pdf_fonts.stats()}")
+
+# --- Output size ---
+
+def bench_output_size():
+    """Reports the byte size of each document type with full and compact embedded images."""
+    documents = [
+        ("monthly bill, 20 lines", lambda: create_monthly_bill_pdf(COMPANY_DETAILS, *make_bill(20))),
+        ("challan, 12 lines", lambda: create_challan_pdf(COMPANY_DETAILS, *make_challan(12))),
+    ]
+    print("Output size:")
+    original_mode = pdf_assets.PDF_OUTPUT_MODE
+    try:
+        for label, render in documents:
+            sizes = {}
+            for mode in pdf_assets.PDF_OUTPUT_MODES:
+                pdf_assets.set_output_mode(mode)
+                sizes[mode] = len(render().getvalue())
+            saved = 100 * (1 - sizes['compact'] / sizes['full'])
+            print(f"  {label:<38} full {sizes['full']:8,d} B   compact {sizes['compact']:8,d} B   ({saved:.0f}% smaller)")
+    finally:
+        pdf_assets.set_output_mode(original_mode)
+
+
+# --- Engines ---
+
+def bench_engines(repeat):
+    """Times each PDF engine on the same documents (layout parity: tests/test_pdf_engine_parity.py)."""
+    print("Engines:")
+    for label, render in ENGINE_DOCUMENTS:
+        for engine in PDF_ENGINES:
+            render(engine) # Warms the asset, font and template caches
+            print_row(f"{label}, {engine}", *time_call(lambda: render(engine), repeat))
+            print(f"  size: {len(render(engine).getvalue()):,} bytes")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PDF generation benchmarks")
+    parser.add_argument('--repeat', type=int, default=20, help="runs per measurement")
+    args = parser.parse_args()
+    bench_header_assets(args.repeat)
+    bench_templates(args.repeat)
+    bench_fonts(args.repeat)
+    bench_output_size()
+    bench_engines(args.repeat)
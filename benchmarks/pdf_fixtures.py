@@ -0,0 +1,50 @@
+# benchmarks/pdf_fixtures.py
+# Synthetic bills and challans (COMPANY_DETAILS plus generated line items; no
+# database needed), shared by the benchmarks and tests/test_pdf_engine_parity.py.
+# Importing this module has no side effects: the importer puts the repository
+# root on sys.path.
+
+from datetime import date, timedelta
+
+from pdf_generator import create_monthly_bill_pdf, create_challan_pdf
+from config import COMPANY_DETAILS
+
+
+def make_bill(num_lines):
+    start = date(2025, 1, 1)
+    items = []
+    for i in range(num_lines):
+        quantity = (i % 7) + 1
+        rate = 10.0 + (i % 13) * 5
+        items.append({
+            'name': f"Product {i + 1:04d}",
+            'quantity': quantity,
+            'price_per_unit': rate,
+            'item_total': quantity * rate,
+            'challan_date': start + timedelta(days=i % 28),
+        })
+    bill_data = {
+        'bill_no_formatted': 'AKM-SP202501-1',
+        'billing_date': '01-02-2025',
+        'client_name': 'Benchmark Traders Pvt. Ltd.',
+    }
+    return bill_data, items
+
+def make_challan(num_lines):
+    _, items = make_bill(num_lines)
+    challan_data = {
+        'challan_id': 7,
+        'challan_date': date(2025, 1, 15),
+        'company_name': 'Benchmark Traders Pvt. Ltd.',
+        'total_amount': sum(item['item_total'] for item in items),
+    }
+    return challan_data, items
+
+# The same documents through each engine: timed by pdf_benchmarks.bench_engines,
+# compared by the engine parity test
+ENGINE_DOCUMENTS = [
+    ("monthly bill, 1 line", lambda engine: create_monthly_bill_pdf(COMPANY_DETAILS, *make_bill(1), engine=engine)),
+    ("monthly bill, 20 lines", lambda engine: create_monthly_bill_pdf(COMPANY_DETAILS, *make_bill(20), engine=engine)),
+    ("challan, 1 line", lambda engine: create_challan_pdf(COMPANY_DETAILS, *make_challan(1), engine=engine)),
+    ("challan, 12 lines", lambda engine: create_challan_pdf(COMPANY_DETAILS, *make_challan(12), engine=engine)),
+]
@@ -0,0 +1,169 @@
+# benchmarks/pdf_suite.py
+# Regression suite for PDF rendering at realistic sizes.
+# Renders synthetic bills and challans with 1, 20, 200 and 2,000 lines using
+# only local data, records wall time (median of the timed runs), peak Python
+# memory and output size, and compares them with the stored baseline
+# (benchmarks/pdf_baseline.json).
+# Note: the bill layout prints at most 20 lines and the challan layout 12, so
+# the larger cases measure the cost of the input size, not of extra pages.
+#
+# Usage (from the repository root):
+#   python benchmarks/pdf_suite.py                     # compare with the baseline
+#   python benchmarks/pdf_suite.py --update-baseline   # record a new baseline
+# Exits with status 1 if any measurement regressed beyond its tolerance.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_fixtures import make_bill, make_challan
+from pdf_generator import create_monthly_bill_pdf, create_challan_pdf
+from config import COMPANY_DETAILS
+
+# pdf_generator still uses the fpdf 1.x call style; keep the output readable
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+warnings.filterwarnings("ignore", message="Dimensions for page format")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf_baseline.json")
+
+LINE_COUNTS = (1, 20, 200, 2000)
+
+# Allowed growth over the baseline before a measurement counts as a regression.
+# Timings vary between runs and machines, so the median run is compared, with the widest margin.
+TOLERANCES = {
+    "median_ms": 0.25,
+    "peak_kib": 0.10,
+    "size_bytes": 0.01,
+}
+
+# A few milliseconds of scheduling noise is a large fraction of the fastest cases
+# (a 1-line bill takes ~3 ms), so a timing must also grow by this much to count
+TIME_SLACK_MS = 3.0
+
+
+def _cases():
+    for num_lines in LINE_COUNTS:
+        yield f"bill/{num_lines}", (lambda n=num_lines: create_monthly_bill_pdf(COMPANY_DETAILS, *make_bill(n)))
+    for num_lines in LINE_COUNTS:
+        yield f"challan/{num_lines}", (lambda n=num_lines: create_challan_pdf(COMPANY_DETAILS, *make_challan(n)))
+
+
+def _peak_memory_kib(render):
+    tracemalloc.start()
+    try:
+        render()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def _timings_ms(render, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def measure(repeat):
+    """Returns {case: {"median_ms", "best_ms", "peak_kib", "size_bytes"}}."""
+    results = {}
+    for name, render in _cases():
+        size_bytes = len(render().getvalue()) # Also warms the asset, font and template caches
+        timings = _timings_ms(render, repeat)
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "best_ms": round(min(timings), 3),
+            "peak_kib": round(_peak_memory_kib(render), 1),
+            "size_bytes": size_bytes,
+        }
+    return results
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results, repeat):
+    baseline = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": results,
+    }
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _delta(current, previous):
+    if not previous:
+        return 0.0
+    return (current - previous) / previous
+
+
+def report(results, baseline):
+    """Prints the results next to the baseline. Returns the list of regressions."""
+    base_results = (baseline or {}).get("results", {})
+    regressions = []
+    print(f"{'case':<16}{'median ms':>20}{'peak KiB':>20}{'size B':>20}")
+    for name, current in results.items():
+        previous = base_results.get(name)
+        cells = []
+        for metric in ("median_ms", "peak_kib", "size_bytes"):
+            value = current[metric]
+            text = f"{value:,.1f}" if metric != "size_bytes" else f"{value:,d}"
+            if previous and metric in previous:
+                change = _delta(value, previous[metric])
+                text += f" {change:+.0%}"
+                within_slack = metric == "median_ms" and value - previous[metric] <= TIME_SLACK_MS
+                if change > TOLERANCES[metric] and not within_slack:
+                    text += "!"
+                    regressions.append(f"{name} {metric}: {previous[metric]} -> {value} ({change:+.0%})")
+            cells.append(f"{text:>20}")
+        print(f"{name:<16}" + "".join(cells))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="PDF rendering regression suite")
+    parser.add_argument('--repeat', type=int, default=10, help="timed runs per case")
+    parser.add_argument('--time-tolerance', type=float, default=TOLERANCES['median_ms'],
+                        help="allowed slowdown as a fraction (e.g. 0.5 on a noisy machine)")
+    parser.add_argument('--update-baseline', action='store_true', help=f"store the results in {os.path.basename(BASELINE_PATH)}")
+    args = parser.parse_args()
+    TOLERANCES['median_ms'] = args.time_tolerance
+
+    results = measure(args.repeat)
+    baseline = load_baseline()
+    if baseline:
+        print(f"Baseline: {baseline['recorded_at']} (Python {baseline['python']}, {baseline['machine']})")
+    else:
+        print("No baseline stored yet; run with --update-baseline to record one.")
+    regressions = report(results, baseline)
+
+    if args.update_baseline:
+        save_baseline(results, args.repeat)
+        print(f"Baseline written to {BASELINE_PATH}")
+    elif regressions:
+        print("\nRegressions beyond tolerance:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
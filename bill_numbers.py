@@ -0,0 +1,15 @@
+# bill_numbers.py
+# The printed monthly bill number, e.g. AKM-SP202510-42 for bill 42 of October 2025.
+# Used for invoice file names and the bill PDFs (bill_routes, document_routes) and
+# to find bills quoted in bank statement narrations (bank_statement).
+
+import re
+
+# Matches bill numbers like AKM-SP202510-42; banks often drop or replace the hyphens.
+# Groups: billing period without the hyphen ('202510'), bill id ('42').
+BILL_NO_PATTERN = re.compile(r'AKM\W?SP\W?(\d{6})\W?(\d+)', re.IGNORECASE)
+
+
+def format_bill_no(billing_period, bill_id):
+    """Returns the printed bill number, e.g. ('2025-10', 42) -> 'AKM-SP202510-42'."""
+    return f"AKM-SP{billing_period.replace('-', '')}-{bill_id}"
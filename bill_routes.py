@@ -3,7 +3,7 @@
 # This file is compatible with the database_schema.sql provided.
 # UPDATED: Marking a bill as paid now updates associated orders to 'Completed'.
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request
 from db import get_db_connection
 import mysql.connector
 from datetime import datetime, date, timedelta
@@ -12,7 +12,13 @@ import logging
 
 # Import helpers from pdf_generator and config
 from pdf_generator import create_monthly_bill_pdf
-from config import COMPANY_DETAILS
+from config import COMPANY_DETAILS, DEFAULT_INVOICE_LINE_MODE, UNPAID_BILL_STATUSES
+import pdf_cache
+import pdf_pool
+import table_versions
+from report_routes import invalidate_aging_cache
+from bill_numbers import format_bill_no
+from bank_statement import parse_statement_csv, match_credits_to_bills
 
 bill_bp = Blueprint('bill_bp', __name__)
 
@@ -28,6 +34,100 @@ def format_datetime(obj):
         return float(obj)
     raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
+# --- Invoice line queries, one per clients.invoice_line_mode ---
+# The grouped modes aggregate in SQL so the database returns one row per
+# product/rate (optionally per challan date) instead of one per order item.
+# They run once, when a bill is generated, to snapshot its lines into bill_lines.
+INVOICE_ITEMS_QUERIES = {
+    'itemized': """
+        SELECT
+            p.name,
+            oi.quantity,
+            oi.price_per_unit,
+            (oi.quantity * oi.price_per_unit) as item_total,
+            ch.challan_date
+        FROM order_items oi
+        JOIN products p ON oi.product_id = p.product_id
+        JOIN orders o ON oi.order_id = o.order_id
+        JOIN challans ch ON o.associated_challan_id = ch.challan_id
+        WHERE ch.monthly_bill_id = %s
+        ORDER BY ch.challan_date, p.name
+    """,
+    'by_product': """
+        SELECT
+            p.name,
+            SUM(oi.quantity) as quantity,
+            oi.price_per_unit,
+            SUM(oi.quantity * oi.price_per_unit) as item_total,
+            NULL as challan_date
+        FROM challans ch
+        JOIN orders o ON o.associated_challan_id = ch.challan_id
+        JOIN order_items oi ON oi.order_id = o.order_id
+        JOIN products p ON oi.product_id = p.product_id
+        WHERE ch.monthly_bill_id = %s
+        GROUP BY oi.product_id, p.name, oi.price_per_unit
+        ORDER BY p.name, oi.price_per_unit
+    """,
+    'by_product_date': """
+        SELECT
+            p.name,
+            SUM(oi.quantity) as quantity,
+            oi.price_per_unit,
+            SUM(oi.quantity * oi.price_per_unit) as item_total,
+            ch.challan_date
+        FROM challans ch
+        JOIN orders o ON o.associated_challan_id = ch.challan_id
+        JOIN order_items oi ON oi.order_id = o.order_id
+        JOIN products p ON oi.product_id = p.product_id
+        WHERE ch.monthly_bill_id = %s
+        GROUP BY ch.challan_date, oi.product_id, p.name, oi.price_per_unit
+        ORDER BY ch.challan_date, p.name
+    """,
+}
+
+# Snapshotted lines of one bill (migrations/004_bill_lines.sql), read by primary key
+BILL_LINES_QUERY = """
+    SELECT name, quantity, price_per_unit, item_total, challan_date
+    FROM bill_lines
+    WHERE bill_id = %s
+    ORDER BY line_no
+"""
+
+def snapshot_bill_lines(cursor, bill_id, line_mode):
+    """
+    Copies the bill's invoice lines (grouped per `line_mode`) into bill_lines.
+    Runs inside the bill generation transaction, after the challans are linked.
+    Returns the number of lines written.
+    """
+    items_query = INVOICE_ITEMS_QUERIES.get(line_mode, INVOICE_ITEMS_QUERIES[DEFAULT_INVOICE_LINE_MODE])
+    cursor.execute(items_query, (bill_id,))
+    lines = [
+        (bill_id, line_no, row['name'], row['quantity'], row['price_per_unit'], row['item_total'], row['challan_date'])
+        for line_no, row in enumerate(cursor.fetchall(), 1)
+    ]
+    if lines:
+        cursor.executemany("""
+            INSERT INTO bill_lines (bill_id, line_no, name, quantity, price_per_unit, item_total, challan_date)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, lines)
+    return len(lines)
+
+def resnapshot_bill_lines(cursor, bill_id):
+    """
+    Rewrites a bill's snapshotted lines from the challans still linked to it
+    (e.g. after one is unlinked), grouped per the client's current invoice_line_mode.
+    Runs inside the caller's transaction. Returns the number of lines written.
+    """
+    cursor.execute("""
+        SELECT c.invoice_line_mode
+        FROM monthly_bills mb JOIN clients c ON mb.client_id = c.client_id
+        WHERE mb.bill_id = %s
+    """, (bill_id,))
+    client = cursor.fetchone()
+    line_mode = (client or {}).get('invoice_line_mode') or DEFAULT_INVOICE_LINE_MODE
+    cursor.execute("DELETE FROM bill_lines WHERE bill_id = %s", (bill_id,))
+    return snapshot_bill_lines(cursor, bill_id, line_mode)
+
 # --- Monthly Bill Management Endpoints ---
 
 @bill_bp.route('/monthly-bills', methods=['POST'])
@@ -94,7 +194,16 @@ def generate_monthly_bill_endpoint():
         update_params = [new_bill_id] + challan_ids
         cursor.execute(update_challan_query, tuple(update_params))
 
+        # Freeze the invoice lines, so later product or client changes don't alter this bill
+        cursor.execute("SELECT invoice_line_mode FROM clients WHERE client_id = %s", (client_id,))
+        client = cursor.fetchone()
+        line_mode = (client or {}).get('invoice_line_mode') or DEFAULT_INVOICE_LINE_MODE
+        snapshot_bill_lines(cursor, new_bill_id, line_mode)
+
+        table_versions.bump(cursor, 'monthly_bills', 'challans')
         conn.commit()
+        invalidate_aging_cache()
+        pdf_cache.warm_in_background(warm_bill_pdf, new_bill_id)
         return jsonify({"message": f"Monthly bill {new_bill_id} generated successfully for {billing_period}.", "bill_id": new_bill_id}), 201
 
     except mysql.connector.Error as err:
@@ -110,6 +219,70 @@ def generate_monthly_bill_endpoint():
         if conn: conn.close()
 
 
+def prepare_bill_pdf(cursor, bill_id):
+    """
+    Loads what is needed to serve a bill PDF from the cache.
+    Returns (bill_data, version, render, immutable), or None if the bill does not exist.
+    Paid bills can no longer change, so their version is derived from the bill row alone
+    and the line items are only read when the PDF actually has to be rendered.
+    """
+    query = """
+        SELECT mb.bill_id, mb.billing_period, mb.total_amount, mb.due_date, mb.status,
+               mb.payment_date, c.company_name as client_name
+        FROM monthly_bills mb
+        JOIN clients c ON mb.client_id = c.client_id
+        WHERE mb.bill_id = %s
+    """
+    cursor.execute(query, (bill_id,))
+    bill_data = cursor.fetchone()
+    if not bill_data:
+        return None
+    bill_data['total_amount'] = float(bill_data['total_amount'])
+
+    # Format data for PDF
+    current_date = datetime.now().date()
+    bill_data['billing_date'] = current_date.strftime('%d-%m-%Y')
+    bill_data['due_date_formatted'] = bill_data['due_date'].strftime('%d-%m-%Y') if bill_data['due_date'] else 'N/A'
+    bill_data['bill_no_formatted'] = format_bill_no(bill_data['billing_period'], bill_id)
+
+    def load_items():
+        # Lines as snapshotted when the bill was generated
+        cursor.execute(BILL_LINES_QUERY, (bill_id,))
+        items_data = cursor.fetchall()
+        for item in items_data:
+            item['quantity'] = int(item['quantity'])
+            item['price_per_unit'] = float(item['price_per_unit'])
+            item['item_total'] = float(item['item_total'])
+            item['challan_date_formatted'] = item['challan_date'].strftime('%d-%m-%Y') if item['challan_date'] else 'N/A' # Add formatted date
+        return items_data
+
+    if bill_data['status'] == 'Paid':
+        version = pdf_cache.document_version('bill', bill_id, 'paid', bill_data['payment_date'])
+        render = lambda: pdf_pool.render(create_monthly_bill_pdf, COMPANY_DETAILS, bill_data, load_items())
+        return bill_data, version, render, True
+
+    items_data = load_items()
+    version = pdf_cache.document_version('bill', bill_data, items_data)
+    render = lambda: pdf_pool.render(create_monthly_bill_pdf, COMPANY_DETAILS, bill_data, items_data)
+    return bill_data, version, render, False
+
+
+def warm_bill_pdf(bill_id):
+    """Renders a bill PDF into the cache; returns its path, or None if it does not exist."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor(dictionary=True)
+    try:
+        prepared = prepare_bill_pdf(cursor, bill_id)
+        if prepared:
+            _, version, render, _ = prepared
+            return pdf_cache.render_to_cache('bills', bill_id, version, render)
+    finally:
+        cursor.close()
+        conn.close()
+
+
 @bill_bp.route('/monthly-bills/<int:bill_id>/pdf', methods=['GET'])
 def get_monthly_bill_pdf_endpoint(bill_id):
     conn = get_db_connection()
@@ -117,50 +290,15 @@ def get_monthly_bill_pdf_endpoint(bill_id):
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor(dictionary=True)
     try:
-        # Get bill details
-        query = """
-            SELECT mb.bill_id, mb.billing_period, mb.total_amount, mb.due_date, mb.status,
-                   c.company_name as client_name
-            FROM monthly_bills mb
-            JOIN clients c ON mb.client_id = c.client_id
-            WHERE mb.bill_id = %s
-        """
-        cursor.execute(query, (bill_id,))
-        bill_data = cursor.fetchone()
-        if not bill_data:
+        prepared = prepare_bill_pdf(cursor, bill_id)
+        if not prepared:
             return jsonify({"error": "Monthly Bill not found"}), 404
-        bill_data['total_amount'] = float(bill_data['total_amount'])
-
-        # Format data for PDF
-        current_date = datetime.now().date()
-        bill_data['billing_date'] = current_date.strftime('%d-%m-%Y')
-        bill_data['due_date_formatted'] = bill_data['due_date'].strftime('%d-%m-%Y') if bill_data['due_date'] else 'N/A'
-        bill_data['bill_no_formatted'] = f"AKM-SP{bill_data['billing_period'].replace('-','')}-{bill_id}"
-
-        # Get items associated with the bill's challans
-        items_query = """
-            SELECT
-                p.name,
-                oi.quantity,
-                oi.price_per_unit,
-                (oi.quantity * oi.price_per_unit) as item_total,
-                ch.challan_date
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.product_id
-            JOIN orders o ON oi.order_id = o.order_id
-            JOIN challans ch ON o.associated_challan_id = ch.challan_id
-            WHERE ch.monthly_bill_id = %s
-            ORDER BY ch.challan_date, p.name
-        """
-        cursor.execute(items_query, (bill_id,))
-        items_data = cursor.fetchall()
-        for item in items_data:
-            item['price_per_unit'] = float(item['price_per_unit'])
-            item['item_total'] = float(item['item_total'])
-            item['challan_date_formatted'] = item['challan_date'].strftime('%d-%m-%Y') if item['challan_date'] else 'N/A' # Add formatted date
-
-        pdf_buffer = create_monthly_bill_pdf(COMPANY_DETAILS, bill_data, items_data)
-        return send_file(pdf_buffer, as_attachment=True, download_name=f'Invoice_{bill_data["bill_no_formatted"]}.pdf', mimetype='application/pdf')
+        bill_data, version, render, immutable = prepared
+        return pdf_cache.send_cached_pdf(
+            'bills', bill_id, version, render,
+            download_name=f'Invoice_{bill_data["bill_no_formatted"]}.pdf',
+            immutable=immutable
+        )
     except Exception as e:
         logging.error(f"Error generating PDF for bill {bill_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred while generating the PDF."}), 500
@@ -169,6 +307,7 @@ def get_monthly_bill_pdf_endpoint(bill_id):
         conn.close()
 
 @bill_bp.route('/monthly-bills', methods=['GET'])
+@table_versions.versioned('monthly_bills', 'clients')
 def get_all_monthly_bills():
     conn = get_db_connection()
     if not conn:
@@ -180,12 +319,18 @@ def get_all_monthly_bills():
         per_page = int(request.args.get('per_page', 25))
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        status = request.args.get('status')
 
         offset = (page - 1) * per_page
 
         where_clauses = ["1=1"]
         query_params = []
 
+        if status:
+            # e.g. status=Overdue; served by idx_monthly_bills_status_due
+            where_clauses.append("mb.status = %s")
+            query_params.append(status)
+
         if start_date:
             # Filter by due_date or maybe creation date? Assuming due_date for now
             where_clauses.append("DATE(mb.due_date) >= %s")
@@ -257,7 +402,10 @@ def delete_monthly_bill(bill_id):
         if cursor.rowcount == 0:
             conn.rollback()
             return jsonify({"error": "Monthly bill not found"}), 404
+        table_versions.bump(cursor, 'monthly_bills', 'challans')
         conn.commit()
+        invalidate_aging_cache()
+        pdf_cache.purge('bills', bill_id)
         return jsonify({"message": "Monthly bill deleted and associated challans unlinked."}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -271,6 +419,10 @@ def record_bill_payment(bill_id):
     data = request.get_json()
     if not data or 'payment_date' not in data or 'payment_method' not in data:
         return jsonify({"error": "Missing 'payment_date' or 'payment_method'"}), 400
+    try:
+        payment_date = datetime.strptime(data['payment_date'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid payment_date. Use YYYY-MM-DD."}), 400
 
     conn = get_db_connection()
     if not conn:
@@ -285,7 +437,7 @@ def record_bill_payment(bill_id):
             SET status = 'Paid', payment_date = %s, payment_method = %s
             WHERE bill_id = %s AND status != 'Paid'
         """
-        cursor.execute(update_bill_query, (data['payment_date'], data['payment_method'], bill_id))
+        cursor.execute(update_bill_query, (payment_date, data['payment_method'], bill_id))
 
         if cursor.rowcount == 0:
             # Check if the bill exists but was already paid
@@ -311,7 +463,9 @@ def record_bill_payment(bill_id):
         logging.info(f"Updated {cursor.rowcount} associated orders to 'Completed' for bill {bill_id}.")
         # --- End of Fix ---
 
+        table_versions.bump(cursor, 'monthly_bills', 'orders')
         conn.commit()
+        invalidate_aging_cache()
         return jsonify({"message": "Payment recorded, bill marked as Paid, and associated orders updated."}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -323,4 +477,126 @@ def record_bill_payment(bill_id):
         return jsonify({"error": f"An unexpected error occurred: {e}"}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+        if conn: conn.close()
+
+# --- Bank Statement Reconciliation Endpoints ---
+
+def _serialize_statement_line(line):
+    line = dict(line)
+    line['date'] = format_datetime(line['date'])
+    line['amount'] = format_datetime(line['amount'])
+    if 'bill_amount' in line:
+        line['bill_amount'] = format_datetime(line['bill_amount'])
+    return line
+
+@bill_bp.route('/monthly-bills/reconcile', methods=['POST'])
+def preview_bank_reconciliation():
+    """
+    Accepts a bank statement CSV ('statement_file') and proposes which unpaid bill
+    each credit pays. Nothing is written; confirmed matches go to /monthly-bills/reconcile/apply.
+    """
+    statement_file = request.files.get('statement_file')
+    if not statement_file or statement_file.filename == '':
+        return jsonify({"error": "Missing statement_file (CSV)"}), 400
+
+    try:
+        credits = parse_statement_csv(statement_file)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        status_placeholders = ', '.join(['%s'] * len(UNPAID_BILL_STATUSES))
+        cursor.execute(f"""
+            SELECT mb.bill_id, mb.billing_period, mb.total_amount, c.company_name as client_name
+            FROM monthly_bills mb JOIN clients c ON mb.client_id = c.client_id
+            WHERE mb.status IN ({status_placeholders})
+        """, UNPAID_BILL_STATUSES)
+        unpaid_bills = cursor.fetchall()
+
+        matches, unmatched = match_credits_to_bills(credits, unpaid_bills)
+        return jsonify({
+            "matches": [_serialize_statement_line(m) for m in matches],
+            "unmatched": [_serialize_statement_line(u) for u in unmatched],
+            "credit_count": len(credits)
+        })
+    except mysql.connector.Error as err:
+        logging.error(f"Database error during reconciliation preview: {err}", exc_info=True)
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@bill_bp.route('/monthly-bills/reconcile/apply', methods=['POST'])
+def apply_bank_reconciliation():
+    """
+    Records every confirmed payment and completes the associated orders in one transaction.
+    Expects {"payments": [{"bill_id", "payment_date", "payment_method"?}, ...]}.
+    """
+    data = request.get_json(silent=True)
+    payments = data.get('payments') if isinstance(data, dict) else None
+    if not payments or not isinstance(payments, list):
+        return jsonify({"error": "Missing 'payments' list"}), 400
+    try:
+        payments_by_bill = {
+            int(p['bill_id']): (datetime.strptime(p['payment_date'], '%Y-%m-%d').date(),
+                                p.get('payment_method') or 'Bank Transfer')
+            for p in payments
+        }
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Each payment needs a numeric 'bill_id' and a 'payment_date' (YYYY-MM-DD)"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        conn.start_transaction()
+
+        # Lock the bills and skip any that were paid since the preview
+        bill_ids = list(payments_by_bill)
+        placeholders = ', '.join(['%s'] * len(bill_ids))
+        cursor.execute(
+            f"SELECT bill_id FROM monthly_bills WHERE bill_id IN ({placeholders}) AND status != 'Paid' FOR UPDATE",
+            tuple(bill_ids)
+        )
+        payable_ids = [row[0] for row in cursor.fetchall()]
+        skipped_ids = sorted(set(bill_ids) - set(payable_ids))
+
+        if not payable_ids:
+            conn.rollback()
+            return jsonify({"message": "No payments recorded; the bills are already paid or do not exist.",
+                            "paid_bill_ids": [], "skipped_bill_ids": skipped_ids}), 200
+
+        cursor.executemany(
+            "UPDATE monthly_bills SET status = 'Paid', payment_date = %s, payment_method = %s WHERE bill_id = %s",
+            [(payments_by_bill[bid][0], payments_by_bill[bid][1], bid) for bid in payable_ids]
+        )
+
+        placeholders = ', '.join(['%s'] * len(payable_ids))
+        cursor.execute(f"""
+            UPDATE orders o
+            JOIN challans ch ON o.associated_challan_id = ch.challan_id
+            SET o.status = 'Completed'
+            WHERE ch.monthly_bill_id IN ({placeholders}) AND o.status = 'Processing'
+        """, tuple(payable_ids))
+        logging.info(f"Reconciliation: paid {len(payable_ids)} bills, completed {cursor.rowcount} orders.")
+
+        table_versions.bump(cursor, 'monthly_bills', 'orders')
+        conn.commit()
+        invalidate_aging_cache()
+        return jsonify({
+            "message": f"Recorded {len(payable_ids)} payment(s).",
+            "paid_bill_ids": sorted(payable_ids),
+            "skipped_bill_ids": skipped_ids
+        }), 200
+    except mysql.connector.Error as err:
+        conn.rollback()
+        logging.error(f"Database error applying reconciliation: {err}", exc_info=True)
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
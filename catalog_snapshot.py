@@ -0,0 +1,340 @@
+# catalog_snapshot.py
+# Read-only product catalog shared by every API worker process through a
+# memory-mapped file.
+# One process builds the snapshot from the products table and publishes it with
+# an atomic rename; each worker maps the current file and reads records straight
+# out of the mapping, so the operating system keeps a single copy in memory for
+# all workers. A worker notices a newer file on its next read (one stat() call)
+# and maps that instead; requests already using the old mapping finish with it.
+#
+# Layout (little-endian):
+#   header   magic 'CATS', format, products version, record count, offsets
+#   records  RECORD_FORMAT per product, ordered by (case-folded name, product_id),
+#            which is the /products order and what its paging cursors refer to
+#   id index (product_id, record number) pairs sorted by product_id
+#   words    (word, record number) pairs sorted by word, one per case-folded word
+#            of each product name; the name search index
+#   strings  UTF-8 names, descriptions, image file names and index words,
+#            referenced by (offset, length); length NULL_LENGTH means NULL
+#
+# The snapshot carries the products version from table_versions, so a reader
+# that knows a newer version can tell the snapshot is stale; it keeps serving
+# it while a background publish catches up, instead of blocking on a rebuild.
+
+import os
+import re
+import mmap
+import struct
+import bisect
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError: # Windows (development only): publishes are not serialized across processes
+    fcntl = None
+
+from db import get_db_connection
+
+# Absolute and next to this module by default: the publisher and every reader
+# must open the same snapshot whatever directory they were started from
+CATALOG_DIR = os.path.abspath(os.environ.get(
+    "CATALOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_cache")))
+SNAPSHOT_PATH = os.path.join(CATALOG_DIR, "products.snapshot")
+
+MAGIC = b'CATS'
+FORMAT_VERSION = 2
+HEADER_FORMAT = '<4sHHQIIIII'   # magic, format, reserved, products version, count, index/words/strings offsets, word count
+RECORD_FORMAT = '<IqiiIIIIII'   # id, price (paise), stock, low-stock threshold, name/description/image (offset, length)
+INDEX_FORMAT = '<II'            # product_id, record number
+WORD_FORMAT = '<III'            # word (offset, length), record number
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+WORD_SIZE = struct.calcsize(WORD_FORMAT)
+NULL_LENGTH = 0xFFFFFFFF
+
+# Snapshot columns, in record order; a projection decodes only the strings it asks for
+COLUMNS = ('product_id', 'name', 'description', 'price', 'stock_quantity', 'low_stock_threshold', 'image_url')
+
+_WORD = re.compile(r'\w+')
+
+SNAPSHOT_QUERY = """
+    SELECT product_id, name, description, price, stock_quantity, low_stock_threshold, image_url
+    FROM products
+"""
+
+
+def words(text):
+    """The case-folded words of a name or a search query, as the word index stores them."""
+    return _WORD.findall(text.casefold())
+
+
+def sort_key(name, product_id):
+    """Position of a product in the snapshot (and /products) order."""
+    return name.casefold(), product_id
+
+
+class _Column:
+    """Read-only sequence over the mapping, so bisect can search it without unpacking it first."""
+
+    def __init__(self, length, item):
+        self._length = length
+        self._item = item
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._length:
+            raise IndexError(position)
+        return self._item(position)
+
+
+class CatalogSnapshot:
+    """A mapped snapshot. Records are decoded on access; nothing is copied up front."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, file_format, _, self.version, self.count,
+         self._index_offset, self._words_offset, self._strings_offset, self._word_count) = \
+            struct.unpack_from(HEADER_FORMAT, self._map, 0)
+        if magic != MAGIC or file_format != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a catalog snapshot (format {FORMAT_VERSION}).")
+        self._ids = _Column(self.count, lambda position: struct.unpack_from(
+            INDEX_FORMAT, self._map, self._index_offset + position * INDEX_SIZE)[0])
+        self._words = _Column(self._word_count, lambda position: self._text(*struct.unpack_from(
+            '<II', self._map, self._words_offset + position * WORD_SIZE)))
+        self._sort_keys = _Column(self.count, self.sort_key)
+
+    def __len__(self):
+        return self.count
+
+    def _text(self, offset, length):
+        if length == NULL_LENGTH:
+            return None
+        start = self._strings_offset + offset
+        return str(self._map[start:start + length], 'utf-8')
+
+    def record(self, number, fields=COLUMNS):
+        """
+        The product at position `number`, as a dict like the products row.
+        `fields` limits it to those COLUMNS; strings that are not asked for are not decoded.
+        """
+        (product_id, price, stock, threshold,
+         name_off, name_len, desc_off, desc_len, image_off, image_len) = \
+            struct.unpack_from(RECORD_FORMAT, self._map, HEADER_SIZE + number * RECORD_SIZE)
+        product = {}
+        for field in fields:
+            if field == 'product_id':
+                product[field] = product_id
+            elif field == 'name':
+                product[field] = self._text(name_off, name_len)
+            elif field == 'description':
+                product[field] = self._text(desc_off, desc_len)
+            elif field == 'price':
+                product[field] = price / 100
+            elif field == 'stock_quantity':
+                product[field] = stock
+            elif field == 'low_stock_threshold':
+                product[field] = threshold
+            elif field == 'image_url':
+                product[field] = self._text(image_off, image_len)
+        return product
+
+    def sort_key(self, number):
+        """sort_key() of a record; records are stored in this order."""
+        product_id, _, _, _, name_off, name_len = \
+            struct.unpack_from('<IqiiII', self._map, HEADER_SIZE + number * RECORD_SIZE)
+        return sort_key(self._text(name_off, name_len), product_id)
+
+    def position_after(self, key):
+        """Number of the first record that sorts after `key` (a sort_key()), for keyset paging."""
+        return bisect.bisect_right(self._sort_keys, key)
+
+    def stock_levels(self, number):
+        """(stock_quantity, low_stock_threshold) of a record, without decoding its strings."""
+        return struct.unpack_from('<ii', self._map, HEADER_SIZE + number * RECORD_SIZE + 12)
+
+    def __iter__(self):
+        for number in range(self.count):
+            yield self.record(number)
+
+    def get(self, product_id):
+        """The product with this id, or None. Binary search over the id index."""
+        position = bisect.bisect_left(self._ids, product_id)
+        if position == self.count or self._ids[position] != product_id:
+            return None
+        _, number = struct.unpack_from(INDEX_FORMAT, self._map, self._index_offset + position * INDEX_SIZE)
+        return self.record(number)
+
+    def search(self, query):
+        """
+        Sorted numbers of the records whose name has, for every word of `query`, a word
+        starting with it ('blue tow' matches 'Towel, Blue'). Each query word is one
+        binary search over the word index.
+        """
+        matches = None
+        for word in set(words(query)):
+            start = bisect.bisect_left(self._words, word)
+            end = bisect.bisect_left(self._words, word + '\U0010ffff', start)
+            numbers = {struct.unpack_from('<I', self._map, self._words_offset + position * WORD_SIZE + 8)[0]
+                       for position in range(start, end)}
+            matches = numbers if matches is None else matches & numbers
+            if not matches:
+                return []
+        return sorted(matches) if matches is not None else list(range(self.count))
+
+
+# --- Building and publishing ---
+
+def _encode(rows, version):
+    strings = bytearray()
+    records = bytearray()
+
+    def add_text(value):
+        if value is None:
+            return 0, NULL_LENGTH
+        data = str(value).encode('utf-8')
+        offset = len(strings)
+        strings.extend(data)
+        return offset, len(data)
+
+    rows = sorted(rows, key=lambda row: sort_key(row['name'], row['product_id']))
+    for row in rows:
+        records += struct.pack(
+            RECORD_FORMAT, row['product_id'], round(row['price'] * 100), row['stock_quantity'],
+            row['low_stock_threshold'] or 0,
+            *add_text(row['name']), *add_text(row['description']), *add_text(row['image_url']),
+        )
+    index = b''.join(struct.pack(INDEX_FORMAT, product_id, number)
+                     for product_id, number in sorted((row['product_id'], n) for n, row in enumerate(rows)))
+    name_words = sorted((word, number) for number, row in enumerate(rows) for word in set(words(row['name'])))
+    word_index = b''.join(struct.pack(WORD_FORMAT, *add_text(word), number) for word, number in name_words)
+    index_offset = HEADER_SIZE + len(records)
+    words_offset = index_offset + len(index)
+    strings_offset = words_offset + len(word_index)
+    header = struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, 0, version, len(rows),
+                         index_offset, words_offset, strings_offset, len(name_words))
+    return header + records + index + word_index + strings
+
+
+def _load_rows():
+    """Returns (products version, rows) read in one consistent transaction."""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+        cursor.execute("SELECT version FROM table_versions WHERE table_name = 'products'")
+        version_row = cursor.fetchone()
+        cursor.execute(SNAPSHOT_QUERY)
+        rows = cursor.fetchall()
+        conn.commit()
+        return (version_row['version'] if version_row else 0), rows
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _published_version():
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        magic, file_format, _, version, *_ = struct.unpack(HEADER_FORMAT, header)
+        return version if magic == MAGIC and file_format == FORMAT_VERSION else None
+    except (OSError, struct.error):
+        return None
+
+
+def publish():
+    """Builds a snapshot from the database and swaps it in, unless a newer one is already published."""
+    version, rows = _load_rows()
+    data = _encode(rows, version)
+    os.makedirs(CATALOG_DIR, exist_ok=True)
+    with open(os.path.join(CATALOG_DIR, "publish.lock"), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        published = _published_version()
+        if published is not None and published > version:
+            return published # Another process got there with newer data
+        fd, tmp_path = tempfile.mkstemp(dir=CATALOG_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, SNAPSHOT_PATH)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    logging.info(f"Catalog snapshot v{version} published: {len(rows)} products, {len(data):,} bytes")
+    return version
+
+
+# Publishes run on one background thread; requests arriving while one is queued share it.
+_publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-publish")
+_publish_queued = False
+_state_lock = threading.Lock()
+
+
+def publish_in_background():
+    """Call after committing a change to products (including stock)."""
+    global _publish_queued
+    with _state_lock:
+        if _publish_queued:
+            return
+        _publish_queued = True
+
+    def _run():
+        global _publish_queued
+        with _state_lock:
+            _publish_queued = False # Later changes queue another publish
+        try:
+            publish()
+        except Exception as e:
+            logging.warning(f"Catalog snapshot publish failed: {e}", exc_info=True)
+    _publisher.submit(_run)
+
+
+# --- Reading ---
+
+_current = None     # (file identity, CatalogSnapshot) mapped by this process
+_map_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def _map_published():
+    """Maps the published file if it changed since the last call; returns the snapshot, or None if there is none."""
+    global _current
+    with _map_lock:
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+            identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if _current is None or _current[0] != identity:
+                _current = (identity, CatalogSnapshot(SNAPSHOT_PATH))
+            return _current[1]
+        except (FileNotFoundError, ValueError):
+            return None # Not published yet, or written in an older format
+
+
+def current(min_version=None):
+    """
+    Returns the published snapshot, mapping a newer file if one was swapped in.
+    Builds and publishes one first only if there is none yet; a snapshot older than
+    `min_version` is returned as it is while a background publish catches up, so
+    callers compare snapshot.version themselves.
+    """
+    snapshot = _map_published()
+    if snapshot is None:
+        with _build_lock: # Concurrent first requests share one build
+            snapshot = _map_published()
+            if snapshot is None:
+                publish()
+                snapshot = _map_published()
+    elif min_version is not None and snapshot.version < min_version:
+        publish_in_background()
+    return snapshot
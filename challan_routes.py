@@ -3,7 +3,7 @@
 # This file is compatible with the database_schema.sql provided.
 # UPDATED: Correctly updates order status to 'Processing' upon challan creation.
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, jsonify, request
 from db import get_db_connection
 import mysql.connector
 from datetime import datetime, date
@@ -13,6 +13,10 @@ import logging
 # Import helpers from pdf_generator and config
 from pdf_generator import create_challan_pdf
 from config import COMPANY_DETAILS
+import pdf_cache
+import pdf_pool
+import table_versions
+from bill_routes import resnapshot_bill_lines
 
 challan_bp = Blueprint('challan_bp', __name__)
 
@@ -78,7 +82,9 @@ def create_challan_from_order():
         cursor.execute(update_order_query, (new_challan_id, order_id))
         # --- End of Fix ---
 
+        table_versions.bump(cursor, 'challans', 'orders')
         conn.commit()
+        pdf_cache.warm_in_background(warm_challan_pdf, new_challan_id)
         return jsonify({"message": "Challan created successfully and order status updated", "challan_id": new_challan_id}), 201
     except mysql.connector.Error as err:
         conn.rollback()
@@ -94,6 +100,7 @@ def create_challan_from_order():
         if conn: conn.close()
 
 @challan_bp.route('/challans', methods=['GET'])
+@table_versions.versioned('challans', 'clients', 'orders')
 def get_all_challans():
     conn = get_db_connection()
     if not conn:
@@ -190,7 +197,9 @@ def delete_challan(challan_id):
 
         cursor.execute("DELETE FROM challans WHERE challan_id = %s", (challan_id,))
 
+        table_versions.bump(cursor, 'challans', 'orders')
         conn.commit()
+        pdf_cache.purge('challans', challan_id)
 
         return jsonify({"message": "Challan deleted. The original order status is reset to 'Pending'."}), 200
 
@@ -206,13 +215,27 @@ def reset_challan_billing_status(challan_id):
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
+        conn.start_transaction()
+        cursor.execute("SELECT monthly_bill_id FROM challans WHERE challan_id = %s FOR UPDATE", (challan_id,))
+        challan = cursor.fetchone()
+        if not challan:
+            conn.rollback()
+            return jsonify({"error": "Challan not found"}), 404
+        bill_id = challan['monthly_bill_id']
+
         query = "UPDATE challans SET monthly_bill_id = NULL WHERE challan_id = %s"
         cursor.execute(query, (challan_id,))
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Challan not found"}), 404
+        if bill_id:
+            # The bill's snapshotted lines must no longer include this challan
+            resnapshot_bill_lines(cursor, bill_id)
+            table_versions.bump(cursor, 'challans', 'monthly_bills')
+        else:
+            table_versions.bump(cursor, 'challans')
         conn.commit()
+        if bill_id:
+            pdf_cache.purge('bills', bill_id)
         return jsonify({"message": f"Billing status for Challan ID {challan_id} has been reset."}), 200
     except mysql.connector.Error as err:
         conn.rollback()
@@ -221,6 +244,60 @@ def reset_challan_billing_status(challan_id):
         cursor.close()
         conn.close()
 
+def prepare_challan_pdf(cursor, challan_id):
+    """
+    Loads a challan and its items for rendering.
+    Returns (challan_data, version, render), or None if the challan does not exist.
+    Raises LookupError if the challan is not linked to an order.
+    """
+    query = """
+        SELECT ch.challan_id, ch.challan_date, ch.total_amount, c.company_name, o.order_id
+        FROM challans ch
+        JOIN clients c ON ch.client_id = c.client_id
+        LEFT JOIN orders o ON ch.challan_id = o.associated_challan_id
+        WHERE ch.challan_id = %s
+    """
+    cursor.execute(query, (challan_id,))
+    challan_data = cursor.fetchone()
+    if not challan_data:
+        return None
+    if not challan_data.get('order_id'):
+        raise LookupError("Challan is not associated with an order.")
+    items_query = """
+        SELECT p.name, oi.quantity, oi.price_per_unit, (oi.quantity * oi.price_per_unit) as item_total
+        FROM order_items oi
+        JOIN products p ON oi.product_id = p.product_id
+        WHERE oi.order_id = %s
+        ORDER BY p.name
+    """
+    cursor.execute(items_query, (challan_data['order_id'],))
+    items_data = cursor.fetchall()
+    for item in items_data:
+        item['price_per_unit'] = float(item['price_per_unit'])
+        item['item_total'] = float(item['item_total'])
+    challan_data['total_amount'] = float(challan_data['total_amount'])
+
+    version = pdf_cache.document_version('challan', challan_data, items_data)
+    render = lambda: pdf_pool.render(create_challan_pdf, COMPANY_DETAILS, challan_data, items_data)
+    return challan_data, version, render
+
+
+def warm_challan_pdf(challan_id):
+    """Renders a challan PDF into the cache; returns its path, or None if it does not exist."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = conn.cursor(dictionary=True)
+    try:
+        prepared = prepare_challan_pdf(cursor, challan_id)
+        if prepared:
+            _, version, render = prepared
+            return pdf_cache.render_to_cache('challans', challan_id, version, render)
+    finally:
+        cursor.close()
+        conn.close()
+
+
 @challan_bp.route('/challans/<int:challan_id>/pdf', methods=['GET'])
 def get_challan_pdf_endpoint(challan_id):
     conn = get_db_connection()
@@ -229,34 +306,17 @@ def get_challan_pdf_endpoint(challan_id):
         return jsonify({"error": "Database connection failed"}), 500
     cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT ch.challan_id, ch.challan_date, ch.total_amount, c.company_name, o.order_id
-            FROM challans ch
-            JOIN clients c ON ch.client_id = c.client_id
-            LEFT JOIN orders o ON ch.challan_id = o.associated_challan_id
-            WHERE ch.challan_id = %s
-        """
-        cursor.execute(query, (challan_id,))
-        challan_data = cursor.fetchone()
-        if not challan_data:
+        try:
+            prepared = prepare_challan_pdf(cursor, challan_id)
+        except LookupError as e:
+            return jsonify({"error": str(e)}), 404
+        if not prepared:
             return jsonify({"error": "Challan not found"}), 404
-        if not challan_data.get('order_id'):
-             return jsonify({"error": "Challan is not associated with an order."}), 404
-        items_query = """
-            SELECT p.name, oi.quantity, oi.price_per_unit, (oi.quantity * oi.price_per_unit) as item_total
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.product_id
-            WHERE oi.order_id = %s
-            ORDER BY p.name
-        """
-        cursor.execute(items_query, (challan_data['order_id'],))
-        items_data = cursor.fetchall()
-        for item in items_data:
-            item['price_per_unit'] = float(item['price_per_unit'])
-            item['item_total'] = float(item['item_total'])
-        challan_data['total_amount'] = float(challan_data['total_amount'])
-        pdf_buffer = create_challan_pdf(COMPANY_DETAILS, challan_data, items_data)
-        return send_file(pdf_buffer, as_attachment=True, download_name=f'Challan_OC{challan_id:03d}.pdf', mimetype='application/pdf')
+        _, version, render = prepared
+        return pdf_cache.send_cached_pdf(
+            'challans', challan_id, version, render,
+            download_name=f'Challan_OC{challan_id:03d}.pdf'
+        )
     except Exception as e:
         logging.error(f"Error generating PDF for challan {challan_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred while generating the PDF."}), 500
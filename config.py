@@ -1,6 +1,8 @@
 # config.py
 # Stores configuration variables for the application.
 
+import os
+
 DB_CONFIG = {
     'host': 'localhost',
     'user': 'root',
@@ -24,4 +26,25 @@ COMPANY_DETAILS = {
         "branch": "Chembur",
         "bank_name": "Kotak Mahindra Bank Ltd."
     }
-}
\ No newline at end of file
+}
+
+# Invoice line grouping modes, stored per client in clients.invoice_line_mode.
+# 'itemized' prints every order item; the others are aggregated in SQL.
+INVOICE_LINE_MODES = ('itemized', 'by_product', 'by_product_date')
+DEFAULT_INVOICE_LINE_MODE = 'itemized'
+
+
+# Bill statuses that still count as money owed (used by receivables reports).
+UNPAID_BILL_STATUSES = ('Unpaid', 'Overdue')
+
+
+# Folder for uploaded product images (relative to the working directory).
+UPLOAD_FOLDER = 'uploads'
+# Largest accepted image upload, in bytes and in pixels (width x height).
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_UPLOAD_PIXELS = int(os.environ.get("MAX_UPLOAD_PIXELS", str(40_000_000)))
+
+# Engine that draws bills and challans: 'fpdf' (FPDF2) or 'reportlab'.
+# Both produce the same layout; see benchmarks/pdf_benchmarks.py to compare them.
+PDF_ENGINES = ('fpdf', 'reportlab')
+PDF_ENGINE = os.environ.get("PDF_ENGINE", "fpdf")
@@ -3,12 +3,19 @@
 
 import requests
 from PyQt6.QtWidgets import (
-    QFormLayout, QLineEdit, 
+    QFormLayout, QLineEdit, QComboBox,
     QDialogButtonBox, QMessageBox
 )
 # NEW: Import BaseDialog
 from .base_dialog import BaseDialog 
 
+# Invoice line grouping options (value sent to the API, label shown to the user)
+INVOICE_LINE_MODE_OPTIONS = [
+    ("itemized", "Itemized (every order item)"),
+    ("by_product", "Grouped by product"),
+    ("by_product_date", "Grouped by product per delivery date"),
+]
+
 # UPDATED: Inherit from BaseDialog
 class ClientDialog(BaseDialog):
     def __init__(self, parent=None, client_data=None):
@@ -25,14 +32,20 @@ class ClientDialog(BaseDialog):
         form_layout = QFormLayout()
         self.username = QLineEdit()
         self.company_name = QLineEdit()
+        self.invoice_line_mode = QComboBox()
+        for value, label in INVOICE_LINE_MODE_OPTIONS:
+            self.invoice_line_mode.addItem(label, value)
 
         form_layout.addRow("Username:", self.username)
         form_layout.addRow("Company Name:", self.company_name)
+        form_layout.addRow("Invoice Lines:", self.invoice_line_mode)
 
         if client_data:
             self.username.setText(client_data.get("username", ""))
             self.username.setReadOnly(True)
             self.company_name.setText(client_data.get("company_name", ""))
+            mode_index = self.invoice_line_mode.findData(client_data.get("invoice_line_mode", "itemized"))
+            self.invoice_line_mode.setCurrentIndex(max(mode_index, 0))
 
         # UPDATED: Add the form layout to the BaseDialog's content area
         self.content_layout.addLayout(form_layout)
@@ -48,7 +61,8 @@ class ClientDialog(BaseDialog):
     def submit(self):
         payload = {
             "username": self.username.text(),
-            "company_name": self.company_name.text()
+            "company_name": self.company_name.text(),
+            "invoice_line_mode": self.invoice_line_mode.currentData()
         }
 
         if not payload["username"] or not payload["company_name"]:
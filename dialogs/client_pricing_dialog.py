@@ -1,51 +1,192 @@
 # dialogs/client_pricing_dialog.py
 # UPDATED: Inherits from BaseDialog for a professional look.
-# UPDATED: Added QLineEdit import
+# UPDATED: Table is a QTableView over PricingTableModel; the price editor is only
+#          created for the cell being edited (PriceDelegate), and all changes are
+#          saved with one PUT /clients/<id>/pricing.
+# UPDATED: Shows and assigns the client's shared price list; custom prices are
+#          overrides on top of its rates.
 
 import requests
 from PyQt6.QtWidgets import (
-    QApplication, QLabel, QTableWidget, 
-    QTableWidgetItem, QHeaderView, QDialogButtonBox, QMessageBox,
-    QDoubleSpinBox, QLineEdit  # <-- ADDED QLineEdit HERE
+    QLabel, QTableView, QHeaderView, QDialogButtonBox, QMessageBox,
+    QDoubleSpinBox, QLineEdit, QStyledItemDelegate, QAbstractItemView,
+    QComboBox, QHBoxLayout
 )
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QColor
 # NEW: Import BaseDialog
 from .base_dialog import BaseDialog
 
+
+class PricingTableModel(QAbstractTableModel):
+    """
+    Products with their default price and an editable price per product (None = not set).
+    With `list_prices`, a read-only column shows the rates of the client's price list.
+    Also used by PriceListDialog, where the editable price is the list's rate.
+    """
+
+    def __init__(self, products, prices, list_prices=None, price_header="Custom Price (₹)", parent=None):
+        super().__init__(parent)
+        self.products = [(p['product_id'], p.get('name', 'N/A'), float(p.get('price', 0.0))) for p in products]
+        self.original_prices = dict(prices)
+        self.prices = dict(prices)
+        self.show_list_prices = list_prices is not None
+        self.list_prices = dict(list_prices or {})
+        self.headers = ["ID", "Product Name", "Default Price (₹)"]
+        if self.show_list_prices:
+            self.headers.append("List Price (₹)")
+        self.headers.append(price_header)
+        self.price_column = len(self.headers) - 1
+        self.list_price_column = self.price_column - 1 if self.show_list_prices else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.products)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def set_list_prices(self, list_prices):
+        """Shows another price list's rates (e.g. after the client's list is changed)."""
+        self.list_prices = dict(list_prices or {})
+        if self.show_list_prices and self.products:
+            self.dataChanged.emit(self.index(0, self.list_price_column),
+                                  self.index(len(self.products) - 1, self.list_price_column))
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        product_id, name, default_price = self.products[index.row()]
+        column = index.column()
+        if column == self.price_column:
+            value = self.prices.get(product_id)
+        elif column == self.list_price_column:
+            value = self.list_prices.get(product_id)
+        else:
+            value = (product_id, name, default_price)[column]
+        if role == Qt.ItemDataRole.UserRole: # Sort key
+            return name.lower() if column == 1 else (value or 0.0)
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(product_id)
+            if column == 1:
+                return name
+            return f"{value:.2f}" if value is not None else ""
+        if role == Qt.ItemDataRole.EditRole and column == self.price_column:
+            return value or 0.0
+        if role == Qt.ItemDataRole.ForegroundRole and column == self.price_column \
+                and value != self.original_prices.get(product_id):
+            return QColor("#2B6CB0") # Unsaved change
+        if role == Qt.ItemDataRole.ToolTipRole and column == self.price_column:
+            return "Enter a price, or leave blank/0 to remove it"
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == self.price_column:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != self.price_column:
+            return False
+        product_id = self.products[index.row()][0]
+        price = round(float(value), 2) if value else 0.0
+        if price > 0:
+            self.prices[product_id] = price
+        else:
+            self.prices.pop(product_id, None)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def changes(self, price_key="custom_price"):
+        """Returns (upserts, deletes) in the form PUT /clients/<id>/pricing and PUT /price-lists/<id> take."""
+        upserts = [{"product_id": product_id, price_key: price}
+                   for product_id, price in self.prices.items()
+                   if self.original_prices.get(product_id) != price]
+        deletes = [product_id for product_id in self.original_prices if product_id not in self.prices]
+        return upserts, deletes
+
+
+class PriceDelegate(QStyledItemDelegate):
+    """Edits a price with a spin box that only exists while the cell is being edited."""
+
+    def createEditor(self, parent, option, index):
+        editor = QDoubleSpinBox(parent)
+        editor.setRange(0, 1_000_000)
+        editor.setDecimals(2)
+        editor.setButtonSymbols(QDoubleSpinBox.ButtonSymbols.NoButtons)
+        editor.setSpecialValueText(" ") # 0 shows as blank: no price set
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setValue(index.data(Qt.ItemDataRole.EditRole) or 0.0)
+        editor.selectAll()
+
+    def setModelData(self, editor, model, index):
+        editor.interpretText()
+        model.setData(index, editor.value(), Qt.ItemDataRole.EditRole)
+
+
 # UPDATED: Inherit from BaseDialog
 class ClientPricingDialog(BaseDialog):
      def __init__(self, parent, client_id, client_name):
         self.client_id = client_id
         self.client_name = client_name
-        self.parent_window = parent 
-        self.original_custom_prices = {} 
+        self.parent_window = parent
+        self.model = None
+        self.original_price_list_id = None
 
         # UPDATED: Set title for BaseDialog
         title = f"Custom Pricing for {self.client_name}"
         super().__init__(title, parent)
-        
-        self.setMinimumSize(700, 500)
+
+        self.setMinimumSize(800, 500)
 
         # UPDATED: Add widgets directly to self.content_layout
         header_label = QLabel(f"Set Custom Prices for {self.client_name}", objectName="Header")
         self.content_layout.addWidget(header_label)
 
-        instruction_label = QLabel("Enter a new price in the 'Custom Price' column to override the default. Leave blank or 0 to use the default price.")
+        instruction_label = QLabel("The client pays its price list's rate where it has one, else the default price. "
+                                   "Enter a price in the 'Custom Price' column to override both for this client only. "
+                                   "Leave blank or 0 to remove an override.")
         instruction_label.setWordWrap(True)
         self.content_layout.addWidget(instruction_label)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["ID", "Product Name", "Default Price (₹)", "Custom Price (₹)"])
-        
+        price_list_layout = QHBoxLayout()
+        price_list_layout.addWidget(QLabel("Price list:"))
+        self.price_list_combo = QComboBox()
+        self.price_list_combo.setMinimumWidth(250)
+        self.price_list_combo.currentIndexChanged.connect(self.show_selected_list_prices)
+        price_list_layout.addWidget(self.price_list_combo)
+        price_list_layout.addStretch()
+        self.content_layout.addLayout(price_list_layout)
+
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search by product name...")
+        self.search_bar.setObjectName("SearchBar")
+        self.content_layout.addWidget(self.search_bar)
+
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setFilterKeyColumn(1)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.proxy.setSortRole(Qt.ItemDataRole.UserRole)
+        self.search_bar.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.price_delegate = PriceDelegate(self.table)
+
         # Assuming setup_table_style is in the parent (AdminDashboard)
         if hasattr(self.parent_window, 'setup_table_style'):
              self.parent_window.setup_table_style(self.table)
-
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked
+                                   | QAbstractItemView.EditTrigger.EditKeyPressed
+                                   | QAbstractItemView.EditTrigger.AnyKeyPressed)
 
         self.content_layout.addWidget(self.table)
 
@@ -61,122 +202,94 @@ class ClientPricingDialog(BaseDialog):
 
      def load_data(self):
         # Use parent_window to call fetch_generic_details
-        all_products = self.parent_window.fetch_generic_details("/products")
+        all_products = self.parent_window.fetch_generic_details(
+            "/products", params={"fields": "product_id,name,price"})
         custom_prices_raw = self.parent_window.fetch_generic_details(f"/clients/{self.client_id}/pricing")
+        client = self.parent_window.fetch_generic_details(f"/clients/{self.client_id}")
+        price_lists = self.parent_window.fetch_generic_details("/price-lists")
 
-        if all_products is None or custom_prices_raw is None:
+        if all_products is None or custom_prices_raw is None or client is None or price_lists is None:
             QMessageBox.critical(self, "Error", "Could not load products or custom prices.")
             self.reject()
             return
 
-        self.original_custom_prices = {item['product_id']: float(item['custom_price']) for item in custom_prices_raw}
-
-        self.table.setRowCount(len(all_products))
-
-        for row, prod in enumerate(all_products):
-            product_id = prod['product_id']
-            default_price = float(prod.get('price', 0.0))
-            custom_price = self.original_custom_prices.get(product_id)
-
-            self.table.setItem(row, 0, QTableWidgetItem(str(product_id)))
-            self.table.setItem(row, 1, QTableWidgetItem(prod.get('name', 'N/A')))
-            self.table.setItem(row, 2, QTableWidgetItem(f"{default_price:.2f}"))
-
-            price_input = QDoubleSpinBox()
-            price_input.setRange(0, 1_000_000)
-            price_input.setDecimals(2)
-            price_input.setButtonSymbols(QDoubleSpinBox.ButtonSymbols.NoButtons)
-            price_input.setToolTip("Enter custom price or leave blank/0 to use default")
+        custom_prices = {item['product_id']: float(item['custom_price']) for item in custom_prices_raw}
+        self.model = PricingTableModel(all_products, custom_prices, list_prices={}, parent=self)
+        self.proxy.setSourceModel(self.model)
+        self.table.setItemDelegateForColumn(self.model.price_column, self.price_delegate)
 
-            if custom_price is not None:
-                price_input.setValue(custom_price)
-            else:
-                price_input.setSpecialValueText(" ") # Use space for placeholder
-                price_input.setValue(0) # Set value to 0 for logic
+        self.original_price_list_id = client.get('price_list_id')
+        self.price_list_combo.blockSignals(True)
+        self.price_list_combo.clear()
+        self.price_list_combo.addItem("(None: default prices)", None)
+        for price_list in price_lists:
+            self.price_list_combo.addItem(
+                f"{price_list['name']} ({price_list['item_count']} products)", price_list['price_list_id'])
+        self.price_list_combo.setCurrentIndex(max(self.price_list_combo.findData(self.original_price_list_id), 0))
+        self.price_list_combo.blockSignals(False)
+        self.show_selected_list_prices()
 
-            price_input.setProperty("product_id", product_id)
-            self.table.setCellWidget(row, 3, price_input)
-            
-            # Fix for spinbox not showing placeholder on load
-            if custom_price is None:
-                # This line now works because QLineEdit is imported
-                price_input.findChild(QLineEdit).clear() 
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        for column in range(2, self.model.columnCount()):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
 
+     def show_selected_list_prices(self):
+        if self.model is None:
+            return
+        price_list_id = self.price_list_combo.currentData()
+        list_prices = {}
+        if price_list_id is not None:
+            price_list = self.parent_window.fetch_generic_details(f"/price-lists/{price_list_id}")
+            if price_list:
+                list_prices = {item['product_id']: item['price'] for item in price_list['items']}
+        self.model.set_list_prices(list_prices)
 
      def save_prices(self):
-        prices_to_save = [] 
-        
-        for row in range(self.table.rowCount()):
-            price_input_widget = self.table.cellWidget(row, 3)
-            if isinstance(price_input_widget, QDoubleSpinBox):
-                product_id = price_input_widget.property("product_id")
-                current_value = price_input_widget.value()
-                
-                # Check if the value is non-zero (i.e., it's a custom price)
-                is_new_custom_price = current_value > 0
-                # Check if it *was* a custom price
-                original_value = self.original_custom_prices.get(product_id)
-                
-                # Scenarios to save:
-                # 1. New custom price: (original was None, current > 0)
-                # 2. Changed custom price: (original was not None, current > 0, current != original)
-                # 3. Removed custom price: (original was not None, current == 0)
-                
-                if (is_new_custom_price and current_value != original_value) or \
-                   (not is_new_custom_price and original_value is not None):
-                    # If current_value is 0, we send 'None' to delete the custom price
-                    price_to_send = current_value if is_new_custom_price else None
-                    prices_to_save.append({"product_id": product_id, "custom_price": price_to_send})
-
-
-        if not prices_to_save:
+        if self.model is None:
+            return
+        upserts, deletes = self.model.changes()
+        price_list_id = self.price_list_combo.currentData()
+        list_changed = price_list_id != self.original_price_list_id
+        if not upserts and not deletes and not list_changed:
              QMessageBox.information(self, "No Changes", "No custom prices were changed.")
              return
 
-        progress_msg = QMessageBox(self)
-        progress_msg.setWindowTitle("Saving Prices...")
-        progress_msg.setText(f"Attempting to save {len(prices_to_save)} price changes...")
-        progress_msg.setStandardButtons(QMessageBox.StandardButton.NoButton)
-        progress_msg.show()
-        QApplication.processEvents()
-
-        saved_count = 0
-        error_count = 0
-        
-        for price_data in prices_to_save:
-            try:
-                url = f"{self.parent_window.API_BASE_URL}/clients/{self.client_id}/pricing"
-                # Use POST to add/update, DELETE to remove
-                if price_data['custom_price'] is not None:
-                    response = requests.post(url, json=price_data) 
-                else:
-                    # Send product_id in the body for the DELETE request
-                    delete_payload = {"product_id": price_data['product_id']}
-                    response = requests.delete(url, json=delete_payload)
-                
+        base_url = f"{self.parent_window.API_BASE_URL}/clients/{self.client_id}"
+        list_saved = False
+        try:
+            if list_changed:
+                response = requests.put(f"{base_url}/price-list", json={"price_list_id": price_list_id})
                 response.raise_for_status()
-                saved_count += 1
-            except requests.exceptions.RequestException as e:
-                error_count += 1
-                error_msg = str(e)
-                if hasattr(e, 'response') and e.response:
-                    try:
-                        error_msg = e.response.json().get('error', str(e))
-                    except:
-                        pass # Keep original error
-                print(f"Error saving price for product {price_data['product_id']}: {error_msg}")
-            
-            progress_msg.setText(f"Saving... {saved_count+error_count}/{len(prices_to_save)}")
-            QApplication.processEvents()
-
-        progress_msg.close()
-
-        summary_message = f"Successfully saved {saved_count} price changes.\n"
-        if error_count > 0:
-            summary_message += f"{error_count} operations failed. Check terminal for details."
-            QMessageBox.warning(self, "Save Complete (with errors)", summary_message)
-        else:
-             QMessageBox.information(self, "Success", summary_message)
+                self.original_price_list_id = price_list_id
+                list_saved = True
+            result = {}
+            if upserts or deletes:
+                response = requests.put(f"{base_url}/pricing", json={"upserts": upserts, "deletes": deletes})
+                response.raise_for_status()
+                result = response.json()
+        except requests.exceptions.RequestException as e:
+            error_msg = str(e)
+            if e.response is not None:
+                try:
+                    error_msg = e.response.json().get('error', str(e))
+                except ValueError:
+                    pass # Keep original error
+            # The custom prices are applied in one transaction, so none of them were saved
+            message = "No custom prices were saved."
+            if list_saved:
+                message = "The price list change was saved, but no custom prices were saved."
+            elif list_changed:
+                message = f"The price list was not changed. {message}"
+            # The edits stay in the table; saving again only resends the custom prices
+            QMessageBox.critical(self, "Save Failed", f"{message}\n\n{error_msg}")
+            return
+
+        message = f"Saved {result.get('upserted', 0)} custom prices and removed {result.get('deleted', 0)}."
+        if list_changed:
+            message = f"Price list updated. {message}"
+        QMessageBox.information(self, "Success", message)
 
         # Reload data to reflect changes
-        self.load_data()
\ No newline at end of file
+        self.load_data()
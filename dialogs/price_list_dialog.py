@@ -0,0 +1,162 @@
+# dialogs/price_list_dialog.py
+# Creates, edits and deletes the shared price lists that clients can be assigned
+# to (see ClientPricingDialog). Uses the same model/delegate table as the client
+# pricing editor; a list's rates are saved with one PUT /price-lists/<id>.
+
+import requests
+from PyQt6.QtWidgets import (
+    QLabel, QTableView, QHeaderView, QDialogButtonBox, QMessageBox,
+    QLineEdit, QAbstractItemView, QComboBox, QHBoxLayout, QPushButton, QInputDialog
+)
+from PyQt6.QtCore import Qt, QSortFilterProxyModel
+
+from .base_dialog import BaseDialog
+from .client_pricing_dialog import PricingTableModel, PriceDelegate
+
+
+class PriceListDialog(BaseDialog):
+     def __init__(self, parent):
+        self.parent_window = parent
+        self.model = None
+        self.products = []
+
+        super().__init__("Price Lists", parent)
+
+        self.setMinimumSize(700, 500)
+
+        header_label = QLabel("Shared Price Lists", objectName="Header")
+        self.content_layout.addWidget(header_label)
+
+        instruction_label = QLabel("Clients assigned to a list pay its rates. Products without a rate "
+                                   "in the list use their default price. Leave blank or 0 to remove a rate.")
+        instruction_label.setWordWrap(True)
+        self.content_layout.addWidget(instruction_label)
+
+        list_layout = QHBoxLayout()
+        list_layout.addWidget(QLabel("Price list:"))
+        self.list_combo = QComboBox()
+        self.list_combo.setMinimumWidth(250)
+        self.list_combo.currentIndexChanged.connect(self.load_selected_list)
+        list_layout.addWidget(self.list_combo)
+        self.new_btn = QPushButton("New List")
+        self.new_btn.clicked.connect(self.create_list)
+        list_layout.addWidget(self.new_btn)
+        self.delete_btn = QPushButton("Delete List")
+        self.delete_btn.clicked.connect(self.delete_list)
+        list_layout.addWidget(self.delete_btn)
+        list_layout.addStretch()
+        self.content_layout.addLayout(list_layout)
+
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText("Search by product name...")
+        self.search_bar.setObjectName("SearchBar")
+        self.content_layout.addWidget(self.search_bar)
+
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setFilterKeyColumn(1)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.proxy.setSortRole(Qt.ItemDataRole.UserRole)
+        self.search_bar.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.price_delegate = PriceDelegate(self.table)
+        if hasattr(self.parent_window, 'setup_table_style'):
+             self.parent_window.setup_table_style(self.table)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked
+                                   | QAbstractItemView.EditTrigger.EditKeyPressed
+                                   | QAbstractItemView.EditTrigger.AnyKeyPressed)
+        self.content_layout.addWidget(self.table)
+
+        self.button_box.clear()
+        self.button_box.setStandardButtons(
+            QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Close
+        )
+        self.button_box.accepted.connect(self.save_list)
+        self.button_box.rejected.connect(self.reject)
+
+        self.products = self.parent_window.fetch_generic_details(
+            "/products", params={"fields": "product_id,name,price"}) or []
+        self.load_lists()
+
+     def load_lists(self, select_id=None):
+        price_lists = self.parent_window.fetch_generic_details("/price-lists")
+        if price_lists is None:
+            return
+        self.list_combo.blockSignals(True)
+        self.list_combo.clear()
+        for price_list in price_lists:
+            self.list_combo.addItem(
+                f"{price_list['name']} ({price_list['client_count']} clients)", price_list['price_list_id'])
+        if select_id is not None:
+            self.list_combo.setCurrentIndex(max(self.list_combo.findData(select_id), 0))
+        self.list_combo.blockSignals(False)
+        self.delete_btn.setEnabled(bool(price_lists))
+        self.load_selected_list()
+
+     def load_selected_list(self):
+        price_list_id = self.list_combo.currentData()
+        rates = {}
+        if price_list_id is not None:
+            price_list = self.parent_window.fetch_generic_details(f"/price-lists/{price_list_id}")
+            if price_list:
+                rates = {item['product_id']: item['price'] for item in price_list['items']}
+        self.model = PricingTableModel(self.products, rates, price_header="List Price (₹)", parent=self)
+        self.proxy.setSourceModel(self.model)
+        self.table.setItemDelegateForColumn(self.model.price_column, self.price_delegate)
+        self.table.setEnabled(price_list_id is not None)
+
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        for column in range(2, self.model.columnCount()):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+
+     def create_list(self):
+        name, ok = QInputDialog.getText(self, "New Price List", "Name:")
+        if not ok or not name.strip():
+            return
+        try:
+            response = requests.post(f"{self.parent_window.API_BASE_URL}/price-lists", json={"name": name.strip()})
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.parent_window.show_api_error("create price list", e)
+            return
+        self.load_lists(select_id=response.json().get('price_list_id'))
+
+     def delete_list(self):
+        price_list_id = self.list_combo.currentData()
+        if price_list_id is None:
+            return
+        reply = QMessageBox.question(
+            self, "Delete Price List",
+            f"Delete '{self.list_combo.currentText()}'? Its clients will pay default prices (plus their own custom prices).")
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            response = requests.delete(f"{self.parent_window.API_BASE_URL}/price-lists/{price_list_id}")
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.parent_window.show_api_error("delete price list", e)
+            return
+        self.load_lists()
+
+     def save_list(self):
+        price_list_id = self.list_combo.currentData()
+        if self.model is None or price_list_id is None:
+            return
+        upserts, deletes = self.model.changes(price_key="price")
+        if not upserts and not deletes:
+             QMessageBox.information(self, "No Changes", "No rates were changed.")
+             return
+        try:
+            response = requests.put(f"{self.parent_window.API_BASE_URL}/price-lists/{price_list_id}",
+                                    json={"upserts": upserts, "deletes": deletes})
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.parent_window.show_api_error("save price list", e)
+            return
+        result = response.json()
+        QMessageBox.information(self, "Success",
+                                f"Saved {result.get('upserted', 0)} rates and removed {result.get('deleted', 0)}.")
+        self.load_lists(select_id=price_list_id)
@@ -117,7 +117,9 @@ class ProductDetailDialog(BaseDialog):
         self.start_image_download()
 
     def start_image_download(self):
-        image_url = self.product_data.get('image_url')
+        # The card-size JPEG is plenty for this view (Qt may lack a WebP plugin); fall back to the original
+        images = self.product_data.get('images')
+        image_url = images['card']['jpeg'] if images else self.product_data.get('image_url')
         if not image_url:
             self.image_label.setText("No image provided")
             self.progress_bar.hide()
@@ -0,0 +1,154 @@
+# dialogs/reconcile_payments_dialog.py
+# Uploads a bank statement CSV, shows the proposed bill matches and
+# records all confirmed payments in a single API call.
+
+import os
+import requests
+from PyQt6.QtWidgets import (
+    QHBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem,
+    QHeaderView, QDialogButtonBox, QMessageBox, QFileDialog
+)
+from PyQt6.QtCore import Qt
+
+from .base_dialog import BaseDialog
+
+class ReconcilePaymentsDialog(BaseDialog):
+    def __init__(self, parent):
+        self.parent_window = parent
+        self.matches = []
+
+        super().__init__("Reconcile Bank Statement", parent)
+        self.setMinimumSize(850, 500)
+
+        # --- File picker ---
+        file_layout = QHBoxLayout()
+        self.browse_btn = QPushButton("Choose Statement CSV...")
+        self.browse_btn.clicked.connect(self.choose_statement)
+        self.file_label = QLabel("No file selected.")
+        self.file_label.setStyleSheet("font-style: italic; color: #555;")
+        file_layout.addWidget(self.browse_btn)
+        file_layout.addWidget(self.file_label, 1)
+        self.content_layout.addLayout(file_layout)
+
+        self.summary_label = QLabel("Uncheck any match you do not want to record.")
+        self.summary_label.setWordWrap(True)
+        self.content_layout.addWidget(self.summary_label)
+
+        # --- Proposed matches ---
+        self.table = QTableWidget()
+        self.table.setColumnCount(7)
+        self.table.setHorizontalHeaderLabels(["Apply", "Date", "Reference", "Amount (₹)", "Bill No.", "Client", "Matched By"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setAlternatingRowColors(True)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.content_layout.addWidget(self.table)
+
+        self.unmatched_label = QLabel("")
+        self.unmatched_label.setWordWrap(True)
+        self.unmatched_label.setStyleSheet("color: #C53030;")
+        self.content_layout.addWidget(self.unmatched_label)
+
+        self.button_box.clear()
+        self.button_box.setStandardButtons(
+            QDialogButtonBox.StandardButton.Apply | QDialogButtonBox.StandardButton.Close
+        )
+        self.apply_btn = self.button_box.button(QDialogButtonBox.StandardButton.Apply)
+        self.apply_btn.setText("Record Payments")
+        self.apply_btn.setEnabled(False)
+        self.apply_btn.clicked.connect(self.apply_matches)
+        self.button_box.rejected.connect(self.reject)
+
+    def choose_statement(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Bank Statement", "", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        self.file_label.setText(os.path.basename(file_path))
+        self.file_label.setStyleSheet("font-style: normal; color: #333;")
+        self.load_preview(file_path)
+
+    def load_preview(self, file_path):
+        url = f"{self.parent_window.API_BASE_URL}/monthly-bills/reconcile"
+        try:
+            with open(file_path, 'rb') as f:
+                response = requests.post(url, files={'statement_file': (os.path.basename(file_path), f, 'text/csv')}, timeout=60)
+            response.raise_for_status()
+            preview = response.json()
+        except (OSError, requests.exceptions.RequestException) as e:
+            self.show_error("preview the statement", e)
+            return
+
+        self.matches = preview.get('matches', [])
+        unmatched = preview.get('unmatched', [])
+        self.populate_table()
+
+        self.summary_label.setText(
+            f"{preview.get('credit_count', 0)} credit(s) read, {len(self.matches)} matched to unpaid bills. "
+            "Uncheck any match you do not want to record."
+        )
+        if unmatched:
+            lines = [f"Row {u['row']}: ₹{u['amount']:.2f} {u.get('reference', '')} - {u['reason']}" for u in unmatched[:10]]
+            if len(unmatched) > 10:
+                lines.append(f"... and {len(unmatched) - 10} more.")
+            self.unmatched_label.setText("Not matched:\n" + "\n".join(lines))
+        else:
+            self.unmatched_label.setText("")
+        self.apply_btn.setEnabled(bool(self.matches))
+
+    def populate_table(self):
+        self.table.setRowCount(len(self.matches))
+        for row, match in enumerate(self.matches):
+            check_item = QTableWidgetItem()
+            check_item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            check_item.setCheckState(Qt.CheckState.Checked)
+            self.table.setItem(row, 0, check_item)
+            self.table.setItem(row, 1, QTableWidgetItem(match.get('date') or 'N/A'))
+            self.table.setItem(row, 2, QTableWidgetItem(match.get('reference', '')))
+            amount_item = QTableWidgetItem(f"{match['amount']:.2f}")
+            amount_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            self.table.setItem(row, 3, amount_item)
+            self.table.setItem(row, 4, QTableWidgetItem(match['bill_no_formatted']))
+            self.table.setItem(row, 5, QTableWidgetItem(match.get('client_name', '')))
+            self.table.setItem(row, 6, QTableWidgetItem(match['match_type'].title()))
+        self.table.resizeColumnsToContents()
+
+    def apply_matches(self):
+        payments = []
+        for row, match in enumerate(self.matches):
+            if self.table.item(row, 0).checkState() == Qt.CheckState.Checked:
+                payments.append({
+                    "bill_id": match['bill_id'],
+                    "payment_date": match.get('date') or "",
+                    "payment_method": "Bank Transfer"
+                })
+        if not payments:
+            QMessageBox.information(self, "Nothing Selected", "No matches are checked.")
+            return
+        if any(not p['payment_date'] for p in payments):
+            QMessageBox.warning(self, "Missing Dates", "Some statement rows have no readable date. Uncheck them or fix the file.")
+            return
+
+        url = f"{self.parent_window.API_BASE_URL}/monthly-bills/reconcile/apply"
+        try:
+            response = requests.post(url, json={"payments": payments}, timeout=60)
+            response.raise_for_status()
+            result = response.json()
+        except requests.exceptions.RequestException as e:
+            self.show_error("record payments", e)
+            return
+
+        message = result.get("message", "Payments recorded.")
+        if result.get("skipped_bill_ids"):
+            message += f"\nSkipped (already paid): {', '.join(map(str, result['skipped_bill_ids']))}"
+        QMessageBox.information(self, "Success", message)
+        self.accept()
+
+    def show_error(self, action, e):
+        error_msg = str(e)
+        if hasattr(e, 'response') and e.response is not None:
+            try:
+                error_msg = e.response.json().get('error', str(e))
+            except:
+                pass # Keep the original error
+        QMessageBox.critical(self, "API Error", f"Failed to {action}: {error_msg}")
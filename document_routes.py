@@ -0,0 +1,158 @@
+# document_routes.py
+# Contains API endpoints that work on many documents at once.
+# The month-end archive renders every bill or challan of a period in parallel
+# (through the PDF cache and render pool) and streams a ZIP back as each PDF
+# becomes ready, so the archive is never held in memory.
+
+from flask import Blueprint, jsonify, request, Response
+from db import get_db_connection
+import mysql.connector
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import time
+import zipfile
+
+import pdf_pool
+from bill_routes import warm_bill_pdf
+from challan_routes import warm_challan_pdf
+from bill_numbers import format_bill_no
+
+document_bp = Blueprint('document_bp', __name__)
+
+ARCHIVE_CHUNK_SIZE = 64 * 1024
+# How often a document is retried while the render pool is saturated.
+ARCHIVE_RENDER_ATTEMPTS = 5
+
+
+class _ZipStream:
+    """Write-only file object that hands everything written to it back to the response generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _render_with_retry(warm_func, doc_id):
+    """Renders one document into the cache, waiting out a saturated pool. Returns the cached path."""
+    for attempt in range(1, ARCHIVE_RENDER_ATTEMPTS + 1):
+        try:
+            path = warm_func(doc_id)
+            if not path:
+                raise LookupError("Document could not be loaded.")
+            return path
+        except pdf_pool.PdfPoolBusy:
+            if attempt == ARCHIVE_RENDER_ATTEMPTS:
+                raise
+            time.sleep(pdf_pool.RETRY_AFTER_SECONDS)
+
+
+def _list_period_documents(cursor, doc_type, period_start, period_end):
+    """Returns [(doc_id, entry_name)] for the bills or challans of a period."""
+    if doc_type == 'bills':
+        cursor.execute(
+            "SELECT bill_id, billing_period FROM monthly_bills WHERE billing_period = %s ORDER BY bill_id",
+            (period_start.strftime('%Y-%m'),)
+        )
+        return [(row['bill_id'], f"Invoice_{format_bill_no(row['billing_period'], row['bill_id'])}.pdf")
+                for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT challan_id FROM challans WHERE challan_date >= %s AND challan_date < %s ORDER BY challan_id",
+        (period_start, period_end)
+    )
+    return [(row['challan_id'], f"Challan_OC{row['challan_id']:03d}.pdf") for row in cursor.fetchall()]
+
+
+def _open_rendered(warm_func, doc_id, path):
+    """Opens a rendered document, rendering it again if its cached file was pruned in the meantime."""
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        return open(_render_with_retry(warm_func, doc_id), 'rb')
+
+
+def _stream_archive(documents, warm_func):
+    stream = _ZipStream()
+    errors = []
+    # Threads only wait on the render pool; the pool processes do the rendering
+    executor = ThreadPoolExecutor(max_workers=pdf_pool.PDF_RENDER_WORKERS, thread_name_prefix="pdf-archive")
+    try:
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+            futures = {executor.submit(_render_with_retry, warm_func, doc_id): (doc_id, name)
+                       for doc_id, name in documents}
+            for future in as_completed(futures):
+                doc_id, name = futures[future]
+                try:
+                    pdf_file = _open_rendered(warm_func, doc_id, future.result())
+                except Exception as e:
+                    logging.warning(f"Archive: could not render {name} (id {doc_id}): {e}")
+                    errors.append(f"{name}: {e}")
+                    continue
+                # PDFs are already compressed, so entries are stored as-is
+                with pdf_file, archive.open(name, 'w') as entry:
+                    while True:
+                        chunk = pdf_file.read(ARCHIVE_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        yield stream.pop()
+                yield stream.pop()
+
+            if errors:
+                archive.writestr("ERRORS.txt", "These documents could not be generated:\n" + "\n".join(errors) + "\n")
+        yield stream.pop() # Central directory, written when the archive closes
+    except GeneratorExit:
+        # The client went away: drop the documents that have not started rendering
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+
+# --- Document Endpoints ---
+
+@document_bp.route('/documents/archive', methods=['GET'])
+def get_document_archive():
+    doc_type = request.args.get('type', 'bills')
+    period = request.args.get('period', '')
+    if doc_type not in ('bills', 'challans'):
+        return jsonify({"error": "Invalid type. Use bills or challans."}), 400
+    try:
+        year, month = map(int, period.split('-'))
+        period_start = date(year, month, 1)
+    except ValueError:
+        return jsonify({"error": "Invalid period. Use YYYY-MM."}), 400
+    period_end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        documents = _list_period_documents(cursor, doc_type, period_start, period_end)
+    except mysql.connector.Error as err:
+        logging.error(f"Error listing {doc_type} for archive {period}: {err}", exc_info=True)
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not documents:
+        return jsonify({"error": f"No {doc_type} found for {period}."}), 404
+
+    warm_func = warm_bill_pdf if doc_type == 'bills' else warm_challan_pdf
+    label = "Invoices" if doc_type == 'bills' else "Challans"
+    response = Response(_stream_archive(documents, warm_func), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{label}_{period_start.strftime("%Y-%m")}.zip"'
+    response.headers['X-Document-Count'] = str(len(documents))
+    return response
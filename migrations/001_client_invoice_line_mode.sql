@@ -0,0 +1,12 @@
+-- migrations/001_client_invoice_line_mode.sql
+-- Adds a per-client setting that controls how monthly invoice lines are grouped.
+--   itemized        : one line per order item (original behaviour)
+--   by_product      : one line per product and unit price for the whole month
+--   by_product_date : one line per product and unit price for each challan date
+
+ALTER TABLE clients
+    ADD COLUMN invoice_line_mode ENUM('itemized', 'by_product', 'by_product_date')
+        NOT NULL DEFAULT 'itemized';
+
+-- Supports the grouped items query, which walks challans by monthly_bill_id.
+CREATE INDEX idx_challans_monthly_bill ON challans (monthly_bill_id, challan_date);
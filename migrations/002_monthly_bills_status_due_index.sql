@@ -0,0 +1,5 @@
+-- migrations/002_monthly_bills_status_due_index.sql
+-- Index for the receivables aging report (GET /reports/aging), which reads
+-- unpaid bills by status and buckets them by due_date.
+
+CREATE INDEX idx_monthly_bills_status_due ON monthly_bills (status, due_date);
@@ -0,0 +1,24 @@
+-- migrations/003_overdue_sweep_event.sql
+-- Nightly sweep that persists the 'Overdue' bill status, so the dashboard and
+-- bills list can filter on the indexed status column instead of comparing dates.
+-- Adds 'Overdue' to monthly_bills.status (as MonthlyBillsPage expects) and
+-- requires the event scheduler to be on (SET GLOBAL event_scheduler = ON).
+-- The same statement is available as overdue_sweep.py for cron or manual runs.
+
+-- The sweep writes 'Overdue'; without it in the ENUM the UPDATE fails in strict
+-- mode, or stores '' otherwise. 'Cancelled' is kept for the bills UI.
+ALTER TABLE monthly_bills
+    MODIFY status ENUM('Unpaid', 'Paid', 'Overdue', 'Cancelled') NOT NULL DEFAULT 'Unpaid';
+
+CREATE EVENT IF NOT EXISTS ev_sweep_overdue_bills
+    ON SCHEDULE EVERY 1 DAY
+    STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 5 MINUTE)
+    DO
+        UPDATE monthly_bills
+        SET status = 'Overdue'
+        WHERE status = 'Unpaid' AND due_date < CURDATE();
+
+-- Bring existing bills up to date once.
+UPDATE monthly_bills
+SET status = 'Overdue'
+WHERE status = 'Unpaid' AND due_date < CURDATE();
@@ -0,0 +1,70 @@
+-- migrations/004_bill_lines.sql
+-- Snapshot of each monthly bill's invoice lines, written in the same transaction
+-- that generates the bill (POST /monthly-bills). Bill PDFs read their lines from
+-- here, so renaming a product or changing a client's invoice_line_mode later no
+-- longer changes invoices that were already issued.
+-- Lines are grouped per the client's invoice_line_mode at generation time.
+
+CREATE TABLE bill_lines (
+    bill_id INT NOT NULL,
+    line_no INT NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    quantity INT NOT NULL,
+    price_per_unit DECIMAL(10, 2) NOT NULL,
+    item_total DECIMAL(12, 2) NOT NULL,
+    challan_date DATE NULL, -- NULL for by_product lines, which span several dates
+    PRIMARY KEY (bill_id, line_no),
+    CONSTRAINT fk_bill_lines_bill FOREIGN KEY (bill_id)
+        REFERENCES monthly_bills (bill_id) ON DELETE CASCADE
+);
+
+-- Backfill existing bills once, using each client's current invoice_line_mode
+-- (the same queries as bill_routes.INVOICE_ITEMS_QUERIES).
+INSERT INTO bill_lines (bill_id, line_no, name, quantity, price_per_unit, item_total, challan_date)
+SELECT
+    ch.monthly_bill_id,
+    ROW_NUMBER() OVER (PARTITION BY ch.monthly_bill_id ORDER BY ch.challan_date, p.name),
+    p.name, oi.quantity, oi.price_per_unit, oi.quantity * oi.price_per_unit, ch.challan_date
+FROM order_items oi
+JOIN products p ON oi.product_id = p.product_id
+JOIN orders o ON oi.order_id = o.order_id
+JOIN challans ch ON o.associated_challan_id = ch.challan_id
+JOIN monthly_bills mb ON ch.monthly_bill_id = mb.bill_id
+JOIN clients c ON mb.client_id = c.client_id
+WHERE c.invoice_line_mode = 'itemized';
+
+INSERT INTO bill_lines (bill_id, line_no, name, quantity, price_per_unit, item_total, challan_date)
+SELECT
+    g.monthly_bill_id,
+    ROW_NUMBER() OVER (PARTITION BY g.monthly_bill_id ORDER BY g.name, g.price_per_unit),
+    g.name, g.quantity, g.price_per_unit, g.item_total, NULL
+FROM (
+    SELECT ch.monthly_bill_id, p.name, oi.price_per_unit,
+           SUM(oi.quantity) AS quantity, SUM(oi.quantity * oi.price_per_unit) AS item_total
+    FROM challans ch
+    JOIN orders o ON o.associated_challan_id = ch.challan_id
+    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN products p ON oi.product_id = p.product_id
+    JOIN monthly_bills mb ON ch.monthly_bill_id = mb.bill_id
+    JOIN clients c ON mb.client_id = c.client_id
+    WHERE c.invoice_line_mode = 'by_product'
+    GROUP BY ch.monthly_bill_id, oi.product_id, p.name, oi.price_per_unit
+) g;
+
+INSERT INTO bill_lines (bill_id, line_no, name, quantity, price_per_unit, item_total, challan_date)
+SELECT
+    g.monthly_bill_id,
+    ROW_NUMBER() OVER (PARTITION BY g.monthly_bill_id ORDER BY g.challan_date, g.name),
+    g.name, g.quantity, g.price_per_unit, g.item_total, g.challan_date
+FROM (
+    SELECT ch.monthly_bill_id, ch.challan_date, p.name, oi.price_per_unit,
+           SUM(oi.quantity) AS quantity, SUM(oi.quantity * oi.price_per_unit) AS item_total
+    FROM challans ch
+    JOIN orders o ON o.associated_challan_id = ch.challan_id
+    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN products p ON oi.product_id = p.product_id
+    JOIN monthly_bills mb ON ch.monthly_bill_id = mb.bill_id
+    JOIN clients c ON mb.client_id = c.client_id
+    WHERE c.invoice_line_mode = 'by_product_date'
+    GROUP BY ch.monthly_bill_id, ch.challan_date, oi.product_id, p.name, oi.price_per_unit
+) g;
@@ -0,0 +1,6 @@
+-- migrations/005_products_image_url_index.sql
+-- Reference index of stored uploads: which products use which file.
+-- upload_gc.py reads the distinct referenced names from it (an index-only
+-- scan), and deleting a product checks whether its image is still shared.
+
+CREATE INDEX idx_products_image_url ON products (image_url);
@@ -0,0 +1,26 @@
+-- migrations/006_table_versions.sql
+-- Change counters behind the ETags of the list endpoints (table_versions.py).
+-- Write routes bump a table's version in the same transaction as the change.
+-- Run with the mysql client (uses DELIMITER for the event body).
+
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 1
+);
+
+INSERT INTO table_versions (table_name) VALUES
+    ('products'), ('clients'), ('orders'), ('challans'), ('monthly_bills'), ('client_pricing');
+
+-- The nightly overdue sweep (migration 003) changes bill statuses too.
+DELIMITER $$
+ALTER EVENT ev_sweep_overdue_bills
+    DO
+    BEGIN
+        UPDATE monthly_bills
+        SET status = 'Overdue'
+        WHERE status = 'Unpaid' AND due_date < CURDATE();
+        IF ROW_COUNT() > 0 THEN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = 'monthly_bills';
+        END IF;
+    END$$
+DELIMITER ;
@@ -0,0 +1,69 @@
+-- migrations/007_low_stock_tracking.sql
+-- Indexed low-stock flag and low-stock change events.
+-- products.is_low_stock is a stored generated column, so MySQL keeps it in step
+-- with stock_quantity and low_stock_threshold on every write (orders, order
+-- deletes, product edits, imports) and /products/low-stock is an index lookup.
+-- Triggers record a row in low_stock_events whenever a product crosses its
+-- threshold in either direction (or a low product is deleted), and bump the
+-- 'low_stock' version whenever a product on the low-stock list changes, so the
+-- dashboard's conditional GET of the list only downloads it when it changed.
+-- Run with the mysql client (uses DELIMITER for the trigger bodies).
+
+ALTER TABLE products
+    ADD COLUMN is_low_stock BOOLEAN AS (stock_quantity <= low_stock_threshold) STORED,
+    ADD INDEX idx_products_low_stock (is_low_stock);
+
+CREATE TABLE low_stock_events (
+    event_id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    is_low_stock BOOLEAN NOT NULL,      -- TRUE: fell to or below the threshold; FALSE: back above it, or deleted
+    stock_quantity INT NULL,
+    low_stock_threshold INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_low_stock_events_created_at (created_at)
+);
+
+INSERT INTO table_versions (table_name) VALUES ('low_stock');
+
+DELIMITER $$
+
+CREATE TRIGGER trg_products_low_stock_insert AFTER INSERT ON products
+FOR EACH ROW
+BEGIN
+    IF NEW.is_low_stock THEN
+        INSERT INTO low_stock_events (product_id, is_low_stock, stock_quantity, low_stock_threshold)
+        VALUES (NEW.product_id, TRUE, NEW.stock_quantity, NEW.low_stock_threshold);
+        UPDATE table_versions SET version = version + 1 WHERE table_name = 'low_stock';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_products_low_stock_update AFTER UPDATE ON products
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.is_low_stock <=> OLD.is_low_stock) THEN
+        INSERT INTO low_stock_events (product_id, is_low_stock, stock_quantity, low_stock_threshold)
+        VALUES (NEW.product_id, COALESCE(NEW.is_low_stock, FALSE), NEW.stock_quantity, NEW.low_stock_threshold);
+    END IF;
+    IF OLD.is_low_stock OR NEW.is_low_stock THEN
+        UPDATE table_versions SET version = version + 1 WHERE table_name = 'low_stock';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_products_low_stock_delete AFTER DELETE ON products
+FOR EACH ROW
+BEGIN
+    IF OLD.is_low_stock THEN
+        INSERT INTO low_stock_events (product_id, is_low_stock, stock_quantity, low_stock_threshold)
+        VALUES (OLD.product_id, FALSE, OLD.stock_quantity, OLD.low_stock_threshold);
+        UPDATE table_versions SET version = version + 1 WHERE table_name = 'low_stock';
+    END IF;
+END$$
+
+-- Events are only needed until every dashboard has seen them
+CREATE EVENT IF NOT EXISTS ev_prune_low_stock_events
+    ON SCHEDULE EVERY 1 DAY
+    STARTS (CURRENT_DATE + INTERVAL 1 DAY + INTERVAL 10 MINUTE)
+    DO
+        DELETE FROM low_stock_events WHERE created_at < NOW() - INTERVAL 30 DAY$$
+
+DELIMITER ;
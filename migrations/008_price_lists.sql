@@ -0,0 +1,34 @@
+-- migrations/008_price_lists.sql
+-- Named price lists shared by many clients (price_list_routes.py).
+-- A client follows at most one price list (clients.price_list_id); its rows in
+-- client_pricing are now overrides on top of that list. The effective price of
+-- a product for a client is, in order: the client's override, the rate in the
+-- client's price list, the product's own price. create_new_order resolves it
+-- with one statement of primary-key lookups (EFFECTIVE_PRICE_QUERY in app.py).
+
+CREATE TABLE price_lists (
+    price_list_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_price_lists_name (name)
+);
+
+CREATE TABLE price_list_items (
+    price_list_id INT NOT NULL,
+    product_id INT NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (price_list_id, product_id),
+    INDEX idx_price_list_items_product (product_id),
+    CONSTRAINT fk_price_list_items_list FOREIGN KEY (price_list_id)
+        REFERENCES price_lists (price_list_id) ON DELETE CASCADE,
+    CONSTRAINT fk_price_list_items_product FOREIGN KEY (product_id)
+        REFERENCES products (product_id) ON DELETE CASCADE
+);
+
+-- Deleting a list returns its clients to default prices (plus their overrides)
+ALTER TABLE clients
+    ADD COLUMN price_list_id INT NULL,
+    ADD CONSTRAINT fk_clients_price_list FOREIGN KEY (price_list_id)
+        REFERENCES price_lists (price_list_id) ON DELETE SET NULL;
+
+INSERT INTO table_versions (table_name) VALUES ('price_lists');
@@ -0,0 +1,46 @@
+# overdue_sweep.py
+# Moves unpaid monthly bills past their due_date to 'Overdue'.
+# Runs nightly through the MySQL event in migrations/003_overdue_sweep_event.sql.
+# It can also be run by hand or from cron on hosts without the event scheduler:
+#   python overdue_sweep.py        or        flask --app app sweep-overdue
+
+import logging
+from datetime import date
+
+from db import get_db_connection
+import table_versions
+
+# Served by idx_monthly_bills_status_due (status, due_date): a range scan over
+# the 'Unpaid' entries whose due_date is already past.
+OVERDUE_SWEEP_QUERY = """
+    UPDATE monthly_bills
+    SET status = 'Overdue'
+    WHERE status = 'Unpaid' AND due_date < %s
+"""
+
+def sweep_overdue_bills(as_of=None):
+    """Marks every unpaid bill due before `as_of` (default today) as Overdue. Returns the row count."""
+    as_of = as_of or date.today()
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(OVERDUE_SWEEP_QUERY, (as_of,))
+        updated = cursor.rowcount
+        if updated:
+            table_versions.bump(cursor, 'monthly_bills')
+        conn.commit()
+        logging.info(f"Overdue sweep: {updated} bill(s) marked Overdue (due before {as_of}).")
+        return updated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    print(f"{sweep_overdue_bills()} bill(s) marked Overdue.")
@@ -49,6 +49,14 @@ class ClientsPage(QWidget):
         self.add_client_btn.clicked.connect(self.main_window.open_client_dialog)
         header_layout.addWidget(self.add_client_btn)
 
+        # --- Shared Price Lists Button ---
+        self.price_lists_button = QPushButton(QIcon(self.main_window.ICON_PRICING), " Price Lists")
+        self.price_lists_button.setToolTip("Manage price lists shared by several clients")
+        self.price_lists_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.price_lists_button.setFixedHeight(40)
+        self.price_lists_button.clicked.connect(self.main_window.open_price_lists_window)
+        header_layout.addWidget(self.price_lists_button)
+
         # --- Export Buttons ---
         self.export_csv_button = QPushButton()
         self.export_csv_button.setIcon(QIcon(self.main_window.ICON_CSV))
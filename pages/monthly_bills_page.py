@@ -62,6 +62,13 @@ class MonthlyBillsPage(QWidget):
         self.search_bar.textChanged.connect(self.filter_table)
         filter_search_layout.addWidget(self.search_bar)
 
+        # Reconcile: Bank statement upload
+        self.reconcile_button = QPushButton(QIcon(self.main_window.ICON_PAID), "")
+        self.reconcile_button.setObjectName("FilterButton")
+        self.reconcile_button.setToolTip("Reconcile Bank Statement")
+        self.reconcile_button.clicked.connect(self.main_window.open_reconcile_dialog)
+        filter_search_layout.addWidget(self.reconcile_button)
+
         # Export: CSV
         self.export_csv_button = QPushButton(QIcon(self.main_window.ICON_CSV), "")
         self.export_csv_button.setToolTip("Export to CSV")
@@ -140,6 +147,17 @@ class MonthlyBillsPage(QWidget):
         self.bill_status_label.setObjectName("StatusLabel")
         grid_layout.addWidget(self.bill_status_label, 1, 4)
 
+        # Month-end downloads for the selected period
+        self.download_all_bills_button = QPushButton(QIcon(self.main_window.ICON_PDF), " All Invoices")
+        self.download_all_bills_button.setToolTip("Download all invoices for the selected period as a ZIP")
+        self.download_all_bills_button.clicked.connect(lambda: self.main_window.download_document_archive("bills"))
+        grid_layout.addWidget(self.download_all_bills_button, 1, 5)
+
+        self.download_all_challans_button = QPushButton(QIcon(self.main_window.ICON_PDF), " All Challans")
+        self.download_all_challans_button.setToolTip("Download all challans for the selected period as a ZIP")
+        self.download_all_challans_button.clicked.connect(lambda: self.main_window.download_document_archive("challans"))
+        grid_layout.addWidget(self.download_all_challans_button, 1, 6)
+
         grid_layout.setColumnStretch(4, 1)
 
         return frame
@@ -53,6 +53,14 @@ class ProductsPage(QWidget):
         self.add_product_btn.clicked.connect(self.main_window.open_product_dialog)
         header_layout.addWidget(self.add_product_btn)
 
+        # Import Button (CSV or Excel sheet of products and stock counts)
+        self.import_button = QPushButton("Import")
+        self.import_button.setToolTip("Import products and stock from a CSV or Excel file")
+        self.import_button.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.import_button.setFixedHeight(40)
+        self.import_button.clicked.connect(self.main_window.import_products_file)
+        header_layout.addWidget(self.import_button)
+
         # Export Buttons
         self.export_csv_button = QPushButton()
         self.export_csv_button.setIcon(QIcon(self.main_window.ICON_CSV))
@@ -0,0 +1,121 @@
+# pdf_assets.py
+# Registry of the static images embedded in generated PDFs (bill header/footer).
+# Each image is decoded, converted to RGB and compressed into FPDF's internal
+# image format once per process, on first use. Every new PDF then gets a copy of
+# the prepared entry in its image cache, so FPDF.image() embeds the stored stream
+# directly instead of opening, converting and re-encoding the PNG on every page.
+#
+# In the default 'compact' output mode each image is also downsampled to
+# PDF_IMAGE_DPI at the width it is printed, and stored with a 256-colour palette
+# (lossless for images that have no more colours than that). 'full' embeds the
+# images at their original resolution and colour depth.
+#
+# The ReportLab engine draws the same prepared images, via get_image().
+
+import os
+import logging
+import threading
+
+from PIL import Image
+from fpdf.image_parsing import get_img_info
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PDF_OUTPUT_MODES = ('compact', 'full')
+PDF_OUTPUT_MODE = os.environ.get("PDF_OUTPUT_MODE", "compact")
+PDF_IMAGE_DPI = int(os.environ.get("PDF_IMAGE_DPI", "150"))
+
+# Asset key -> (file name relative to ASSET_DIR, printed width in mm)
+IMAGE_ASSETS = {
+    "bill_header": ("Bill Header.png", 190),
+    "bill_footer": ("Bill Footer.png", 190),
+}
+
+_prepared = {} # key -> FPDF image info dict, or None if the file could not be loaded
+_images = {}   # key -> prepared PIL image, or None if the file could not be loaded
+_lock = threading.Lock()
+
+
+def _asset_name(key):
+    """The name the asset is registered under in a PDF's image cache."""
+    return f"asset:{key}"
+
+
+def _compact(img, width_mm):
+    """Downsamples to PDF_IMAGE_DPI at the printed width and reduces to a 256-colour palette."""
+    max_width_px = round(width_mm / 25.4 * PDF_IMAGE_DPI)
+    if img.width > max_width_px:
+        # BOX averages each source area: no ringing, so fewer new colours for the palette
+        img = img.resize((max_width_px, max(1, round(img.height * max_width_px / img.width))), Image.Resampling.BOX)
+    return img.quantize(256)
+
+
+def _load(key):
+    file_name, width_mm = IMAGE_ASSETS[key]
+    path = os.path.join(ASSET_DIR, file_name)
+    try:
+        with Image.open(path) as img:
+            rgb_img = img.convert('RGB')
+        if PDF_OUTPUT_MODE == 'compact':
+            rgb_img = _compact(rgb_img, width_mm)
+        return rgb_img
+    except Exception as e:
+        logging.warning(f"PDF asset {file_name!r} could not be loaded; falling back to text: {e}")
+        return None
+
+
+def get_image(key):
+    """Returns the prepared PIL image for an asset, loading it on first use (None if unavailable)."""
+    if key not in _images:
+        with _lock:
+            if key not in _images:
+                _images[key] = _load(key)
+    return _images[key]
+
+
+def get_image_info(key):
+    """Returns the prepared FPDF image info for an asset, preparing it on first use (None if unavailable)."""
+    if key not in _prepared:
+        img = get_image(key)
+        with _lock:
+            if key not in _prepared:
+                _prepared[key] = get_img_info(_asset_name(key), img) if img is not None else None
+    return _prepared[key]
+
+
+def set_output_mode(mode):
+    """Switches between 'compact' and 'full' images; prepared assets are rebuilt on next use."""
+    global PDF_OUTPUT_MODE
+    if mode not in PDF_OUTPUT_MODES:
+        raise ValueError(f"Unknown PDF output mode '{mode}'. Use one of: {', '.join(PDF_OUTPUT_MODES)}")
+    with _lock:
+        PDF_OUTPUT_MODE = mode
+        _prepared.clear()
+        _images.clear()
+
+
+def preload_all():
+    """Prepares every registered asset up front (e.g. at worker start-up)."""
+    for key in IMAGE_ASSETS:
+        get_image_info(key)
+
+
+def attach_image(pdf, key):
+    """
+    Makes the asset available to `pdf` and returns the name to pass to pdf.image(),
+    or None if the asset could not be loaded. Safe to call on every page.
+    """
+    name = _asset_name(key)
+    images = pdf.image_cache.images
+    if name in images:
+        return name
+    info = get_image_info(key)
+    if info is None:
+        return None
+    # Each document numbers and counts its images separately, so it needs its own copy
+    doc_info = info.__class__(info)
+    doc_info["i"] = len(images) + 1
+    doc_info["usages"] = 0
+    doc_info["iccp_i"] = None
+    images[name] = doc_info
+    return name
@@ -0,0 +1,159 @@
+# pdf_cache.py
+# On-disk cache of rendered bill and challan PDFs.
+# Files are content-addressed: each document is stored under
+# <PDF_CACHE_DIR>/<kind>/<doc_id>/<version>.pdf, where the version is a hash of
+# the data the PDF was rendered from. When the data changes the version changes,
+# so a stale file is never served. The version doubles as the HTTP ETag.
+
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import request, send_file, make_response, jsonify
+
+import pdf_assets
+import pdf_pool
+from config import PDF_ENGINE
+
+# Absolute, so paths don't depend on the working directory (send_file resolves
+# relative paths against the app root, not the CWD)
+PDF_CACHE_DIR = os.path.abspath(os.environ.get(
+    "PDF_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf_cache")))
+
+# Bump this whenever pdf_generator.py changes its output, so old files are not reused.
+RENDERER_VERSION = "3"
+
+# One year; used for documents that can no longer change (e.g. paid bills).
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Small pool for warming the cache after a bill or challan is created.
+_warm_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-warm")
+
+
+def document_version(*parts):
+    """Returns a stable hash of the given render inputs (dicts, lists, dates, Decimals)."""
+    payload = json.dumps([RENDERER_VERSION, PDF_ENGINE, pdf_assets.PDF_OUTPUT_MODE, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _doc_dir(kind, doc_id):
+    return os.path.join(PDF_CACHE_DIR, kind, str(doc_id))
+
+
+def cached_path(kind, doc_id, version):
+    """Returns the path of the cached PDF for this version, or None if it has not been rendered."""
+    path = os.path.join(_doc_dir(kind, doc_id), f"{version}.pdf")
+    return path if os.path.isfile(path) else None
+
+
+def store(kind, doc_id, version, pdf_buffer):
+    """Atomically writes a rendered PDF to the cache and removes older versions of the document."""
+    doc_dir = _doc_dir(kind, doc_id)
+    os.makedirs(doc_dir, exist_ok=True)
+    final_path = os.path.join(doc_dir, f"{version}.pdf")
+
+    fd, tmp_path = tempfile.mkstemp(dir=doc_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_buffer.getvalue())
+        os.replace(tmp_path, final_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    for name in os.listdir(doc_dir):
+        if name.endswith(".pdf") and name != f"{version}.pdf":
+            try:
+                os.remove(os.path.join(doc_dir, name))
+            except OSError as e:
+                logging.warning(f"Could not prune old cached PDF {name} for {kind} {doc_id}: {e}")
+    return final_path
+
+
+def purge(kind, doc_id):
+    """Removes every cached version of a document (e.g. after it is deleted)."""
+    doc_dir = _doc_dir(kind, doc_id)
+    if not os.path.isdir(doc_dir):
+        return
+    for name in os.listdir(doc_dir):
+        try:
+            os.remove(os.path.join(doc_dir, name))
+        except OSError as e:
+            logging.warning(f"Could not remove cached PDF {name} for {kind} {doc_id}: {e}")
+    try:
+        os.rmdir(doc_dir)
+    except OSError:
+        pass
+
+
+def render_to_cache(kind, doc_id, version, render):
+    """Renders and stores the PDF unless this version is already cached. Returns the file path."""
+    path = cached_path(kind, doc_id, version)
+    if path:
+        return path
+    return store(kind, doc_id, version, render())
+
+
+def open_cached(kind, doc_id, version, render):
+    """
+    Returns this version of the PDF as an open binary file, rendering it on a miss.
+    Once open, the file stays readable even if a store of another version prunes it.
+    """
+    path = render_to_cache(kind, doc_id, version, render)
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        # Pruned by a concurrent store of another version before it could be opened
+        pdf_buffer = render()
+        pdf_buffer.seek(0)
+        return pdf_buffer
+
+
+def send_cached_pdf(kind, doc_id, version, render, download_name, immutable=False):
+    """
+    Serves a PDF from the cache, rendering it with `render()` only on a miss.
+    Answers If-None-Match with 304 before touching the cache or the renderer,
+    and with 503 if the render pool is saturated or the render times out.
+    """
+    if request.if_none_match.contains(version):
+        response = make_response("", 304)
+        response.set_etag(version)
+        return response
+
+    try:
+        pdf_file = open_cached(kind, doc_id, version, render)
+    except pdf_pool.PdfPoolError as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(pdf_pool.RETRY_AFTER_SECONDS)
+        return response
+
+    response = send_file(
+        pdf_file,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=download_name,
+        etag=version,
+        conditional=True,
+        max_age=IMMUTABLE_MAX_AGE if immutable else 0,
+    )
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def warm_in_background(func, *args):
+    """Runs func(*args) on the warm-up pool; failures are logged and never reach the caller."""
+    def _run():
+        try:
+            func(*args)
+        except Exception as e:
+            logging.warning(f"Background PDF warm-up failed for {func.__name__}{args}: {e}", exc_info=True)
+    _warm_executor.submit(_run)
@@ -0,0 +1,207 @@
+# pdf_fonts.py
+# Registry of the TrueType fonts bundled with the app for generated PDFs.
+# Each font file is located and parsed once per process, on first use: the
+# glyph metrics and character map are kept and shared by every later document.
+# Each document only gets its own lightweight copy of the parsed font, because
+# FPDF subsets the font tables in place when the document is written out.
+# The subset itself is cached too, per set of glyphs: documents using the same
+# characters (the challan header always does) hand FPDF a font already cut down
+# to those glyphs, so the subsetting it repeats on output only walks a few glyphs
+# instead of the whole font. FPDF 2.8.9 has no hook to embed ready-made subset
+# bytes (OutputProducer._add_fonts always runs the fontTools subsetter and saves
+# the result), so that pass over the small font remains: the challan gains about
+# 2 ms of ~29 ms, not the whole subsetting cost.
+#
+# The same fonts are registered with ReportLab (once per process) for the
+# ReportLab engine in pdf_reportlab.py.
+#
+# Font files are matched case-insensitively, so 'Elephant.ttf' is found on a
+# case-sensitive file system too. A font that can't be found or parsed is
+# reported once, with the path that was searched, and documents fall back to a
+# core font.
+
+import io
+import os
+import copy
+import logging
+import threading
+
+from fpdf import FPDF
+from fpdf.fonts import SubsetMap
+from fontTools import ttLib
+from fontTools import subset as ftsubset
+
+FONT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Family name used with set_font() -> font file name (relative to FONT_DIR)
+FONT_FILES = {
+    "Elephant": "Elephant.ttf",
+}
+
+_prepared = {} # family -> (prototype TTFFont, serialized font tables), or None if unavailable
+_subsets = {} # (family, glyph names) -> font tables cut down to those glyphs, names kept
+_reportlab_fonts = {} # family -> registered ReportLab font name, or None if unavailable
+_lock = threading.Lock()
+_stats = {"parsed": 0, "reused": 0, "unavailable": 0, "subsets_built": 0, "subsets_reused": 0}
+
+# Cached subsets are capped; a font used for free text would otherwise grow it without bound
+MAX_CACHED_SUBSETS = 64
+
+
+def _resolve_path(file_name):
+    """Returns the path of a font file in FONT_DIR, ignoring case, or None if it does not exist."""
+    exact_path = os.path.join(FONT_DIR, file_name)
+    if os.path.isfile(exact_path):
+        return exact_path
+    wanted = file_name.lower()
+    for name in os.listdir(FONT_DIR):
+        if name.lower() == wanted:
+            return os.path.join(FONT_DIR, name)
+    return None
+
+
+def _prepare(family):
+    file_name = FONT_FILES[family]
+    path = _resolve_path(file_name)
+    if path is None:
+        logging.error(f"PDF font '{family}' not found: no file named '{file_name}' (any case) in {FONT_DIR}. "
+                      f"Documents will use Helvetica instead.")
+        return None
+    try:
+        scratch = FPDF()
+        scratch.add_font(family, "", path)
+        prototype = scratch.fonts[family.lower()]
+        # Keep the tables as FPDF prepared them (it may add a .notdef glyph), for per-document copies
+        buffer = io.BytesIO()
+        prototype.ttfont.save(buffer)
+    except Exception as e:
+        logging.error(f"PDF font '{family}' could not be loaded from {path}: {e}. "
+                      f"Documents will use Helvetica instead.")
+        return None
+    _stats["parsed"] += 1
+    logging.info(f"PDF font '{family}' loaded from {path}")
+    return prototype, buffer.getvalue()
+
+
+def _get_prepared(family):
+    if family not in _prepared:
+        with _lock:
+            if family not in _prepared:
+                _prepared[family] = _prepare(family)
+    return _prepared[family]
+
+
+def preload_all():
+    """Parses every registered font up front (e.g. at worker start-up)."""
+    for family in FONT_FILES:
+        _get_prepared(family)
+
+
+def add_font(pdf, family):
+    """
+    Makes a registered font available to `pdf` under `family`.
+    Returns True on success, False if the font is unavailable (the reason is logged once).
+    """
+    fontkey = family.lower()
+    if fontkey in pdf.fonts:
+        return True
+    prepared = _get_prepared(family)
+    if prepared is None:
+        _stats["unavailable"] += 1
+        return False
+    prototype, font_tables = prepared
+
+    # Metrics, character map and descriptor are shared; subsetting state is per document
+    font = copy.copy(prototype)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(io.BytesIO(font_tables), recalcTimestamp=False, lazy=True)
+    font.subset = SubsetMap(font)
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    font._hbfont = None
+    pdf.fonts[fontkey] = font
+    _stats["reused"] += 1
+    return True
+
+
+def _subset_options():
+    # As FPDF's own subsetting on output (fpdf/output.py, _add_fonts), but keeping
+    # glyph names so FPDF can find the glyphs again when it subsets this result
+    options = ftsubset.Options(notdef_outline=True, recommended_glyphs=True, glyph_names=True)
+    options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "MATH", "hdmx", "meta", "sbix",
+                            "CBDT", "CBLC", "EBDT", "EBLC", "EBSC", "SVG ", "CPAL", "COLR"]
+    return options
+
+
+def _build_subset(font_tables, glyph_names):
+    ttfont = ttLib.TTFont(io.BytesIO(font_tables), recalcTimestamp=False, lazy=True)
+    subsetter = ftsubset.Subsetter(_subset_options())
+    subsetter.populate(glyphs=glyph_names)
+    subsetter.subset(ttfont)
+    buffer = io.BytesIO()
+    ttfont.save(buffer)
+    return buffer.getvalue()
+
+
+def before_output(pdf):
+    """
+    Call just before pdf.output(): gives each registry font of `pdf` tables already
+    subset to the glyphs the document used, from the cache when another document used the same.
+    """
+    for family in FONT_FILES:
+        font = pdf.fonts.get(family.lower())
+        if font is None or not _prepared.get(family):
+            continue
+        glyph_names = font.subset.get_all_glyph_names()
+        key = (family, frozenset(glyph_names))
+        tables = _subsets.get(key)
+        if tables is None:
+            try:
+                tables = _build_subset(_prepared[family][1], glyph_names)
+            except Exception as e:
+                logging.warning(f"Could not pre-subset PDF font '{family}': {e}")
+                continue # FPDF subsets the full font itself
+            with _lock:
+                if len(_subsets) >= MAX_CACHED_SUBSETS:
+                    _subsets.pop(next(iter(_subsets)))
+                _subsets[key] = tables
+            _stats["subsets_built"] += 1
+        else:
+            _stats["subsets_reused"] += 1
+        font.ttfont = ttLib.TTFont(io.BytesIO(tables), recalcTimestamp=False, lazy=True)
+
+
+def reportlab_font(family):
+    """
+    Registers a bundled font with ReportLab and returns its font name,
+    or None if the font is unavailable (the reason is logged once).
+    """
+    if family not in _reportlab_fonts:
+        with _lock:
+            if family not in _reportlab_fonts:
+                _reportlab_fonts[family] = _register_reportlab(family)
+    return _reportlab_fonts[family]
+
+
+def _register_reportlab(family):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    path = _resolve_path(FONT_FILES[family])
+    if path is None:
+        logging.error(f"PDF font '{family}' not found: no file named '{FONT_FILES[family]}' (any case) in {FONT_DIR}. "
+                      f"Documents will use Helvetica instead.")
+        return None
+    try:
+        pdfmetrics.registerFont(TTFont(family, path))
+    except Exception as e:
+        logging.error(f"PDF font '{family}' could not be loaded from {path}: {e}. "
+                      f"Documents will use Helvetica instead.")
+        return None
+    _stats["parsed"] += 1
+    return family
+
+
+def stats():
+    """Counts of fonts parsed, per-document copies served, requests for unavailable fonts and subsets built/reused."""
+    return dict(_stats)
@@ -5,9 +5,22 @@ import io
 from fpdf import FPDF
 from num2words import num2words
 from datetime import datetime
-from PIL import Image # Import the Pillow library
 
-class PDF(FPDF):
+# Header/footer images are decoded once per process, not once per page
+import pdf_assets
+# Table grids, bank details and borders are drawn once per process, then replayed
+import pdf_templates
+# Bundled TTF fonts are parsed once per process
+import pdf_fonts
+# Alternative drawing engine with the same layout API
+from pdf_reportlab import ReportLabDocument
+from config import PDF_ENGINE, PDF_ENGINES
+
+class DocumentChrome:
+    """
+    Page header and footer shared by both engines. The engine class provides the
+    FPDF-style drawing calls plus draw_asset() and use_bundled_font().
+    """
     def __init__(self, company_details, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.company_details = company_details
@@ -44,19 +57,10 @@ class PDF(FPDF):
 
     def header(self):
         if self.is_monthly_bill:
-            try:
-                with Image.open('Bill Header.png') as img:
-                    rgb_img = img.convert('RGB')
-                    with io.BytesIO() as temp_img_buffer:
-                        rgb_img.save(temp_img_buffer, format='PNG')
-                        temp_img_buffer.seek(0)
-                        
-                        page_width = self.w - self.l_margin - self.r_margin
-                        self.image(temp_img_buffer, x=self.l_margin, y=8, w=page_width, type='PNG')
-                
+            page_width = self.w - self.l_margin - self.r_margin
+            if self.draw_asset("bill_header", self.l_margin, 8, page_width):
                 self.set_y(45)
-            except Exception as e:
-                print(f"!!! PDF HEADER WARNING: Could not load 'Bill Header.png'. Falling back to text. Reason: {e}")
+            else:
                 self._draw_text_header()
             
             self.set_font("Helvetica", "B", 14)
@@ -65,9 +69,9 @@ class PDF(FPDF):
         else:
             # Challan Header
             self.set_y(15)
-            try:
+            if "elephant" in self.fonts:
                 self.set_font("Elephant", "", 16)
-            except RuntimeError:
+            else:
                 self.set_font("Helvetica", "B", 16)
             
             self.set_text_color(2, 122, 235)
@@ -84,18 +88,9 @@ class PDF(FPDF):
 
     def footer(self):
         if self.is_monthly_bill:
-            try:
-                with Image.open('Bill Footer.png') as img:
-                    rgb_img = img.convert('RGB')
-                    with io.BytesIO() as temp_img_buffer:
-                        rgb_img.save(temp_img_buffer, format='PNG')
-                        temp_img_buffer.seek(0)
-                        
-                        page_width = self.w - self.l_margin - self.r_margin
-                        footer_height = 20
-                        self.image(temp_img_buffer, x=self.l_margin, y=self.h - footer_height - 15, w=page_width, type='PNG')
-            except Exception as e:
-                print(f"!!! PDF FOOTER WARNING: Could not load 'Bill Footer.png'. Falling back to text. Reason: {e}")
+            page_width = self.w - self.l_margin - self.r_margin
+            footer_height = 20
+            if not self.draw_asset("bill_footer", self.l_margin, self.h - footer_height - 15, page_width):
                 self._draw_text_footer()
         
         elif not self.is_monthly_bill:
@@ -106,8 +101,40 @@ class PDF(FPDF):
             self.set_x(20)
             self.cell(0, 8, "OnLine Services LLP", 0, 1, 'L')
 
-def create_monthly_bill_pdf(company_details, bill_data, items_data):
-    pdf = PDF(company_details, 'P', 'mm', 'A4')
+class PDF(DocumentChrome, FPDF):
+    def draw_asset(self, key, x, y, w):
+        """Draws a prepared image from pdf_assets at width `w`. Returns False if it is unavailable."""
+        image_name = pdf_assets.attach_image(self, key)
+        if not image_name:
+            return False
+        self.image(image_name, x=x, y=y, w=w)
+        return True
+
+    def use_bundled_font(self, family):
+        """Makes a font from pdf_fonts available to set_font(). Returns False if it is unavailable."""
+        return pdf_fonts.add_font(self, family)
+
+    def output(self, *args, **kwargs):
+        pdf_fonts.before_output(self) # Reuses the font subset of earlier documents with the same glyphs
+        return super().output(*args, **kwargs)
+
+class ReportLabPDF(DocumentChrome, ReportLabDocument):
+    pass
+
+# Engine name (config.PDF_ENGINES) -> document class
+ENGINE_CLASSES = {
+    'fpdf': PDF,
+    'reportlab': ReportLabPDF,
+}
+
+def _new_document(engine, company_details, page_format):
+    engine = engine or PDF_ENGINE
+    if engine not in ENGINE_CLASSES:
+        raise ValueError(f"Unknown PDF engine '{engine}'. Use one of: {', '.join(PDF_ENGINES)}")
+    return ENGINE_CLASSES[engine](company_details, 'P', 'mm', page_format)
+
+def create_monthly_bill_pdf(company_details, bill_data, items_data, engine=None):
+    pdf = _new_document(engine, company_details, 'A4')
     pdf.set_doc_title("INVOICE", is_monthly_bill=True)
     pdf.set_auto_page_break(auto=False)
     pdf.set_margins(10, 10, 10)
@@ -136,42 +163,69 @@ def create_monthly_bill_pdf(company_details, bill_data, items_data):
     start_x = pdf.l_margin + (drawable_width - table_width) / 2
     
     header_height = 9
-    pdf.set_x(start_x)
-    
-    pdf.set_fill_color(138, 138, 138)
-    pdf.set_font("Helvetica", "B", 10)
-    pdf.set_text_color(255, 255, 255)
-
-    header_start_y = pdf.get_y()
-    
-    pdf.multi_cell(col_widths['sr'], header_height/2, "Sr.\nNo.", 1, "C", fill=True)
-    pdf.set_y(header_start_y)
-    pdf.set_x(start_x + col_widths['sr'])
-    pdf.cell(col_widths['part'], header_height, "Particular", 1, 0, "C", fill=True)
-    pdf.multi_cell(col_widths['date'], header_height/2, "Date\nDelivery", 1, "C", fill=True)
-    pdf.set_y(header_start_y)
-    pdf.set_x(start_x + col_widths['sr'] + col_widths['part'] + col_widths['date'])
-    pdf.cell(col_widths['rate'], header_height, "Rate", 1, 0, "C", fill=True)
-    pdf.cell(col_widths['qty'], header_height, "QTY.", 1, 0, "C", fill=True)
-    pdf.cell(col_widths['amt'], header_height, "Amount", 1, 1, "C", fill=True)
-    pdf.line(start_x, header_start_y + header_height, start_x + table_width, header_start_y + header_height)
-
-    # --- FIXED SIZE TABLE ---
-    table_start_y = pdf.get_y()
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_fill_color(232, 232, 232)
-    
     num_item_rows = 20
     row_height = 7
-    for i in range(num_item_rows):
+    table_start_y = pdf.get_y() + header_height
+    table_end_y = table_start_y + (num_item_rows * row_height)
+    subtotal_label_width = table_width - col_widths['amt']
+    bank = company_details['bank_details']
+
+    def draw_static_table(pdf):
+        pdf.set_x(start_x)
+        
+        pdf.set_fill_color(138, 138, 138)
+        pdf.set_font("Helvetica", "B", 10)
+        pdf.set_text_color(255, 255, 255)
+
+        header_start_y = pdf.get_y()
+        
+        pdf.multi_cell(col_widths['sr'], header_height/2, "Sr.\nNo.", 1, "C", fill=True)
+        pdf.set_y(header_start_y)
+        pdf.set_x(start_x + col_widths['sr'])
+        pdf.cell(col_widths['part'], header_height, "Particular", 1, 0, "C", fill=True)
+        pdf.multi_cell(col_widths['date'], header_height/2, "Date\nDelivery", 1, "C", fill=True)
+        pdf.set_y(header_start_y)
+        pdf.set_x(start_x + col_widths['sr'] + col_widths['part'] + col_widths['date'])
+        pdf.cell(col_widths['rate'], header_height, "Rate", 1, 0, "C", fill=True)
+        pdf.cell(col_widths['qty'], header_height, "QTY.", 1, 0, "C", fill=True)
+        pdf.cell(col_widths['amt'], header_height, "Amount", 1, 1, "C", fill=True)
+        pdf.line(start_x, header_start_y + header_height, start_x + table_width, header_start_y + header_height)
+
+        # --- FIXED SIZE TABLE ---
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_fill_color(232, 232, 232)
+        
+        for i in range(num_item_rows):
+            pdf.set_x(start_x)
+            pdf.cell(col_widths['sr'], row_height, '', 'LR', 0, fill=True)
+            pdf.cell(col_widths['part'], row_height, '', 'LR', 0, fill=True)
+            pdf.cell(col_widths['date'], row_height, '', 'LR', 0, fill=True)
+            pdf.cell(col_widths['rate'], row_height, '', 'LR', 0, fill=True)
+            pdf.cell(col_widths['qty'], row_height, '', 'LR', 0, fill=True)
+            pdf.cell(col_widths['amt'], row_height, '', 'LR', 1, fill=True)
+
+    def draw_static_footer(pdf):
+        pdf.multi_cell(col_widths['part'], 4,
+            f"Account Details-\n"
+            f"Ac No - {bank['ac_no']}\n"
+            f"IFSC No - {bank['ifsc']}\n"
+            f"Branch - {bank['branch']}\n"
+            f"Bank Name - {bank['bank_name']}",
+            0, "L"
+        )
+
+        # --- SUMMARY ROW BORDERS (values are overlaid below) ---
+        pdf.set_y(table_end_y)
+        pdf.set_x(start_x)
+        pdf.cell(subtotal_label_width, 6, "Sub-Total", 1, 0, "R")
+        pdf.cell(col_widths['amt'], 6, "", 1, 1, "R")
         pdf.set_x(start_x)
-        pdf.cell(col_widths['sr'], row_height, '', 'LR', 0, fill=True)
-        pdf.cell(col_widths['part'], row_height, '', 'LR', 0, fill=True)
-        pdf.cell(col_widths['date'], row_height, '', 'LR', 0, fill=True)
-        pdf.cell(col_widths['rate'], row_height, '', 'LR', 0, fill=True)
-        pdf.cell(col_widths['qty'], row_height, '', 'LR', 0, fill=True)
-        pdf.cell(col_widths['amt'], row_height, '', 'LR', 1, fill=True)
+        pdf.cell(subtotal_label_width, 6, "", 1, 0, "R")
+        pdf.cell(col_widths['amt'], 6, "", 1, 1, "R")
+
+    pdf_templates.draw_skeleton(pdf, "monthly_bill_table", None, draw_static_table)
 
+    # --- LINE ITEMS ---
     current_y = table_start_y
     grand_total = 0
     for i, item in enumerate(items_data, 1):
@@ -185,7 +239,9 @@ def create_monthly_bill_pdf(company_details, bill_data, items_data):
         pdf.cell(col_widths['part'], row_height, item['name'], 0, 0, "L")
         
         pdf.set_font("Helvetica", "", 10)
-        pdf.cell(col_widths['date'], row_height, item['challan_date'].strftime('%d-%b'), 0, 0, "C")
+        # Grouped invoice lines (by_product mode) span several dates and carry no challan_date
+        delivery_text = item['challan_date'].strftime('%d-%b') if item.get('challan_date') else ''
+        pdf.cell(col_widths['date'], row_height, delivery_text, 0, 0, "C")
         pdf.set_font("Helvetica", "", 10)
         pdf.cell(col_widths['rate'], row_height, f"{item['price_per_unit']:.0f}", 0, 0, "R")
         pdf.set_font("Helvetica", "B", 10)
@@ -200,48 +256,31 @@ def create_monthly_bill_pdf(company_details, bill_data, items_data):
     # --- FIXED POSITION ACCOUNT DETAILS ---
     pdf.set_y(200) # Set a fixed Y position
     pdf.set_x(start_x + col_widths['sr'])
-    
     pdf.set_font("Helvetica", "B", 10)
-    bank = company_details['bank_details']
-    pdf.multi_cell(col_widths['part'], 4,
-        f"Account Details-\n"
-        f"Ac No - {bank['ac_no']}\n"
-        f"IFSC No - {bank['ifsc']}\n"
-        f"Branch - {bank['branch']}\n"
-        f"Bank Name - {bank['bank_name']}",
-        0, "L"
-    )
-
-    # --- SUMMARY ROWS ---
-    table_end_y = table_start_y + (num_item_rows * row_height)
+    pdf_templates.draw_skeleton(pdf, "monthly_bill_footer", tuple(sorted(bank.items())), draw_static_footer)
+
+    # --- SUMMARY VALUES ---
     pdf.set_y(table_end_y)
-    
-    pdf.set_x(start_x)
-    subtotal_label_width = table_width - col_widths['amt']
-    pdf.set_font("Helvetica", "B", 10)
-    pdf.cell(subtotal_label_width, 6, "Sub-Total", 1, 0, "R")
+    pdf.set_x(start_x + subtotal_label_width)
     pdf.set_font("Helvetica", "B", 10)
-    pdf.cell(col_widths['amt'], 6, f"{int(grand_total)}", 1, 1, "R")
+    pdf.cell(col_widths['amt'], 6, f"{int(grand_total)}", 0, 1, "R")
 
     pdf.set_x(start_x)
     amount_in_words = "Amount - " + num2words(int(grand_total), lang='en_IN').title() + " Only"
     total_amount_str = f"{int(grand_total):,}"
-    pdf.set_font("Helvetica", "B", 10)
-    pdf.cell(table_width - col_widths['amt'], 6, amount_in_words, 1, 0, "R")
-    pdf.cell(col_widths['amt'], 6, total_amount_str, 1, 1, "R")
+    pdf.cell(subtotal_label_width, 6, amount_in_words, 0, 0, "R")
+    pdf.cell(col_widths['amt'], 6, total_amount_str, 0, 1, "R")
 
     pdf_bytes = pdf.output()
     buffer = io.BytesIO(pdf_bytes)
     buffer.seek(0)
     return buffer
 
-def create_challan_pdf(company_details, challan_data, items_data):
-    pdf = PDF(company_details, 'P', 'mm', 'A5')
+def create_challan_pdf(company_details, challan_data, items_data, engine=None):
+    pdf = _new_document(engine, company_details, 'A5')
     
-    try:
-        pdf.add_font('Elephant', '', 'elephant.ttf', uni=True)
-    except Exception:
-        print("WARNING: elephant.ttf not found or failed to load. Falling back to default font.")
+    # Parsed once per process; a missing font is logged by the registry and Helvetica is used
+    pdf.use_bundled_font("Elephant")
 
     pdf.set_auto_page_break(auto=False)
     pdf.set_left_margin(10)
@@ -272,28 +311,49 @@ def create_challan_pdf(company_details, challan_data, items_data):
     pdf.ln(5)
 
     col_widths = {'sr': 10, 'part': 68, 'qty': 15, 'rate': 15, 'amt': 20}
-
-    pdf.set_font("Helvetica", "B", 10)
-    header_start_y = pdf.get_y()
-    pdf.multi_cell(col_widths['sr'], 4, "Sr.\nNo.", 1, "C")
-    pdf.set_y(header_start_y)
-    pdf.set_x(10 + col_widths['sr'])
-    pdf.cell(col_widths['part'], 8, "Particular", 1, 0, "C")
-    pdf.cell(col_widths['qty'], 8, "Qty.", 1, 0, "C")
-    pdf.cell(col_widths['rate'], 8, "Rate", 1, 0, "C")
-    pdf.cell(col_widths['amt'], 8, "Amount", 1, 1, "C")
-    
-    table_start_y = pdf.get_y()
-    pdf.set_font("Helvetica", "", 10)
-    
     num_item_rows = 12
-    for i in range(num_item_rows):
-        pdf.cell(col_widths['sr'], 7, '', 'LR', 0)
-        pdf.cell(col_widths['part'], 7, '', 'LR', 0)
-        pdf.cell(col_widths['qty'], 7, '', 'LR', 0)
-        pdf.cell(col_widths['rate'], 7, '', 'LR', 0)
-        pdf.cell(col_widths['amt'], 7, '', 'LR', 1)
+    table_start_y = pdf.get_y() + 8
+    final_row_y = table_start_y + (num_item_rows * 7) 
+    bank = company_details['bank_details']
+
+    def draw_static_table(pdf):
+        pdf.set_font("Helvetica", "B", 10)
+        header_start_y = pdf.get_y()
+        pdf.multi_cell(col_widths['sr'], 4, "Sr.\nNo.", 1, "C")
+        pdf.set_y(header_start_y)
+        pdf.set_x(10 + col_widths['sr'])
+        pdf.cell(col_widths['part'], 8, "Particular", 1, 0, "C")
+        pdf.cell(col_widths['qty'], 8, "Qty.", 1, 0, "C")
+        pdf.cell(col_widths['rate'], 8, "Rate", 1, 0, "C")
+        pdf.cell(col_widths['amt'], 8, "Amount", 1, 1, "C")
+        
+        pdf.set_font("Helvetica", "", 10)
+        for i in range(num_item_rows):
+            pdf.cell(col_widths['sr'], 7, '', 'LR', 0)
+            pdf.cell(col_widths['part'], 7, '', 'LR', 0)
+            pdf.cell(col_widths['qty'], 7, '', 'LR', 0)
+            pdf.cell(col_widths['rate'], 7, '', 'LR', 0)
+            pdf.cell(col_widths['amt'], 7, '', 'LR', 1)
+
+    def draw_static_footer(pdf):
+        pdf.multi_cell(col_widths['part'], 3,
+            f"Account Details-\n"
+            f"Ac No - {bank['ac_no']}\n"
+            f"IFSC No - {bank['ifsc']}\n"
+            f"Branch - {bank['branch']}\n"
+            f"Bank Name - {bank['bank_name']}",
+            0, "L"
+        )
 
+        # Total row borders; the amount is overlaid below
+        pdf.set_y(final_row_y)
+        pdf.cell(col_widths['sr'] + col_widths['part'], 8, "", 'LTB', 0, "L")
+        pdf.cell(col_widths['qty'] + col_widths['rate'], 8, "", 'TRB', 0, "C")
+        pdf.cell(col_widths['amt'], 8, "", 1, 1, "R")
+
+    pdf_templates.draw_skeleton(pdf, "challan_table", None, draw_static_table)
+
+    pdf.set_font("Helvetica", "", 10)
     current_y = table_start_y
     for i, item in enumerate(items_data, 1):
         if i > num_item_rows: break
@@ -309,29 +369,18 @@ def create_challan_pdf(company_details, challan_data, items_data):
     # Set a fixed Y position for account details
     pdf.set_y(153)
     pdf.set_x(10 + col_widths['sr'])
-    
     pdf.set_font("Helvetica", "B", 8)
-    bank = company_details['bank_details']
-    pdf.multi_cell(col_widths['part'], 3,
-        f"Account Details-\n"
-        f"Ac No - {bank['ac_no']}\n"
-        f"IFSC No - {bank['ifsc']}\n"
-        f"Branch - {bank['branch']}\n"
-        f"Bank Name - {bank['bank_name']}",
-        0, "L"
-    )
+    pdf_templates.draw_skeleton(pdf, "challan_footer", tuple(sorted(bank.items())), draw_static_footer)
 
     total_amount = challan_data['total_amount']
     amount_in_words = "Rs. - " + num2words(int(total_amount), lang='en_IN').title() + " Only"
     total_amount_str = f"{total_amount:,.0f}/-"
     
-    final_row_y = table_start_y + (num_item_rows * 7) 
     pdf.set_y(final_row_y)
-    
     pdf.set_font("Helvetica", "B", 10)
-    pdf.cell(col_widths['sr'] + col_widths['part'], 8, amount_in_words, 'LTB', 0, "L")
-    pdf.cell(col_widths['qty'] + col_widths['rate'], 8, "", 'TRB', 0, "C")
-    pdf.cell(col_widths['amt'], 8, total_amount_str, 1, 1, "R")
+    pdf.cell(col_widths['sr'] + col_widths['part'], 8, amount_in_words, 0, 0, "L")
+    pdf.set_x(10 + sum(col_widths.values()) - col_widths['amt'])
+    pdf.cell(col_widths['amt'], 8, total_amount_str, 0, 1, "R")
 
     pdf_bytes = pdf.output()
     buffer = io.BytesIO(pdf_bytes)
@@ -0,0 +1,105 @@
+# pdf_pool.py
+# Bounded process pool for rendering PDFs outside the request workers.
+# Rendering is CPU-bound, so it runs in a small pool of separate processes;
+# the request thread only waits for the result, up to PDF_RENDER_TIMEOUT.
+# At most PDF_RENDER_WORKERS jobs run and PDF_RENDER_QUEUE more may wait;
+# anything beyond that is rejected immediately with PdfPoolBusy so a burst of
+# downloads cannot tie up every request worker. Each API worker process has
+# its own pool.
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_QUEUE = int(os.environ.get("PDF_RENDER_QUEUE", "8"))
+PDF_RENDER_TIMEOUT = float(os.environ.get("PDF_RENDER_TIMEOUT", "20"))
+
+# Seconds clients are told to wait (Retry-After) when the pool is saturated.
+RETRY_AFTER_SECONDS = 5
+
+
+class PdfPoolError(Exception):
+    """Base class for renders the pool could not complete; maps to HTTP 503."""
+
+
+class PdfPoolBusy(PdfPoolError):
+    pass
+
+
+class PdfRenderTimeout(PdfPoolError):
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# One slot per running or queued job. A slot is only freed when its job finishes,
+# so a render that outlives its timeout keeps counting against the limit.
+_slots = threading.BoundedSemaphore(PDF_RENDER_WORKERS + PDF_RENDER_QUEUE)
+
+
+def _init_worker():
+    # Runs once in each pool process, so the first render there does not pay for decoding images or parsing fonts
+    import pdf_assets
+    import pdf_fonts
+    pdf_assets.preload_all()
+    pdf_fonts.preload_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a multi-threaded server process is not safe
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _discard_executor(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def render(func, *args):
+    """
+    Runs func(*args) in the render pool and returns its result.
+    `func` must be a module-level function and its arguments picklable.
+    Raises PdfPoolBusy if the queue is full and PdfRenderTimeout if the job
+    does not finish within PDF_RENDER_TIMEOUT seconds.
+    """
+    if not _slots.acquire(blocking=False):
+        raise PdfPoolBusy("The server is busy generating other documents. Please try again shortly.")
+
+    executor = _get_executor()
+    try:
+        future = executor.submit(func, *args)
+    except BrokenProcessPool:
+        _slots.release()
+        _discard_executor(executor)
+        raise PdfPoolError("The document renderer restarted. Please try again.")
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+
+    try:
+        return future.result(timeout=PDF_RENDER_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel() # Only succeeds if the job has not started yet
+        logging.warning(f"PDF render {func.__name__} timed out after {PDF_RENDER_TIMEOUT}s")
+        raise PdfRenderTimeout("Generating the document took too long. Please try again.")
+    except BrokenProcessPool:
+        logging.error(f"PDF render pool broke while running {func.__name__}; it will be restarted.")
+        _discard_executor(executor)
+        raise PdfPoolError("The document renderer restarted. Please try again.")
+
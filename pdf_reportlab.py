@@ -0,0 +1,250 @@
+# pdf_reportlab.py
+# ReportLab drawing engine for the document layouts in pdf_generator.py.
+# ReportLabDocument offers the small part of the FPDF API the layouts use
+# (cursor-based cell/multi_cell, lines, rectangles, fonts, colours, images),
+# with the same geometry: millimetres from the top-left corner, 1 mm cell
+# padding, text baselines at FPDF's position and 0.2 mm lines. The same layout
+# code therefore produces the same page with either engine.
+
+import io
+
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+import pdf_assets
+import pdf_fonts
+
+PT_PER_MM = 72 / 25.4
+
+# Page formats in mm (width, height), as FPDF defines them
+PAGE_FORMATS = {
+    'A4': (210, 297),
+    'A5': (148, 210),
+}
+
+# (family, style) -> ReportLab name of the standard PDF font
+CORE_FONTS = {
+    ('helvetica', ''): 'Helvetica',
+    ('helvetica', 'B'): 'Helvetica-Bold',
+    ('helvetica', 'I'): 'Helvetica-Oblique',
+    ('helvetica', 'BI'): 'Helvetica-BoldOblique',
+}
+
+
+class ReportLabDocument:
+    def __init__(self, orientation='P', unit='mm', format='A4'):
+        if unit != 'mm' or orientation != 'P':
+            raise ValueError("ReportLabDocument only supports portrait pages in mm.")
+        self.w, self.h = PAGE_FORMATS[format]
+        self.k = PT_PER_MM
+        self._buffer = io.BytesIO()
+        self._canvas = canvas.Canvas(self._buffer, pagesize=(self.w * self.k, self.h * self.k), pageCompression=1)
+        self.l_margin = self.t_margin = self.r_margin = 10.0
+        self.c_margin = 28.35 / self.k / 10 # FPDF's interior cell margin (~1 mm)
+        self.line_width = 0.567 / self.k    # FPDF's default line width (0.2 mm)
+        self.x, self.y = self.l_margin, self.t_margin
+        self.lasth = 0
+        self.page = 0
+        self.fonts = {}                     # lowercase family -> ReportLab font name (bundled fonts)
+        self.font_name = None
+        self.font_size_pt = 12
+        self.font_size = 12 / self.k
+        self.text_color = (0, 0, 0)
+        self.fill_color = (0, 0, 0)
+        self.draw_color = (0, 0, 0)
+
+    # --- Page setup ---
+
+    def set_margins(self, left, top, right=None):
+        self.l_margin, self.t_margin = left, top
+        self.r_margin = left if right is None else right
+
+    def set_left_margin(self, margin):
+        self.l_margin = margin
+
+    def set_right_margin(self, margin):
+        self.r_margin = margin
+
+    def set_auto_page_break(self, auto, margin=0):
+        if auto:
+            raise ValueError("ReportLabDocument does not break pages automatically.")
+
+    def header(self):
+        pass
+
+    def footer(self):
+        pass
+
+    def add_page(self):
+        if self.page:
+            self.footer()
+            self._canvas.showPage()
+        self.page += 1
+        self._canvas.setLineWidth(self.line_width * self.k)
+        self.x, self.y = self.l_margin, self.t_margin
+        self.header()
+
+    def output(self):
+        self.footer()
+        self._canvas.showPage()
+        self._canvas.save()
+        return self._buffer.getvalue()
+
+    # --- Cursor ---
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+    def set_x(self, x):
+        self.x = x if x >= 0 else self.w + x
+
+    def set_y(self, y):
+        self.x = self.l_margin
+        self.y = y if y >= 0 else self.h + y
+
+    def set_xy(self, x, y):
+        self.set_y(y)
+        self.set_x(x)
+
+    def ln(self, h=None):
+        self.x = self.l_margin
+        self.y += self.lasth if h is None else h
+
+    # --- Fonts and colours ---
+
+    def use_bundled_font(self, family):
+        """Registers a font from pdf_fonts for this document. Returns False if it is unavailable."""
+        font_name = pdf_fonts.reportlab_font(family)
+        if font_name:
+            self.fonts[family.lower()] = font_name
+        return font_name is not None
+
+    def set_font(self, family, style='', size=0):
+        family = family.lower()
+        style = ''.join(sorted(style.upper()))
+        if family in self.fonts:
+            self.font_name = self.fonts[family]
+        else:
+            self.font_name = CORE_FONTS[(family, style)]
+        if size:
+            self.font_size_pt = size
+            self.font_size = size / self.k
+
+    def get_string_width(self, text):
+        return self._canvas.stringWidth(text, self.font_name, self.font_size_pt) / self.k
+
+    def set_text_color(self, r, g=None, b=None):
+        self.text_color = (r, r, r) if g is None else (r, g, b)
+
+    def set_fill_color(self, r, g=None, b=None):
+        self.fill_color = (r, r, r) if g is None else (r, g, b)
+
+    def set_draw_color(self, r, g=None, b=None):
+        self.draw_color = (r, r, r) if g is None else (r, g, b)
+
+    # --- Drawing ---
+
+    def _pt(self, x, y):
+        return x * self.k, (self.h - y) * self.k
+
+    def _stroke_color(self):
+        self._canvas.setStrokeColorRGB(*(c / 255 for c in self.draw_color))
+
+    def line(self, x1, y1, x2, y2):
+        self._stroke_color()
+        self._canvas.line(*self._pt(x1, y1), *self._pt(x2, y2))
+
+    def rect(self, x, y, w, h, style=None):
+        self._stroke_color()
+        fill = style is not None and 'F' in style.upper()
+        if fill:
+            self._canvas.setFillColorRGB(*(c / 255 for c in self.fill_color))
+        left, bottom = self._pt(x, y + h)
+        self._canvas.rect(left, bottom, w * self.k, h * self.k, stroke=style in (None, 'D', 'FD', 'DF'), fill=fill)
+
+    def _box(self, x, y, w, h, border, fill):
+        """Fill and borders of a cell, as FPDF draws them."""
+        if isinstance(border, str) and set(border) >= set('LTRB'):
+            border = 1
+        if fill:
+            self.rect(x, y, w, h, 'FD' if border == 1 else 'F')
+        elif border == 1:
+            self.rect(x, y, w, h)
+        if isinstance(border, str):
+            if 'L' in border:
+                self.line(x, y, x, y + h)
+            if 'T' in border:
+                self.line(x, y, x + w, y)
+            if 'R' in border:
+                self.line(x + w, y, x + w, y + h)
+            if 'B' in border:
+                self.line(x, y + h, x + w, y + h)
+
+    def _text(self, x, y, w, h, text, align):
+        if not text:
+            return
+        text_width = self.get_string_width(text)
+        if align == 'R':
+            dx = w - self.c_margin - text_width
+        elif align == 'C':
+            dx = (w - text_width) / 2
+        else:
+            dx = self.c_margin
+        self._canvas.setFillColorRGB(*(c / 255 for c in self.text_color))
+        self._canvas.setFont(self.font_name, self.font_size_pt)
+        self._canvas.drawString(*self._pt(x + dx, y + 0.5 * h + 0.3 * self.font_size), text)
+
+    def cell(self, w, h=0, text='', border=0, ln=0, align='L', fill=False):
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        self._box(self.x, self.y, w, h, border, fill)
+        self._text(self.x, self.y, w, h, str(text), align)
+        self.lasth = h
+        if ln == 1:
+            self.x = self.l_margin
+            self.y += h
+        elif ln == 2:
+            self.y += h
+        else:
+            self.x += w
+
+    def _wrap(self, text, max_width):
+        lines = []
+        for paragraph in text.split('\n'):
+            line = ''
+            for word in paragraph.split(' '):
+                candidate = f"{line} {word}" if line else word
+                if line and self.get_string_width(candidate) > max_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    def multi_cell(self, w, h=None, text='', border=0, align='J', fill=False):
+        if h is None:
+            h = self.font_size
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        lines = self._wrap(str(text), w - 2 * self.c_margin)
+        start_x = self.x
+        self._box(start_x, self.y, w, h * len(lines), border, fill)
+        for line in lines:
+            self._text(start_x, self.y, w, h, line, align if align in ('L', 'C', 'R') else 'L')
+            self.y += h
+        self.lasth = h
+        self.x = start_x + w
+
+    def draw_asset(self, key, x, y, w):
+        """Draws a prepared image from pdf_assets at width `w`. Returns False if it is unavailable."""
+        img = pdf_assets.get_image(key)
+        if img is None:
+            return False
+        h = w * img.height / img.width
+        left, bottom = self._pt(x, y + h)
+        self._canvas.drawImage(ImageReader(img), left, bottom, w * self.k, h * self.k)
+        return True
@@ -0,0 +1,112 @@
+# pdf_templates.py
+# Precompiled page skeletons for generated PDFs.
+# The static part of a document (table header, empty grid rows, bank details,
+# summary borders) is identical on every bill or challan. The first time a
+# skeleton is drawn, the PDF operators it writes are recorded; later documents
+# append the recorded operators to their page instead of redrawing each cell.
+# Only the variable content (client, dates, line items, totals) is drawn live.
+#
+# A recording is only replayed into a page that is in exactly the same state as
+# the one it was recorded on (page size, margins, position, colours, fonts), so
+# replayed output is the same as drawing the skeleton directly. Anything else
+# records a new variant.
+
+import os
+import threading
+
+from fpdf import FPDF
+from fpdf.enums import PDFResourceType
+from fpdf.output import ResourceCatalog
+
+# Set PDF_TEMPLATES=0 to always draw skeletons live (e.g. when changing a layout).
+TEMPLATES_ENABLED = os.environ.get("PDF_TEMPLATES", "1") != "0"
+
+_templates = {} # (name, key, start fingerprint) -> _Template
+_lock = threading.Lock()
+
+
+class _Template:
+    def __init__(self, content, new_fonts, font_ids, end_state, end_x, end_y, end_lasth):
+        self.content = content       # bytes written to the page content stream
+        self.new_fonts = new_fonts   # [(family, style)] first defined by the skeleton, in order
+        self.font_ids = font_ids     # ids of the fonts referenced by the content
+        self.end_state = end_state   # graphics state after drawing, with current_font as a fontkey
+        self.end_x = end_x
+        self.end_y = end_y
+        self.end_lasth = end_lasth
+
+
+def _fingerprint(pdf):
+    """Everything about the page state that can change what a skeleton draws."""
+    state = pdf._get_current_graphics_state().as_kwargs()
+    font = state.pop("current_font")
+    state["current_font"] = font.fontkey if font else None
+    state["dash_pattern"] = tuple(sorted(state["dash_pattern"].items()))
+    state["text_shaping"] = repr(state["text_shaping"])
+    return (
+        round(pdf.w, 4), round(pdf.h, 4), round(pdf.k, 4),
+        round(pdf.l_margin, 4), round(pdf.r_margin, 4), round(pdf.t_margin, 4),
+        round(pdf.x, 4), round(pdf.y, 4), round(pdf._lasth, 4),
+        tuple((fontkey, font.i) for fontkey, font in pdf.fonts.items()),
+        tuple(sorted((name, repr(value)) for name, value in state.items())),
+    )
+
+
+def _record(pdf, draw):
+    contents = pdf.pages[pdf.page].contents
+    start = len(contents)
+    fonts_before = set(pdf.fonts)
+    draw(pdf)
+
+    state = pdf._get_current_graphics_state()
+    state.current_font = state.current_font.fontkey if state.current_font else None
+    new_fonts = []
+    for fontkey, font in pdf.fonts.items():
+        if fontkey not in fonts_before:
+            family = fontkey[:len(fontkey) - len(font.style)] if font.style else fontkey
+            new_fonts.append((family, font.style))
+    content = bytes(contents[start:])
+    font_ids = {int(font_id) for font_id in ResourceCatalog.FONT_REGEX.findall(content.decode("latin-1"))}
+    return _Template(content, new_fonts, font_ids, state, pdf.x, pdf.y, pdf._lasth)
+
+
+def _replay(pdf, template):
+    for family, style in template.new_fonts:
+        pdf.set_font(family, style) # Defines the font under the same id it had when recorded
+    pdf.pages[pdf.page].contents.extend(template.content)
+    for font_id in template.font_ids:
+        pdf._resource_catalog.add(PDFResourceType.FONT, font_id, pdf.page)
+
+    state = template.end_state.copy()
+    state.current_font = pdf.fonts[state.current_font] if state.current_font else None
+    pdf._pop_local_stack()
+    pdf._push_local_stack(state)
+    pdf.x, pdf.y = template.end_x, template.end_y
+    pdf._lasth = template.end_lasth
+
+
+def draw_skeleton(pdf, name, key, draw):
+    """
+    Draws the static part of a page with `draw(pdf)`, or replays an earlier recording of it.
+    `key` must change whenever the skeleton's content does (e.g. a hash of the bank details).
+    """
+    # Recording works on FPDF page content; other engines always draw live
+    if not TEMPLATES_ENABLED or not isinstance(pdf, FPDF):
+        draw(pdf)
+        return
+
+    template_key = (name, key, _fingerprint(pdf))
+    template = _templates.get(template_key)
+    if template is not None:
+        _replay(pdf, template)
+        return
+
+    template = _record(pdf, draw)
+    with _lock:
+        _templates.setdefault(template_key, template)
+
+
+def clear():
+    """Drops every recorded skeleton (e.g. after editing a layout in a running process)."""
+    with _lock:
+        _templates.clear()
@@ -0,0 +1,237 @@
+# price_list_routes.py
+# API endpoints for named price lists shared by many clients (migration 008).
+# A list holds one rate per product; clients assigned to it pay those rates,
+# unless they have their own override in client_pricing. Changing a rate here
+# changes it for every client on the list at once.
+
+from flask import Blueprint, jsonify, request
+from db import get_db_connection
+import mysql.connector
+from decimal import Decimal
+
+import table_versions
+
+price_list_bp = Blueprint('price_list_bp', __name__)
+
+
+def parse_price_changes(data, price_key):
+    """
+    Validates {"upserts": [{"product_id": 1, <price_key>: 9.5}, ...], "deletes": [2, ...]}.
+    Returns ({product_id: Decimal price}, {product_ids to delete}); raises ValueError with a message for the client.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object with 'upserts' and/or 'deletes'")
+    upserts = data.get('upserts') or []
+    deletes = data.get('deletes') or []
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        raise ValueError("'upserts' and 'deletes' must be lists")
+    prices = {}
+    try:
+        for entry in upserts:
+            product_id = int(entry['product_id'])
+            price = Decimal(str(entry[price_key])).quantize(Decimal('0.01'))
+            if price <= 0:
+                raise ValueError(f"{price_key} for product {product_id} must be positive")
+            prices[product_id] = price
+        delete_ids = {int(product_id) for product_id in deletes}
+    except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+        raise ValueError(f"Invalid pricing entry: {e}")
+    both = sorted(delete_ids & prices.keys())
+    if both:
+        raise ValueError(f"Products both priced and deleted: {both}")
+    return prices, delete_ids
+
+
+def unknown_products(cursor, product_ids):
+    """The ids in `product_ids` that are not in products, sorted."""
+    if not product_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    cursor.execute(f"SELECT product_id FROM products WHERE product_id IN ({placeholders})", tuple(product_ids))
+    return sorted(set(product_ids) - {row[0] for row in cursor.fetchall()})
+
+
+# --- Price List Endpoints ---
+
+@price_list_bp.route('/price-lists', methods=['GET'])
+# item_count also changes when a deleted product's rates cascade away
+@table_versions.versioned('price_lists', 'clients', 'products')
+def get_price_lists():
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT pl.price_list_id, pl.name,
+                   (SELECT COUNT(*) FROM price_list_items i WHERE i.price_list_id = pl.price_list_id) AS item_count,
+                   (SELECT COUNT(*) FROM clients c WHERE c.price_list_id = pl.price_list_id) AS client_count
+            FROM price_lists pl
+            ORDER BY pl.name
+        """)
+        return jsonify(cursor.fetchall())
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@price_list_bp.route('/price-lists', methods=['POST'])
+def create_price_list():
+    data = request.get_json(silent=True)
+    name = data.get('name') if isinstance(data, dict) else None
+    if not isinstance(name, str) or not name.strip():
+        return jsonify({"error": "Missing name"}), 400
+    name = name.strip()
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO price_lists (name) VALUES (%s)", (name,))
+        table_versions.bump(cursor, 'price_lists')
+        conn.commit()
+        return jsonify({"message": "Price list created", "price_list_id": cursor.lastrowid}), 201
+    except mysql.connector.Error as err:
+        if err.errno == 1062: # Duplicate entry
+            return jsonify({"error": "A price list with this name already exists."}), 409
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@price_list_bp.route('/price-lists/<int:price_list_id>', methods=['GET'])
+@table_versions.versioned('price_lists', 'products')
+def get_price_list(price_list_id):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT price_list_id, name FROM price_lists WHERE price_list_id = %s", (price_list_id,))
+        price_list = cursor.fetchone()
+        if not price_list:
+            return jsonify({"error": "Price list not found"}), 404
+        cursor.execute("""
+            SELECT i.product_id, p.name AS product_name, i.price
+            FROM price_list_items i JOIN products p ON i.product_id = p.product_id
+            WHERE i.price_list_id = %s
+        """, (price_list_id,))
+        items = cursor.fetchall()
+        for item in items:
+            item['price'] = float(item['price'])
+        price_list['items'] = items
+        return jsonify(price_list)
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@price_list_bp.route('/price-lists/<int:price_list_id>', methods=['PUT'])
+def update_price_list(price_list_id):
+    """
+    Renames a list and/or changes its rates in one transaction:
+    {"name": "...", "upserts": [{"product_id": 1, "price": 9.5}, ...], "deletes": [2, ...]}
+    """
+    data = request.get_json(silent=True)
+    try:
+        prices, delete_ids = parse_price_changes(data, 'price')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    name = data.get('name', '').strip() if isinstance(data.get('name'), str) else None
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT price_list_id FROM price_lists WHERE price_list_id = %s FOR UPDATE", (price_list_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Price list not found"}), 404
+        unknown = unknown_products(cursor, prices.keys())
+        if unknown:
+            conn.rollback()
+            return jsonify({"error": f"Unknown product_id(s): {unknown}"}), 400
+        if name:
+            cursor.execute("UPDATE price_lists SET name = %s WHERE price_list_id = %s", (name, price_list_id))
+        if prices:
+            # One multi-row statement for the whole set
+            cursor.executemany(
+                "INSERT INTO price_list_items (price_list_id, product_id, price) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE price = VALUES(price)",
+                [(price_list_id, product_id, price) for product_id, price in prices.items()]
+            )
+        deleted = 0
+        if delete_ids:
+            placeholders = ', '.join(['%s'] * len(delete_ids))
+            cursor.execute(f"DELETE FROM price_list_items WHERE price_list_id = %s AND product_id IN ({placeholders})",
+                           (price_list_id, *delete_ids))
+            deleted = cursor.rowcount
+        table_versions.bump(cursor, 'price_lists')
+        conn.commit()
+        return jsonify({"message": "Price list saved", "upserted": len(prices), "deleted": deleted}), 200
+    except mysql.connector.Error as err:
+        conn.rollback()
+        if err.errno == 1062: # Duplicate entry
+            return jsonify({"error": "A price list with this name already exists."}), 409
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@price_list_bp.route('/price-lists/<int:price_list_id>', methods=['DELETE'])
+def delete_price_list(price_list_id):
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        # Its rates go with it; its clients fall back to default prices (ON DELETE SET NULL)
+        cursor.execute("DELETE FROM price_lists WHERE price_list_id = %s", (price_list_id,))
+        if cursor.rowcount == 0:
+            return jsonify({"error": "Price list not found"}), 404
+        table_versions.bump(cursor, 'price_lists', 'clients')
+        conn.commit()
+        return jsonify({"message": "Price list deleted"}), 200
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@price_list_bp.route('/clients/<int:client_id>/price-list', methods=['PUT'])
+def assign_price_list(client_id):
+    """Assigns a price list to a client: {"price_list_id": 3}, or {"price_list_id": null} to remove it."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'price_list_id' not in data:
+        return jsonify({"error": "Missing price_list_id"}), 400
+    price_list_id = data['price_list_id']
+    if price_list_id is not None and (not isinstance(price_list_id, int) or isinstance(price_list_id, bool)):
+        return jsonify({"error": "price_list_id must be an integer or null"}), 400
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    cursor = conn.cursor()
+    try:
+        if price_list_id is not None:
+            cursor.execute("SELECT price_list_id FROM price_lists WHERE price_list_id = %s", (price_list_id,))
+            if not cursor.fetchone():
+                return jsonify({"error": "Price list not found"}), 404
+        cursor.execute("SELECT client_id FROM clients WHERE client_id = %s", (client_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Client not found"}), 404
+        cursor.execute("UPDATE clients SET price_list_id = %s WHERE client_id = %s", (price_list_id, client_id))
+        table_versions.bump(cursor, 'clients')
+        conn.commit()
+        return jsonify({"message": "Price list assigned" if price_list_id else "Price list removed"}), 200
+    except mysql.connector.Error as err:
+        return jsonify({"error": str(err)}), 500
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,108 @@
+# product_images.py
+# Resized derivatives of uploaded product images.
+# After an upload, a background worker writes each size in DERIVATIVE_SIZES in
+# WebP and JPEG to <upload folder>/derived/, named after the original:
+# 'Harpic_1761417422.jpeg' -> 'Harpic_1761417422.jpeg.card.webp'.
+# Product listings link to these; the original is only served from /uploads
+# when a client asks for it. A derivative that is missing (e.g. for an image
+# uploaded before this existed, or while the worker is still busy) is queued
+# on first request, which waits up to DERIVATIVE_WAIT_SECONDS for it; decoding
+# never runs on a request thread.
+
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+DERIVED_SUBDIR = 'derived'
+
+# Size name -> bounding box in pixels. 'card' is twice the 128px-high catalog card, for high-DPI screens.
+DERIVATIVE_SIZES = {
+    'thumb': (128, 128),
+    'card': (512, 256),
+}
+
+# Format name (and file extension) -> Pillow save options
+DERIVATIVE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+# How long a request for a missing derivative waits for the worker to build it.
+DERIVATIVE_WAIT_SECONDS = 5
+
+# One worker: derivatives are only needed after an upload, and this keeps CPU use predictable.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-derivatives")
+_lock = threading.Lock() # A file is never built twice at once, even if build_derivatives is also called directly
+
+
+def derivative_name(filename, size, fmt):
+    return f"{filename}.{size}.{fmt}"
+
+
+def parse_derivative_name(name):
+    """Returns (original filename, size, format) for a derivative name, or None if it is not one."""
+    parts = name.rsplit('.', 2)
+    if len(parts) != 3 or parts[1] not in DERIVATIVE_SIZES or parts[2] not in DERIVATIVE_FORMATS:
+        return None
+    return tuple(parts)
+
+
+def derived_folder(upload_folder):
+    return os.path.join(upload_folder, DERIVED_SUBDIR)
+
+
+def _flatten(img):
+    """RGB copy of the image, with transparency composited onto white (JPEG has no alpha)."""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    return img.convert('RGB')
+
+
+def build_derivatives(upload_folder, filename):
+    """Writes every missing derivative of an uploaded image. Returns the number of files written."""
+    source_path = os.path.join(upload_folder, filename)
+    target_dir = derived_folder(upload_folder)
+    os.makedirs(target_dir, exist_ok=True)
+    written = 0
+    with _lock:
+        pending = [(size, fmt) for size in DERIVATIVE_SIZES for fmt in DERIVATIVE_FORMATS
+                   if not os.path.isfile(os.path.join(target_dir, derivative_name(filename, size, fmt)))]
+        if not pending:
+            return 0
+        with Image.open(source_path) as img:
+            # JPEGs are decoded at a reduced scale that still covers the largest size (either orientation)
+            largest_side = max(max(box) for box in DERIVATIVE_SIZES.values())
+            img.draft('RGB', (largest_side, largest_side))
+            # Honour the camera orientation, then decode once for all sizes
+            img = _flatten(ImageOps.exif_transpose(img))
+        for size, fmt in pending:
+            resized = img.copy()
+            resized.thumbnail(DERIVATIVE_SIZES[size], Image.Resampling.LANCZOS)
+            target_path = os.path.join(target_dir, derivative_name(filename, size, fmt))
+            # Write to a temporary name first, so a half-written file is never served
+            tmp_path = f"{target_path}.tmp"
+            resized.save(tmp_path, **DERIVATIVE_FORMATS[fmt])
+            os.replace(tmp_path, target_path)
+            written += 1
+    return written
+
+
+def build_in_background(upload_folder, filename):
+    """
+    Queues build_derivatives on the worker and returns its future.
+    Failures are logged and never reach the caller.
+    """
+    def _run():
+        try:
+            written = build_derivatives(upload_folder, filename)
+            logging.info(f"Built {written} image derivative(s) for {filename}")
+        except Exception as e:
+            logging.warning(f"Building image derivatives for {filename} failed: {e}", exc_info=True)
+    return _executor.submit(_run)
+
@@ -0,0 +1,299 @@
+# product_import.py
+# Bulk product and stock import from a CSV or XLSX file (POST /products/import).
+# The file is read row by row (csv over the upload stream, openpyxl in read-only
+# mode), so memory use does not grow with the sheet. Every row is validated and
+# matched to an existing product by product_id, or else by exact name; valid rows
+# are upserted IMPORT_CHUNK_SIZE at a time with one multi-row
+# INSERT ... ON DUPLICATE KEY UPDATE per chunk. Rows that fail are reported with
+# their sheet row number and do not stop the rest of the file.
+#
+# Columns (header row, any order, case-insensitive): product_id, name,
+# description, price, stock_quantity, low_stock_threshold. A blank cell keeps the
+# existing value; new products need name, price and stock_quantity.
+# Each chunk is its own transaction, so a long import never holds row locks that
+# orders are waiting for.
+
+import io
+import csv
+import logging
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+import mysql.connector
+
+from db import get_db_connection
+import table_versions
+
+IMPORT_COLUMNS = ('product_id', 'name', 'description', 'price', 'stock_quantity', 'low_stock_threshold')
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+DEFAULT_LOW_STOCK_THRESHOLD = 10    # As for products added through POST /products
+MAX_INT = 2147483647                # products' INT columns
+MAX_PRICE = Decimal('99999999.99')  # products.price is DECIMAL(10,2)
+
+XLSX_SIGNATURE = b'PK\x03\x04'
+
+PRODUCT_COLUMNS_QUERY = "SELECT product_id, name, description, price, stock_quantity, low_stock_threshold FROM products"
+
+UPSERT_QUERY = """
+    INSERT INTO products (product_id, name, description, price, stock_quantity, low_stock_threshold)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        name = VALUES(name), description = VALUES(description), price = VALUES(price),
+        stock_quantity = VALUES(stock_quantity), low_stock_threshold = VALUES(low_stock_threshold)
+"""
+
+
+class ImportRejected(ValueError):
+    """The file as a whole can't be imported (format or header); maps to HTTP 400."""
+    http_status = 400
+
+
+class RowError(ValueError):
+    """One row is invalid; it is reported and skipped."""
+
+
+# --- Reading ---
+
+def _header(cells):
+    columns = [str(cell).strip().lower().replace(' ', '_') if cell is not None else '' for cell in cells]
+    unknown = [c for c in columns if c and c not in IMPORT_COLUMNS]
+    if unknown:
+        raise ImportRejected(f"Unknown column(s): {', '.join(unknown)}. Expected: {', '.join(IMPORT_COLUMNS)}")
+    if 'product_id' not in columns and 'name' not in columns:
+        raise ImportRejected("The header row needs a product_id or a name column.")
+    duplicated = sorted({c for c in columns if c and columns.count(c) > 1})
+    if duplicated:
+        raise ImportRejected(f"Duplicate column(s): {', '.join(duplicated)}")
+    return columns
+
+
+def _rows(cell_rows):
+    """Yields (sheet row number, {column: value}) after the header, skipping blank rows."""
+    columns = None
+    for row_number, cells in enumerate(cell_rows, 1):
+        if columns is None:
+            columns = _header(cells)
+            continue
+        values = {column: cell for column, cell in zip(columns, cells) if column}
+        if all(v is None or str(v).strip() == '' for v in values.values()):
+            continue
+        yield row_number, values
+    if columns is None:
+        raise ImportRejected("The file is empty.")
+
+
+def read_rows(file):
+    """Streams the rows of an uploaded CSV or XLSX file (a werkzeug FileStorage)."""
+    if file.stream.read(len(XLSX_SIGNATURE)) == XLSX_SIGNATURE:
+        file.stream.seek(0)
+        try:
+            workbook = openpyxl.load_workbook(file.stream, read_only=True, data_only=True)
+        except Exception:
+            raise ImportRejected("The file could not be read as an XLSX workbook.")
+        try:
+            yield from _rows(workbook.active.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+        return
+    file.stream.seek(0)
+    text = io.TextIOWrapper(file.stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _rows(csv.reader(text))
+    except UnicodeDecodeError:
+        raise ImportRejected("CSV files must be UTF-8 encoded.")
+    finally:
+        text.detach() # The upload stream belongs to the request
+
+
+# --- Validation ---
+
+def _text(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def _whole_number(value, column, minimum=0):
+    text = _text(value)
+    if text is None:
+        return None
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise RowError(f"{column} must be a whole number, not '{text}'")
+    if not number.is_finite() or number != number.to_integral_value() \
+            or not minimum <= number <= MAX_INT:
+        raise RowError(f"{column} must be a whole number from {minimum} to {MAX_INT}, not '{text}'")
+    return int(number)
+
+
+def validate_row(values):
+    """Returns the row's fields with their types; blank cells are None. Raises RowError."""
+    row = {
+        'product_id': _whole_number(values.get('product_id'), 'product_id', minimum=1),
+        'name': _text(values.get('name')),
+        'description': _text(values.get('description')),
+        'stock_quantity': _whole_number(values.get('stock_quantity'), 'stock_quantity'),
+        'low_stock_threshold': _whole_number(values.get('low_stock_threshold'), 'low_stock_threshold'),
+        'price': None,
+    }
+    price = _text(values.get('price'))
+    if price is not None:
+        try:
+            number = Decimal(price.replace(',', ''))
+            if not number.is_finite():
+                raise InvalidOperation
+            row['price'] = number.quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RowError(f"price must be a number, not '{price}'")
+        if row['price'] < 0:
+            raise RowError("price can't be negative")
+        if row['price'] > MAX_PRICE:
+            raise RowError(f"price can't be more than {MAX_PRICE}")
+    if row['name'] is not None and len(row['name']) > 255:
+        raise RowError("name is longer than 255 characters")
+    if row['product_id'] is None and row['name'] is None:
+        raise RowError("needs a product_id or a name")
+    return row
+
+
+# --- Writing ---
+
+def _existing_products(cursor, chunk):
+    """Locks and returns the products the chunk refers to: ({product_id: row}, {folded name: [rows]})."""
+    by_id, by_name = {}, {}
+    ids = sorted({row['product_id'] for _, row in chunk if row['product_id']})
+    names = sorted({row['name'] for _, row in chunk if not row['product_id']})
+    for column, keys in (('product_id', ids), ('name', names)):
+        if not keys:
+            continue
+        placeholders = ', '.join(['%s'] * len(keys))
+        cursor.execute(f"{PRODUCT_COLUMNS_QUERY} WHERE {column} IN ({placeholders}) FOR UPDATE", tuple(keys))
+        for product in cursor.fetchall():
+            if product['product_id'] in by_id:
+                continue # Found by id and by name
+            by_id[product['product_id']] = product
+            by_name.setdefault(product['name'].casefold(), []).append(product)
+    return by_id, by_name
+
+
+def _merge(row, by_id, by_name):
+    """Returns (upsert values, created) for a validated row. Raises RowError."""
+    if row['product_id']:
+        existing = by_id.get(row['product_id'])
+        if existing is None:
+            raise RowError(f"product_id {row['product_id']} does not exist")
+    else:
+        matches = by_name.get(row['name'].casefold(), [])
+        if len(matches) > 1:
+            raise RowError(f"{len(matches)} products are named '{row['name']}'; give the product_id")
+        existing = matches[0] if matches else None
+        if existing is not None:
+            row = dict(row, name=existing['name']) # Matched regardless of case; keep the stored spelling
+
+    if existing is None:
+        missing = [c for c in ('name', 'price', 'stock_quantity') if row[c] is None]
+        if missing:
+            raise RowError(f"new product needs {', '.join(missing)}")
+        existing = {'product_id': None, 'description': None, 'low_stock_threshold': DEFAULT_LOW_STOCK_THRESHOLD}
+
+    merged = {c: row[c] if row[c] is not None else existing.get(c) for c in IMPORT_COLUMNS}
+    return tuple(merged[c] for c in IMPORT_COLUMNS), existing['product_id'] is None
+
+
+def import_products(file, dry_run=False):
+    """
+    Imports an uploaded CSV/XLSX file. Returns a report:
+    {"rows", "created", "updated", "errors": [{"row", "error"}], "complete", "stopped", "dry_run"}.
+    "stopped" is None, or why the import stopped early (then "complete" is False).
+    With dry_run, everything is validated and matched but nothing is written.
+    Raises ImportRejected for an unreadable file and RuntimeError without a database.
+    """
+    report = {"rows": 0, "created": 0, "updated": 0, "errors": [], "complete": True, "stopped": None,
+              "dry_run": dry_run}
+    error_count = 0
+
+    def add_error(row_number, message):
+        nonlocal error_count
+        error_count += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor(dictionary=True)
+    seen = {} # product_id or folded name -> first row number, so a product is only imported once per file
+    imported = {} # product_id -> row number, for rows naming the same product by id and by name
+
+    def write_chunk(chunk):
+        by_id, by_name = _existing_products(cursor, chunk)
+        values, created = [], 0
+        for row_number, row in chunk:
+            try:
+                row_values, is_new = _merge(row, by_id, by_name)
+            except RowError as e:
+                add_error(row_number, str(e))
+                continue
+            if not is_new:
+                if row_values[0] in imported:
+                    add_error(row_number, f"same product as row {imported[row_values[0]]}")
+                    continue
+                imported[row_values[0]] = row_number
+            values.append(row_values)
+            created += is_new
+        if values and not dry_run:
+            cursor.executemany(UPSERT_QUERY, values)
+            table_versions.bump(cursor, 'products')
+            conn.commit()
+        else:
+            conn.rollback() # Releases the row locks
+        report["created"] += created
+        report["updated"] += len(values) - created
+
+    try:
+        chunk = []
+        for row_number, values in read_rows(file):
+            report["rows"] += 1
+            try:
+                row = validate_row(values)
+            except RowError as e:
+                add_error(row_number, str(e))
+                continue
+            key = row['product_id'] or row['name'].casefold()
+            if key in seen:
+                add_error(row_number, f"same product as row {seen[key]}")
+                continue
+            seen[key] = row_number
+            chunk.append((row_number, row))
+            if len(chunk) == IMPORT_CHUNK_SIZE:
+                write_chunk(chunk)
+                chunk = []
+        if chunk:
+            write_chunk(chunk)
+    except ImportRejected as e:
+        if not report["rows"]:
+            raise
+        # Unreadable past this point (e.g. bad encoding): earlier chunks are already imported
+        conn.rollback()
+        report["complete"] = False
+        report["stopped"] = f"{e} Rows from here on were not imported."
+        add_error(report["rows"] + 1, report["stopped"])
+    except mysql.connector.Error as err:
+        conn.rollback()
+        report["complete"] = False
+        first_row = chunk[0][0] if chunk else report["rows"]
+        report["stopped"] = f"Database error, import stopped; rows from {first_row} on were not imported: {err}"
+        add_error(first_row, report["stopped"])
+        logging.error(f"Product import stopped at row {first_row}: {err}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    report["errors"].sort(key=lambda error: error["row"])
+    report["error_count"] = error_count
+    logging.info(f"Product import{' (dry run)' if dry_run else ''}: {report['rows']} rows, "
+                 f"{report['created']} created, {report['updated']} updated, {error_count} rejected")
+    return report
@@ -0,0 +1,198 @@
+# report_routes.py
+# Contains API endpoints for business reports.
+# The receivables aging report is computed in one grouped query and cached on
+# disk per day and per monthly_bills/clients table version, so a change to bills
+# (generation, deletion, payments) or client names is never answered from a
+# report computed before it.
+
+from flask import Blueprint, jsonify, request, send_file
+from db import get_db_connection
+import mysql.connector
+from datetime import date
+from decimal import Decimal
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+
+import openpyxl
+
+from config import UNPAID_BILL_STATUSES
+import table_versions
+
+report_bp = Blueprint('report_bp', __name__)
+
+# Absolute and next to this module by default, so every worker shares one cache
+# whatever directory it was started from
+REPORT_CACHE_DIR = os.path.abspath(os.environ.get(
+    "REPORT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_cache")))
+# Tables the aging report reads; their versions are part of the cache key
+AGING_TABLES = ('monthly_bills', 'clients')
+
+# (key, label) for each aging bucket, in display order.
+AGING_BUCKETS = [
+    ('current', 'Current'),
+    ('days_1_30', '1-30 Days'),
+    ('days_31_60', '31-60 Days'),
+    ('days_61_90', '61-90 Days'),
+    ('days_90_plus', '90+ Days'),
+]
+
+# --- Aging report cache ---
+
+def _aging_cache_path(as_of, versions):
+    version_key = '-'.join(str(versions[table]) for table in AGING_TABLES)
+    return os.path.join(REPORT_CACHE_DIR, f"aging-{as_of.isoformat()}-{version_key}.json")
+
+def _read_cached_aging(as_of, versions):
+    try:
+        with open(_aging_cache_path(as_of, versions), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cached_aging(as_of, versions, report):
+    """Caches a report under the versions read before it was computed, so a later change can't be hidden by it."""
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=REPORT_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(report, f)
+        os.replace(tmp_path, _aging_cache_path(as_of, versions))
+    except OSError as e:
+        logging.warning(f"Could not cache aging report: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def invalidate_aging_cache():
+    """
+    Drops every cached aging report. Call after any change to bill amounts or statuses;
+    outdated reports are already bypassed by their version key, so this frees the disk.
+    """
+    if not os.path.isdir(REPORT_CACHE_DIR):
+        return
+    for name in os.listdir(REPORT_CACHE_DIR):
+        if name.startswith("aging-"):
+            try:
+                os.remove(os.path.join(REPORT_CACHE_DIR, name))
+            except OSError as e:
+                logging.warning(f"Could not remove cached report {name}: {e}")
+
+# --- Aging report query ---
+
+def build_aging_report(cursor, as_of):
+    """
+    Buckets unpaid bills by days past due_date, per client, in one grouped query.
+    The status filter is served by idx_monthly_bills_status_due (status, due_date).
+    """
+    status_placeholders = ', '.join(['%s'] * len(UNPAID_BILL_STATUSES))
+    query = f"""
+        SELECT mb.client_id, c.company_name as client_name,
+               COUNT(*) as bill_count,
+               SUM(CASE WHEN mb.due_date >= %s THEN mb.total_amount ELSE 0 END) as `current`,
+               SUM(CASE WHEN DATEDIFF(%s, mb.due_date) BETWEEN 1 AND 30 THEN mb.total_amount ELSE 0 END) as days_1_30,
+               SUM(CASE WHEN DATEDIFF(%s, mb.due_date) BETWEEN 31 AND 60 THEN mb.total_amount ELSE 0 END) as days_31_60,
+               SUM(CASE WHEN DATEDIFF(%s, mb.due_date) BETWEEN 61 AND 90 THEN mb.total_amount ELSE 0 END) as days_61_90,
+               SUM(CASE WHEN DATEDIFF(%s, mb.due_date) > 90 THEN mb.total_amount ELSE 0 END) as days_90_plus,
+               SUM(mb.total_amount) as total_outstanding
+        FROM monthly_bills mb
+        JOIN clients c ON mb.client_id = c.client_id
+        WHERE mb.status IN ({status_placeholders})
+        GROUP BY mb.client_id, c.company_name
+        ORDER BY total_outstanding DESC, c.company_name
+    """
+    params = [as_of] * 5 + list(UNPAID_BILL_STATUSES)
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+
+    totals = {key: 0.0 for key, _ in AGING_BUCKETS}
+    totals['total_outstanding'] = 0.0
+    totals['bill_count'] = 0
+    for row in rows:
+        for key in list(totals):
+            value = row[key]
+            row[key] = float(value) if isinstance(value, Decimal) else int(value or 0)
+            totals[key] += row[key]
+
+    return {
+        "as_of": as_of.isoformat(),
+        "buckets": [{"key": key, "label": label} for key, label in AGING_BUCKETS],
+        "data": rows,
+        "totals": totals,
+    }
+
+# --- Export helpers ---
+
+def _aging_table(report):
+    headers = ["Client ID", "Client", "Bills"] + [label for _, label in AGING_BUCKETS] + ["Total Outstanding"]
+    rows = []
+    for row in report['data']:
+        rows.append([row['client_id'], row['client_name'], row['bill_count']] +
+                    [row[key] for key, _ in AGING_BUCKETS] + [row['total_outstanding']])
+    totals = report['totals']
+    rows.append(["", "TOTAL", totals['bill_count']] +
+                [totals[key] for key, _ in AGING_BUCKETS] + [totals['total_outstanding']])
+    return headers, rows
+
+def _aging_csv_response(report):
+    headers, rows = _aging_table(report)
+    text_buffer = io.StringIO()
+    writer = csv.writer(text_buffer)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    buffer = io.BytesIO(text_buffer.getvalue().encode('utf-8'))
+    return send_file(buffer, as_attachment=True, download_name=f"Aging_{report['as_of']}.csv", mimetype='text/csv')
+
+def _aging_xlsx_response(report):
+    headers, rows = _aging_table(report)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Aging"
+    ws.append(headers)
+    for cell in ws[1]:
+        cell.font = openpyxl.styles.Font(bold=True)
+    for row in rows:
+        ws.append(row)
+    for cell in ws[ws.max_row]:
+        cell.font = openpyxl.styles.Font(bold=True)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return send_file(buffer, as_attachment=True, download_name=f"Aging_{report['as_of']}.xlsx",
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
+# --- Report Endpoints ---
+
+@report_bp.route('/reports/aging', methods=['GET'])
+def get_receivables_aging():
+    output_format = request.args.get('format', 'json').lower()
+    if output_format not in ('json', 'csv', 'xlsx'):
+        return jsonify({"error": "Invalid format. Use json, csv or xlsx."}), 400
+
+    as_of = date.today()
+    # Read before the report is computed; None (no versions) skips the cache
+    versions = table_versions.read_versions(AGING_TABLES)
+    report = _read_cached_aging(as_of, versions) if versions else None
+    if report is None:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+        cursor = conn.cursor(dictionary=True)
+        try:
+            report = build_aging_report(cursor, as_of)
+        except mysql.connector.Error as err:
+            logging.error(f"Aging report query failed: {err}", exc_info=True)
+            return jsonify({"error": str(err)}), 500
+        finally:
+            cursor.close()
+            conn.close()
+        if versions:
+            _write_cached_aging(as_of, versions, report)
+
+    if output_format == 'csv':
+        return _aging_csv_response(report)
+    if output_format == 'xlsx':
+        return _aging_xlsx_response(report)
+    return jsonify(report)
@@ -0,0 +1,98 @@
+# table_versions.py
+# Per-table change counters for conditional GETs on list endpoints.
+# Every write route bumps the version of each table it changes, in the same
+# transaction (see migrations/006_table_versions.sql). A list endpoint decorated
+# with @versioned(...) derives its ETag from the versions of the tables it reads
+# plus the request's path and parameters, and answers a matching If-None-Match
+# with 304 after one primary-key lookup, before running any of its queries.
+
+import json
+import hashlib
+import logging
+from datetime import date
+from functools import wraps
+
+from flask import request, make_response, g
+
+from db import get_db_connection
+
+# 'low_stock' is not a table: triggers on products bump it when the low-stock list changes (migration 007)
+VERSIONED_TABLES = ('products', 'clients', 'orders', 'challans', 'monthly_bills', 'client_pricing', 'low_stock',
+                    'price_lists')
+
+
+def bump(cursor, *tables):
+    """
+    Marks `tables` as changed. Call inside the write transaction, just before the commit:
+    the version rows stay locked until then, so keep the remaining work short.
+    """
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(f"UPDATE table_versions SET version = version + 1 WHERE table_name IN ({placeholders})", tables)
+
+
+def read_versions(tables):
+    """Returns {table: version}, or None if the database can't be reached."""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = conn.cursor()
+    try:
+        placeholders = ', '.join(['%s'] * len(tables))
+        cursor.execute(f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})", tables)
+        return dict(cursor.fetchall())
+    except Exception as e:
+        logging.warning(f"Could not read table versions: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def request_version(table):
+    """The version of `table` read by @versioned for the current request, or None."""
+    return g.get('table_versions', {}).get(table)
+
+
+def mark_stale():
+    """
+    Tells @versioned that the current response was built from data older than the
+    versions it read, so it is sent without an ETag and can't be revalidated as current.
+    """
+    g.table_versions_stale = True
+
+
+def versioned(*tables, daily=False):
+    """
+    Decorator for GET endpoints whose response only depends on `tables` and the request.
+    daily=True also varies the ETag by date, for responses computed relative to today.
+    """
+    for table in tables:
+        if table not in VERSIONED_TABLES:
+            raise ValueError(f"Table '{table}' has no version counter.")
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = read_versions(tables)
+            if versions is None:
+                return view(*args, **kwargs) # The view reports the database error
+            g.table_versions = versions
+
+            payload = [sorted(versions.items()), request.path, sorted(request.args.items(multi=True)),
+                       date.today().isoformat() if daily else None]
+            etag = hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()[:32]
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if g.get('table_versions_stale'):
+                    response.cache_control.no_cache = True
+                    return response
+            response.set_etag(etag)
+            # Clients may keep the response but must revalidate before using it
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,68 @@
+# tests/test_pdf_engine_parity.py
+# Layout parity between the PDF engines (config.PDF_ENGINES): the ReportLab
+# engine must put the same words and vector shapes in the same places as FPDF,
+# for the documents of benchmarks/pdf_fixtures.py (also timed by pdf_benchmarks.py).
+# Needs PyMuPDF to read the layouts back; skipped without it.
+#
+# Usage (from the repository root):
+#   python -m pytest tests/test_pdf_engine_parity.py
+
+import os
+import sys
+
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from pdf_fixtures import ENGINE_DOCUMENTS
+
+# Positions may differ by rounding between the engines' PDF writers (points)
+LAYOUT_TOLERANCE_PT = 0.5
+
+
+def _layout(pdf_buffer):
+    """Words (text, bbox) and vector shapes (fill, bbox) of every page."""
+    doc = pymupdf.open(stream=pdf_buffer.getvalue(), filetype='pdf')
+    pages = []
+    for page in doc:
+        words = [(w[4], tuple(w[:4])) for w in page.get_text('words')]
+        # FPDF writes colour components with 4 decimals, ReportLab with more
+        shapes = [(tuple(round(c, 2) for c in d['fill']) if d.get('fill') else None, tuple(d['rect']))
+                  for d in page.get_drawings()]
+        pages.append((words, shapes))
+    return pages
+
+
+def _unmatched(expected, actual):
+    """Items of `expected` with no counterpart in `actual` (same label, bbox within tolerance)."""
+    remaining = list(actual)
+    missing = []
+    for label, bbox in expected:
+        for index, (other_label, other_bbox) in enumerate(remaining):
+            if label == other_label and all(abs(a - b) <= LAYOUT_TOLERANCE_PT for a, b in zip(bbox, other_bbox)):
+                del remaining[index]
+                break
+        else:
+            missing.append((label, bbox))
+    return missing + remaining
+
+
+def layout_differences(reference_buffer, other_buffer):
+    """Lists the words and shapes that are not in the same place in both PDFs."""
+    reference, other = _layout(reference_buffer), _layout(other_buffer)
+    if len(reference) != len(other):
+        return [f"page count {len(reference)} != {len(other)}"]
+    differences = []
+    for page_no, ((ref_words, ref_shapes), (words, shapes)) in enumerate(zip(reference, other), 1):
+        differences += [f"page {page_no} text {item}" for item in _unmatched(ref_words, words)]
+        differences += [f"page {page_no} shape {item}" for item in _unmatched(ref_shapes, shapes)]
+    return differences
+
+
+@pytest.mark.parametrize("label, render", ENGINE_DOCUMENTS, ids=[label for label, _ in ENGINE_DOCUMENTS])
+def test_reportlab_layout_matches_fpdf(label, render):
+    assert layout_differences(render('fpdf'), render('reportlab')) == []
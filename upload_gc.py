@@ -0,0 +1,119 @@
+# upload_gc.py
+# Removes uploaded files that no product references any more: images replaced
+# by update_product, images of failed inserts (files are stored before the
+# database write) and the derivatives of all of these.
+# A file is only collected once it is older than UPLOAD_GC_GRACE_HOURS, so an
+# upload whose product row is still being written is never touched.
+# Runs in the background in the API (every UPLOAD_GC_INTERVAL_HOURS; 0 turns it
+# off) and by hand, where it only reports unless --apply is given:
+#   python upload_gc.py [--apply]        or        flask --app app gc-uploads [--apply]
+
+import os
+import time
+import logging
+import threading
+
+from db import get_db_connection
+from config import UPLOAD_FOLDER
+import product_images
+
+UPLOAD_GC_GRACE_HOURS = float(os.environ.get("UPLOAD_GC_GRACE_HOURS", "24"))
+UPLOAD_GC_INTERVAL_HOURS = float(os.environ.get("UPLOAD_GC_INTERVAL_HOURS", "24"))
+
+# Served by idx_products_image_url (migrations/005_products_image_url_index.sql)
+REFERENCED_UPLOADS_QUERY = "SELECT DISTINCT image_url FROM products WHERE image_url IS NOT NULL"
+
+def _referenced_uploads():
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(REFERENCED_UPLOADS_QUERY)
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+def find_unreferenced(upload_folder=UPLOAD_FOLDER, grace_hours=UPLOAD_GC_GRACE_HOURS, referenced=None):
+    """Returns [(path, size_bytes)] of the files the collector would remove."""
+    if referenced is None:
+        referenced = _referenced_uploads()
+    cutoff = time.time() - grace_hours * 3600
+    candidates = []
+
+    def consider(path):
+        stat = os.stat(path)
+        if stat.st_mtime < cutoff:
+            candidates.append((path, stat.st_size))
+
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            # Includes abandoned temporary files ('.upload-*') of interrupted uploads
+            if entry.is_file() and entry.name not in referenced:
+                consider(entry.path)
+
+    derived_folder = product_images.derived_folder(upload_folder)
+    if os.path.isdir(derived_folder):
+        with os.scandir(derived_folder) as entries:
+            for entry in entries:
+                parsed = product_images.parse_derivative_name(entry.name)
+                if entry.is_file() and (parsed is None or parsed[0] not in referenced):
+                    consider(entry.path)
+    return candidates
+
+def collect_unreferenced_uploads(apply=False, upload_folder=UPLOAD_FOLDER, grace_hours=UPLOAD_GC_GRACE_HOURS):
+    """
+    Finds (and with apply=True deletes) unreferenced uploads past the grace period.
+    Returns a report: {"files": [(path, size_bytes)], "bytes": total, "applied": apply}.
+    """
+    candidates = find_unreferenced(upload_folder, grace_hours)
+    reclaimed = 0
+    if apply:
+        for path, size in candidates:
+            try:
+                os.remove(path)
+                reclaimed += size
+            except FileNotFoundError:
+                pass # Already removed, e.g. by the collector of another worker process
+            except OSError as e:
+                logging.error(f"Upload GC: could not delete {path}: {e}")
+        logging.info(f"Upload GC: deleted {len(candidates)} unreferenced file(s), {reclaimed:,} bytes.")
+    return {
+        "files": candidates,
+        "bytes": sum(size for _, size in candidates),
+        "applied": apply,
+    }
+
+def format_report(report):
+    lines = [f"{path}  {size:,} bytes" for path, size in report["files"]]
+    verb = "Reclaimed" if report["applied"] else "Would reclaim"
+    lines.append(f"{verb} {report['bytes']:,} bytes in {len(report['files'])} file(s)"
+                 f" (older than {UPLOAD_GC_GRACE_HOURS:g} h, referenced by no product).")
+    return "\n".join(lines)
+
+def start_background_collector(upload_folder=UPLOAD_FOLDER):
+    """Starts a daemon thread that collects unreferenced uploads every UPLOAD_GC_INTERVAL_HOURS."""
+    if UPLOAD_GC_INTERVAL_HOURS <= 0:
+        return None
+
+    def _run():
+        while True:
+            time.sleep(UPLOAD_GC_INTERVAL_HOURS * 3600)
+            try:
+                collect_unreferenced_uploads(apply=True, upload_folder=upload_folder)
+            except Exception as e:
+                logging.warning(f"Upload GC failed: {e}", exc_info=True)
+
+    thread = threading.Thread(target=_run, name="upload-gc", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Remove uploads no product references")
+    parser.add_argument('--apply', action='store_true', help="delete the files (default: only report)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(format_report(collect_unreferenced_uploads(apply=args.apply)))
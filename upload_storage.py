@@ -0,0 +1,146 @@
+# upload_storage.py
+# Content-addressed storage for uploaded files.
+# An upload is stored as <sha256 of its bytes><extension> in the upload folder,
+# so uploading the same image again reuses the existing file instead of adding
+# a copy. Because a stored file's name changes whenever its content does, it
+# can be served with a long-lived, immutable Cache-Control header and its hash
+# as a strong ETag. Files uploaded under the old '{base}_{timestamp}{ext}'
+# names are still served, with revalidation instead of long-lived caching.
+#
+# Uploads are copied in chunks, so memory use does not grow with the file.
+# The copy stops as soon as a file exceeds MAX_UPLOAD_BYTES, and a file is only
+# accepted if its header identifies a PNG, JPEG or GIF within MAX_UPLOAD_PIXELS.
+# Only the header is read here; decoding happens in product_images' worker.
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+
+from flask import request, send_file, make_response
+from PIL import Image
+
+from config import MAX_UPLOAD_BYTES, MAX_UPLOAD_PIXELS
+
+# One year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+_CONTENT_NAME = re.compile(r'^([0-9a-f]{64})\.[a-z0-9]+$')
+
+# Leading bytes -> (Pillow format, stored extension)
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': ('PNG', '.png'),
+    b'\xff\xd8\xff': ('JPEG', '.jpeg'),
+    b'GIF87a': ('GIF', '.gif'),
+    b'GIF89a': ('GIF', '.gif'),
+}
+
+
+class UploadRejected(ValueError):
+    """The uploaded file is not an acceptable image; maps to HTTP 400."""
+    http_status = 400
+
+
+class UploadTooLarge(UploadRejected):
+    http_status = 413
+
+
+def _sniff(head):
+    for signature, kind in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return kind
+    return None
+
+
+def _check_header(path, expected_format):
+    """Parses the image header (no pixel data) and checks its format and dimensions."""
+    try:
+        with Image.open(path) as img:
+            image_format, (width, height) = img.format, img.size
+    except Exception:
+        raise UploadRejected("The file could not be read as an image.")
+    if image_format != expected_format:
+        raise UploadRejected("The file could not be read as an image.")
+    if width * height > MAX_UPLOAD_PIXELS:
+        raise UploadTooLarge(f"The image is {width}x{height} pixels; the limit is {MAX_UPLOAD_PIXELS:,} pixels.")
+
+
+def content_hash(filename):
+    """Returns the content hash a stored file is named after, or None for a legacy upload name."""
+    match = _CONTENT_NAME.match(filename)
+    return match.group(1) if match else None
+
+
+def store_upload(file, upload_folder, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Saves an uploaded image (a werkzeug FileStorage) under the hash of its content.
+    Returns (filename, created); `created` is False if an identical file was already stored.
+    Raises UploadRejected if it is not a PNG, JPEG or GIF, and UploadTooLarge past the limits.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    kind = None
+    # Hash while copying to a temporary file next to the target, so the final rename is atomic
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            while True:
+                chunk = file.stream.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if kind is None:
+                    kind = _sniff(chunk)
+                    if kind is None:
+                        raise UploadRejected("Only PNG, JPEG and GIF images can be uploaded.")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"The image is larger than the {max_bytes / (1024 * 1024):.1f} MB limit.")
+                digest.update(chunk)
+                tmp_file.write(chunk)
+        if kind is None:
+            raise UploadRejected("The uploaded file is empty.")
+        image_format, ext = kind
+        _check_header(tmp_path, image_format)
+
+        filename = f"{digest.hexdigest()}{ext}"
+        target_path = os.path.join(upload_folder, filename)
+        if os.path.isfile(target_path):
+            os.remove(tmp_path)
+            # Restart the upload_gc grace period: the file may be unreferenced until the product is saved
+            os.utime(target_path)
+            logging.info(f"Upload {file.filename} matches stored file {filename}; reusing it")
+            return filename, False
+        os.replace(tmp_path, target_path)
+        return filename, True
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def send_stored_file(path, etag=None):
+    """
+    Serves a stored upload. With an `etag` (a content hash the URL is derived from),
+    the response is cacheable forever and If-None-Match is answered with 304 before
+    the file is touched; without one, clients revalidate on every use.
+    """
+    if etag and request.if_none_match.contains(etag):
+        response = make_response("", 304)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
+
+    if not etag:
+        response = send_file(path, conditional=True, max_age=0)
+        response.cache_control.no_cache = True
+        return response
+
+    response = send_file(path, etag=etag, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response